@@ -21,12 +21,13 @@ CelestialSkyPage search-list shim; 7.0 removed the panels (they duplicate
 weewx-skyfield's own Sky page), the shim, and the 6.x service stub.
 """
 
+import functools
 import logging
 import os
 import re
 import sys
 
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
 
 import weewx
 
@@ -245,8 +246,10 @@ _MIGRATION_NEW_FIELDS: List[str] = [
     # visible tag -- feeds the dome's.  Times, the duration and the peak
     # altitude use pinned-unit spellings -- the 7.5/7.6 doctrine: a
     # [Units] [[Groups]] override on loopdata's target report must never
-    # change a field's meaning.
-    'almanac.iss.az', 'almanac.iss.alt', 'almanac.iss.sunlit',
+    # change a field's meaning.  No az/alt (8.3.6): the dome marker and
+    # the pass chart's dot follow ephemeris-track.json, so loopdata is
+    # spared a satellite position on every packet.
+    'almanac.iss.sunlit',
     'almanac.iss.label',
     'almanac.iss.next_visible_pass.rise.unix_epoch.raw',
     'almanac.iss.next_visible_pass.set.unix_epoch.raw',
@@ -263,7 +266,7 @@ _MIGRATION_NEW_FIELDS: List[str] = [
     'almanac.iss.next_pass.culmination_azimuth.ordinal_compass',
     'almanac.iss.next_pass.set_azimuth.ordinal_compass',
     'almanac.iss.next_pass.visible',
-    'almanac.tiangong.az', 'almanac.tiangong.alt', 'almanac.tiangong.sunlit',
+    'almanac.tiangong.sunlit',
     'almanac.tiangong.label',
     'almanac.tiangong.next_visible_pass.rise.unix_epoch.raw',
     'almanac.tiangong.next_visible_pass.set.unix_epoch.raw',
@@ -311,6 +314,224 @@ _MIGRATION_UPGRADED_FIELDS: Dict[str, str] = {
 }
 
 
+# ===============================================================================
+# The fields-line model.
+#
+# Every entry point that edits [LoopData] [[Include]] fields -- the
+# migrator, the installer's append, the satellite and comet verbs -- works
+# through FieldsLine: the line parsed once, each entry split into the
+# segments that matter here (root, almanac arguments, tag, member path,
+# unit pin, rendition), and indexed by text and by tag.  Finding a tag's
+# entries is a lookup rather than a regular-expression scan of the line,
+# and adding, removing or deduplicating a batch of entries is linear in
+# the line however many tags it carries.
+# ===============================================================================
+
+# ValueHelper renditions an entry can end in; the ones taking arguments
+# match by their name up to the parenthesis.
+_RENDITIONS = frozenset(['raw', 'formatted', 'ordinal_compass', 'long_form', 'json'])
+_RENDITION_CALLS = ('format(', 'string(', 'nolabel(', 'round(')
+
+
+class FieldEntry(NamedTuple):
+    """One fields-line entry, parsed.  'almanac(horizon=-18).sun(use_center=1)
+    .rise.unix_epoch.raw' is root 'almanac', args 'horizon=-18', tag 'sun',
+    path ('rise',), unit 'unix_epoch', rendition 'raw' (the tag's own
+    arguments are part of the text, not of the model: nothing here edits
+    by them)."""
+    text: str
+    root: str
+    args: Optional[str]
+    tag: Optional[str]
+    path: Tuple[str, ...]
+    unit: Optional[str]
+    rendition: Optional[str]
+
+
+_unit_names: Optional[frozenset] = None
+
+
+def _is_unit(segment: str) -> bool:
+    """Whether segment names a WeeWX unit (a unit pin such as .unix_epoch
+    or .degree_angle).  The set is read from weewx.units once, on first
+    use."""
+    global _unit_names
+    if _unit_names is None:
+        import weewx.units
+        names = set(weewx.units.conversionDict)
+        for targets in weewx.units.conversionDict.values():
+            names.update(targets)
+        for system in (weewx.units.USUnits, weewx.units.MetricUnits,
+                       weewx.units.MetricWXUnits):
+            names.update(system.values())
+        _unit_names = frozenset(names)
+    return segment in _unit_names
+
+
+def _split_segments(text: str) -> List[str]:
+    """text split on the dots outside parentheses, so an argument such as
+    horizon=-0.5 stays whole."""
+    segments: List[str] = []
+    depth = 0
+    start = 0
+    for i, ch in enumerate(text):
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth = max(0, depth - 1)
+        elif ch == '.' and depth == 0:
+            segments.append(text[start:i])
+            start = i + 1
+    segments.append(text[start:])
+    return segments
+
+
+def _head(segments: List[str]) -> Tuple[str, Optional[str], Optional[str]]:
+    """(root, args, tag) from an entry's segments."""
+    root, args = segments[0], None
+    if root.endswith(')') and '(' in root:
+        root, _, args = root[:-1].partition('(')
+    tag = segments[1].partition('(')[0] if len(segments) > 1 else None
+    return root, args, tag
+
+
+def _almanac_tag(text: str) -> Optional[str]:
+    """The tag an almanac entry reads, None for any other entry: all the
+    index needs, without parse_field's unit lookup."""
+    if not text.startswith('almanac'):
+        return None
+    root, _, tag = _head(_split_segments(text))
+    return tag if root == 'almanac' else None
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_field(text: str) -> FieldEntry:
+    """Parse one fields-line entry (see FieldEntry).  Never raises: an
+    entry this model cannot read is kept whole as its root."""
+    segments = _split_segments(text)
+    root, args, tag = _head(segments)
+    rest = segments[2:]
+    rendition: Optional[str] = None
+    if rest and (rest[-1] in _RENDITIONS or rest[-1].startswith(_RENDITION_CALLS)):
+        rendition = rest.pop()
+    unit: Optional[str] = None
+    if rest and _is_unit(rest[-1]):
+        unit = rest.pop()
+    return FieldEntry(text, root, args, tag, tuple(rest), unit, rendition)
+
+
+class FieldsLine:
+    """A [LoopData] [[Include]] fields line: its entries in order
+    (duplicates included, as the line has them), indexed by entry text
+    and, for almanac entries, by tag.  Removal blanks a slot rather than
+    shifting the list; fields() compacts.  Only the tag is read to index
+    an entry; entries() parses the rest on demand."""
+
+    def __init__(self, fields: Iterable[str] = ()) -> None:
+        self._entries: List[Optional[str]] = []
+        self._by_text: Dict[str, List[int]] = {}
+        self._by_tag: Dict[str, List[int]] = {}
+        for field in fields:
+            self.append(field)
+
+    @classmethod
+    def from_config(cls, config: Any) -> Optional['FieldsLine']:
+        """The configuration's fields line, or None when it has none.  A
+        value ConfigObj left as one string is split on its commas."""
+        try:
+            fields = config['LoopData']['Include']['fields']
+        except KeyError:
+            return None
+        if isinstance(fields, str):
+            fields = [f.strip() for f in fields.split(',') if f.strip()]
+        return cls(fields)
+
+    def write(self, config: Any) -> None:
+        """Store the line back into config's [LoopData] [[Include]]."""
+        config['LoopData']['Include']['fields'] = self.fields()
+
+    def append(self, field: str) -> None:
+        """Append field even if already present (see add)."""
+        position = len(self._entries)
+        self._entries.append(field)
+        self._by_text.setdefault(field, []).append(position)
+        tag = _almanac_tag(field)
+        if tag is not None:
+            self._by_tag.setdefault(tag, []).append(position)
+
+    def __contains__(self, field: object) -> bool:
+        return bool(self._by_text.get(field))  # type: ignore[call-overload]
+
+    def __len__(self) -> int:
+        return sum(len(p) for p in self._by_text.values())
+
+    def fields(self) -> List[str]:
+        """The line's entries in order, as the configuration holds them."""
+        return [e for e in self._entries if e is not None]
+
+    def entries(self, tag: Optional[str] = None) -> List[FieldEntry]:
+        """Every entry, or just the almanac entries reading tag, in order."""
+        if tag is None:
+            return [parse_field(e) for e in self._entries if e is not None]
+        return [parse_field(self._entries[p])  # type: ignore[arg-type]
+                for p in self._by_tag.get(tag, ())]
+
+    def tags(self) -> List[str]:
+        """The tags the line's almanac entries read, in first-seen order."""
+        return [t for t, positions in self._by_tag.items() if positions]
+
+    def add(self, fields: Iterable[str]) -> List[str]:
+        """Append each of fields not already on the line (nor earlier in
+        fields), in order.  Returns those appended."""
+        added: List[str] = []
+        for field in fields:
+            if field not in self:
+                self.append(field)
+                added.append(field)
+        return added
+
+    def _drop(self, positions: Iterable[int]) -> List[str]:
+        removed = []
+        for position in sorted(set(positions)):
+            entry = self._entries[position]
+            if entry is None:
+                continue
+            self._entries[position] = None
+            self._by_text[entry].remove(position)
+            if not self._by_text[entry]:
+                del self._by_text[entry]
+            tag = _almanac_tag(entry)
+            if tag is not None:
+                self._by_tag[tag].remove(position)
+                if not self._by_tag[tag]:
+                    del self._by_tag[tag]
+            removed.append(entry)
+        return removed
+
+    def remove(self, fields: Iterable[str]) -> List[str]:
+        """Remove every occurrence of each of fields.  Returns the entries
+        removed, in line order."""
+        return self._drop(p for f in set(fields) for p in self._by_text.get(f, ()))
+
+    def remove_tag(self, tag: str) -> List[str]:
+        """Remove every almanac entry reading a member of tag --
+        almanac.<tag>.<member>..., almanac arguments included.  A bare
+        almanac.<tag>, or one calling the tag (almanac.<tag>(...)...), is
+        not one of the tag's fields and stays, as it always has.  Returns
+        the entries removed, in line order."""
+        positions = []
+        for position in self._by_tag.get(tag, ()):
+            segments = _split_segments(self._entries[position])  # type: ignore[arg-type]
+            if segments[1] == tag and len(segments) > 2:
+                positions.append(position)
+        return self._drop(positions)
+
+    def dedupe(self) -> List[str]:
+        """Remove every repeat of an entry, keeping the first.  Returns the
+        repeats removed, in line order."""
+        return self._drop(p for positions in self._by_text.values() for p in positions[1:])
+
+
 def _migrate_one_field(field: str) -> Tuple[Optional[str], Optional[str]]:
     """One fields-line entry rewritten to its almanac equivalent.  Returns
     (new_entry, note): (field, None) for entries that are not celestial loop
@@ -362,11 +583,9 @@ def migrate_loopdata_fields(fields: List[str],
     Returns (new_fields, report) where report maps 'renamed' to
     (old, new) pairs, 'dropped'/'added' to field names, and 'notes' to
     human-readable caveats."""
-    result: List[str] = []
-    seen: set = set()
+    line = FieldsLine()
     renamed: List[Tuple[str, str]] = []
     dropped: List[str] = []
-    added: List[str] = []
     notes: List[str] = []
     any_distance = False
     any_fullness = False
@@ -384,33 +603,27 @@ def migrate_loopdata_fields(fields: List[str],
             if new_field.startswith('almanac.moon.phase'):
                 any_fullness = True
             field = new_field
-        if field in seen:
+        if field in line:
             dropped.append(field)
             continue
-        seen.add(field)
-        result.append(field)
+        line.append(field)
     sat_tags = (list(_INSTALLER_DEFAULT_SATELLITES) if satellites is None
                 else list(satellites))
     comet_tags = (list(_INSTALLER_DEFAULT_COMETS) if comets is None
                   else list(comets))
+    retired = [f for f in ('almanac.%s.%s' % (tag, member) for tag in sat_tags
+                           for member in _RETIRED_SATELLITE_MEMBERS) if f in line]
     # Both families' installer defaults are stripped from the base list
     # and re-appended per the configured (or defaulted) tag lists below --
     # otherwise a deliberately emptied [[Satellites]] or [[Comets]] would
     # get its defaults resurrected from the pattern entries.
-    default_prefixes = tuple(
-        'almanac.%s.' % tag
-        for tag in _INSTALLER_DEFAULT_SATELLITES + _INSTALLER_DEFAULT_COMETS)
-    wanted = [f for f in _MIGRATION_NEW_FIELDS
-              if not f.startswith(default_prefixes)]
+    wanted = list(_MIGRATION_BASE_FIELDS)
     for tag in sat_tags:
         wanted.extend(satellite_fields(tag))
     for tag in comet_tags:
         wanted.extend(comet_fields(tag))
-    for field in wanted:
-        if field not in seen:
-            seen.add(field)
-            result.append(field)
-            added.append(field)
+    added = line.add(wanted)
+    added_by = set(_almanac_tag(f) for f in added)
     if any_distance:
         notes.append('Distances now arrive as raw astronomical units (the value '
                      'reports show), no longer miles/km; pages must convert '
@@ -419,12 +632,17 @@ def migrate_loopdata_fields(fields: List[str],
     if any_fullness:
         notes.append('almanac.moon.phase is a raw percent (e.g. 33.6), no '
                      'longer a formatted string; pages format it themselves.')
+    if retired:
+        notes.append('%s kept: the sample page places satellites from '
+                     'ephemeris-track.json and reads these only where the '
+                     'track runs out.  Unless another page reads them, '
+                     'removing them spares loopdata a satellite position on '
+                     'every packet.' % ', '.join(retired))
     for kind, tags, configured, section, verb in (
             ('satellite', sat_tags, satellites, '[[Satellites]]',
              '--add-satellite'),
             ('comet', comet_tags, comets, '[[Comets]]', '--add-comet')):
-        added_tags = [tag for tag in tags
-                      if any(f.startswith('almanac.%s.' % tag) for f in added)]
+        added_tags = [tag for tag in tags if tag in added_by]
         if added_tags:
             entries = ', '.join('almanac.%s.*' % tag for tag in added_tags)
             if configured is None:
@@ -445,21 +663,42 @@ def migrate_loopdata_fields(fields: List[str],
             notes.append('[Skyfield] %s is empty, so no %s fields were '
                          'appended; %s configures a %s end to end when you '
                          'want one.' % (section, kind, verb, kind))
-    return result, {'renamed': renamed, 'dropped': dropped, 'added': added,
-                    'notes': notes}
+    return line.fields(), {'renamed': renamed, 'dropped': dropped,
+                           'added': added, 'notes': notes}
 
 
 def _write_conf_atomically(config: Any, config_path: str, output_path: str) -> None:
-    """Write config (a ConfigObj) to output_path atomically (temp file,
-    fsync, rename -- a crash cannot leave a truncated file), preserving
-    config_path's mode.  config_path itself is only written when
-    output_path names the same file."""
+    """Write config (a ConfigObj read from config_path, then edited) to
+    output_path atomically (temp file, fsync, rename -- a crash cannot
+    leave a truncated file), preserving config_path's mode.  config_path
+    itself is only written when output_path names the same file.
+
+    The edits these utilities make touch a handful of lines, so the file
+    written is config_path's own text with just those lines changed (see
+    _minimal_conf_text) -- every other line, its spacing, its comments,
+    its quoting, exactly as it was.  That text is re-parsed before it is
+    used, and unless it reads back as exactly config, the configuration
+    is serialized whole instead, as ConfigObj writes it."""
+    data = None
+    try:
+        data = _minimal_conf_text(config, config_path)
+    except Exception as e:
+        log.debug('Minimal rewrite of %s not possible (%s)' % (config_path, e))
+    if data is None:
+        import io
+        buffer = io.BytesIO()
+        config.write(buffer)
+        data = buffer.getvalue()
+    _write_bytes_atomically(data, config_path, output_path)
+
+
+def _write_bytes_atomically(data: bytes, config_path: str, output_path: str) -> None:
     import tempfile
     out_dir = os.path.dirname(os.path.abspath(output_path))
     fd, temp_path = tempfile.mkstemp(prefix='weewx.conf.celestial.', dir=out_dir)
     try:
         with os.fdopen(fd, 'wb') as f:
-            config.write(f)
+            f.write(data)
             f.flush()
             os.fsync(f.fileno())
         os.chmod(temp_path, os.stat(config_path).st_mode & 0o777)
@@ -472,6 +711,150 @@ def _write_conf_atomically(config: Any, config_path: str, output_path: str) -> N
         raise
 
 
+def _conf_layout(lines: List[str]) -> Dict[Tuple[str, ...], Dict[str, Any]]:
+    """Where everything is in a configuration's text, read by ConfigObj's
+    own line grammar: for each section (by its path of names; () is the
+    top level), its 'depth', the 'keys' of its values with the (start,
+    end) line range each occupies (a triple-quoted value can span
+    several), its 'last' content line (its own values and subsections,
+    never the comments trailing after them) and the line 'scalars_end'
+    where its next value would go -- after its last value, before its
+    first subsection."""
+    import configobj
+    keyword = configobj.ConfigObj._keyword
+    marker = configobj.ConfigObj._sectionmarker
+    layout: Dict[Tuple[str, ...], Dict[str, Any]] = {
+        (): {'depth': 0, 'keys': {}, 'last': -1, 'scalars_end': 0}}
+    path: Tuple[str, ...] = ()
+    i = 0
+    while i < len(lines):
+        stripped = lines[i].strip()
+        if not stripped or stripped.startswith('#'):
+            i += 1
+            continue
+        m = marker.match(lines[i])
+        if m:
+            depth = m.group(2).count('[')
+            if depth > len(path) + 1 or depth != m.group(4).count(']'):
+                raise ValueError('line %d: cannot follow the section nesting' % (i + 1))
+            path = path[:depth - 1] + (m.group(3).strip('"\'').strip(),)
+            layout[path] = {'depth': depth, 'keys': {}, 'last': i, 'scalars_end': i + 1}
+            for n in range(len(path)):
+                layout[path[:n]]['last'] = i
+            i += 1
+            continue
+        m = keyword.match(lines[i])
+        if not m:
+            raise ValueError('line %d: not a value or a section' % (i + 1))
+        key = m.group(2)
+        if key[:1] in ('"', "'") and key[-1:] == key[:1]:
+            key = key[1:-1]
+        end = i
+        value = m.group(3)
+        for quote in ('"""', "'''"):
+            if value.startswith(quote) and quote not in value[3:]:
+                end = i + 1
+                while end < len(lines) and quote not in lines[end]:
+                    end += 1
+                if end == len(lines):
+                    raise ValueError('line %d: unterminated %s' % (i + 1, quote))
+        section = layout[path]
+        section['keys'][key] = (i, end)
+        if section['scalars_end'] <= i:
+            section['scalars_end'] = end + 1
+        for n in range(len(path) + 1):
+            layout[path[:n]]['last'] = end
+        i = end + 1
+    return layout
+
+
+def _minimal_conf_text(config: Any, config_path: str) -> Optional[bytes]:
+    """config_path's own text with only the lines config's edits changed:
+    a changed value's line rewritten in place, a removed value's line
+    deleted, a new value added after its section's last one, a new
+    section added at the end of its parent.  None when the edits are of
+    another kind (a section removed, a value turned into a section) or
+    the text does not read back as exactly config."""
+    import configobj
+    with open(config_path, 'rb') as f:
+        raw = f.read()
+    bom = raw.startswith(b'\xef\xbb\xbf')
+    text = raw.decode('utf-8-sig')
+    newline = '\r\n' if '\r\n' in text else '\n'
+    lines = text.splitlines()
+    before = configobj.ConfigObj(lines, encoding='utf-8', interpolation=False)
+    layout = _conf_layout(lines)
+    main = config.main
+    indent_type = main.indent_type if main.indent_type is not None else '    '
+    # (line, end, new lines): lines [line, end) replaced by new lines.
+    patches: List[Tuple[int, int, List[str]]] = []
+
+    def section_lines(section, depth):
+        out = []
+        for key in section.scalars:
+            out.append(main._write_line(indent_type * depth, key,
+                                        dict.__getitem__(section, key), ''))
+        for key in section.sections:
+            out.append(main._write_marker(indent_type * depth, depth + 1, key, ''))
+            out.extend(section_lines(section[key], depth + 1))
+        return out
+
+    def diff(old, new, path):
+        where = layout[path]
+        for key in old.scalars:
+            start, end = where['keys'][key]
+            if key not in new:
+                patches.append((start, end + 1, []))
+            elif key in new.sections:
+                return False
+            elif dict.__getitem__(new, key) != dict.__getitem__(old, key):
+                indent = lines[start][:len(lines[start]) - len(lines[start].lstrip())]
+                patches.append((start, end + 1, [main._write_line(
+                    indent, key, dict.__getitem__(new, key),
+                    main._handle_comment(new.inline_comments.get(key)))]))
+        added = []
+        for key in new.scalars:
+            if key in old.sections:
+                return False
+            if key not in old:
+                added.append(main._write_line(indent_type * where['depth'], key,
+                                              dict.__getitem__(new, key), ''))
+        if added:
+            patches.append((where['scalars_end'], where['scalars_end'], added))
+        for key in old.sections:
+            if key not in new or key in new.scalars:
+                return False
+            if not diff(old[key], new[key], path + (key,)):
+                return False
+        blocks = []
+        for key in new.sections:
+            if key not in old:
+                blocks.append(main._write_marker(indent_type * where['depth'],
+                                                 where['depth'] + 1, key, ''))
+                blocks.extend(section_lines(new[key], where['depth'] + 1))
+        if blocks:
+            patches.append((where['last'] + 1, where['last'] + 1, blocks))
+        return True
+
+    if not diff(before, config, ()):
+        return None
+    # Bottom up, so every patch's line numbers still hold when it is
+    # applied.  Insertions at one line go in the order they were found --
+    # a subsection's new values before its parent's new sections -- so
+    # the later one is applied first.
+    order = sorted(range(len(patches)), key=lambda n: (patches[n][0], patches[n][1], n),
+                   reverse=True)
+    for n in order:
+        start, end, new_lines = patches[n]
+        lines[start:end] = new_lines
+    result = newline.join(lines) + newline
+    check = configobj.ConfigObj(result.splitlines(), encoding='utf-8',
+                                interpolation=main.interpolation)
+    if check.dict() != config.dict():
+        return None
+    return (b'\xef\xbb\xbf' if bom else b'') + result.encode('utf-8')
+
+
 def _configured_satellites(config: Any) -> Optional[List[str]]:
     """The [Skyfield] [[Satellites]] tags as a list, in configuration
     order -- the satellite set the migrator provisions fields for.  None
@@ -506,13 +889,10 @@ def migrate_loopdata_conf(config_path: str, output_path: str) -> Dict[str, Any]:
     _write_conf_atomically).  Returns the migration report."""
     import configobj
     config = configobj.ConfigObj(config_path, file_error=True, encoding='utf-8')
-    try:
-        fields = config['LoopData']['Include']['fields']
-    except KeyError:
+    line = FieldsLine.from_config(config)
+    if line is None:
         raise KeyError('%s has no [LoopData] [[Include]] fields entry' % config_path)
-    if isinstance(fields, str):
-        fields = [f.strip() for f in fields.split(',') if f.strip()]
-    new_fields, report = migrate_loopdata_fields(list(fields),
+    new_fields, report = migrate_loopdata_fields(line.fields(),
                                                  _configured_satellites(config),
                                                  _configured_comets(config))
     config['LoopData']['Include']['fields'] = new_fields
@@ -526,7 +906,7 @@ def migrate_loopdata_conf(config_path: str, output_path: str) -> Dict[str, Any]:
 #
 # Adding a satellite or a comet by hand takes three separate weewx.conf
 # edits -- the [Skyfield] [[Satellites]] (or [[Comets]]) entry, the
-# [LoopData] [[Include]] fields entries (nineteen per satellite, six per
+# [LoopData] [[Include]] fields entries (seventeen per satellite, six per
 # comet), and the display name under [StdReport] [[Defaults]]
 # [[[Almanac]]].  These functions converge a configuration to the desired
 # state: every edit is independently idempotent, so any mixed starting
@@ -565,20 +945,32 @@ _INSTALLER_DEFAULT_COMETS = ('halley', 'hale_bopp')
 _COMET_DESIGNATION_RE = re.compile(
     r'(\d{1,4}[PDCXAI]|[PCDXAI]/\d{4} [A-Z]{1,2}\d*)(-[A-Z0-9]+)?$')
 
-# Matches a fields entry belonging to a satellite or comet tag, almanac
-# arguments allowed: almanac.<tag>.* and almanac(...).<tag>.*.
-def _almanac_entry_re(tag: str) -> 're.Pattern[str]':
-    return re.compile(r'almanac(\([^)]*\))?\.%s\.' % re.escape(tag))
+# The sample page's per-satellite and per-comet members (the iss and
+# halley entries of _MIGRATION_NEW_FIELDS, the tag removed), and the rest
+# of its fields: parsed out of the list once, here, for satellite_fields,
+# comet_fields and the migrator.
+_SATELLITE_MEMBERS: List[str] = [
+    f[len('almanac.iss.'):] for f in _MIGRATION_NEW_FIELDS
+    if f.startswith('almanac.iss.')]
+# Per-satellite members no longer provisioned (8.3.6): the ephemeris
+# track places the marker, and the page reads these only where the track
+# runs out.  The migrator leaves them on a line that has them -- another
+# page may read them -- and says what they cost.
+_RETIRED_SATELLITE_MEMBERS = ('az', 'alt')
+_COMET_MEMBERS: List[str] = [
+    f[len('almanac.halley.'):] for f in _MIGRATION_NEW_FIELDS
+    if f.startswith('almanac.halley.')]
+_MIGRATION_BASE_FIELDS: List[str] = [
+    f for f in _MIGRATION_NEW_FIELDS
+    if _almanac_tag(f) not in _INSTALLER_DEFAULT_SATELLITES + _INSTALLER_DEFAULT_COMETS]
 
 
 def satellite_fields(tag: str) -> List[str]:
-    """The nineteen [LoopData] [[Include]] fields entries the sample page
+    """The seventeen [LoopData] [[Include]] fields entries the sample page
     reads per satellite: the almanac.iss.* members of _MIGRATION_NEW_FIELDS
     with the tag substituted -- derived, not copied, so the page's
     satellite consumption keeps one source of truth."""
-    return [field.replace('almanac.iss.', 'almanac.%s.' % tag, 1)
-            for field in _MIGRATION_NEW_FIELDS
-            if field.startswith('almanac.iss.')]
+    return ['almanac.%s.%s' % (tag, member) for member in _SATELLITE_MEMBERS]
 
 
 def comet_fields(tag: str) -> List[str]:
@@ -586,9 +978,7 @@ def comet_fields(tag: str) -> List[str]:
     per comet: the almanac.halley.* members of _MIGRATION_NEW_FIELDS with
     the tag substituted -- derived, not copied, so the page's comet
     consumption keeps one source of truth."""
-    return [field.replace('almanac.halley.', 'almanac.%s.' % tag, 1)
-            for field in _MIGRATION_NEW_FIELDS
-            if field.startswith('almanac.halley.')]
+    return ['almanac.%s.%s' % (tag, member) for member in _COMET_MEMBERS]
 
 
 def _validate_satellite_tag(tag: str, adding: bool) -> None:
@@ -630,23 +1020,11 @@ def _other_family_tags(config: Any, section: str,
     return tags
 
 
-def _loopdata_fields(config: Any) -> Optional[List[str]]:
-    """The [LoopData] [[Include]] fields entry as a list, or None when the
-    configuration has none."""
-    try:
-        fields = config['LoopData']['Include']['fields']
-    except KeyError:
-        return None
-    if isinstance(fields, str):
-        fields = [f.strip() for f in fields.split(',') if f.strip()]
-    return list(fields)
-
-
-def add_satellite(config: Any, tag: str, norad: str,
-                  name: Optional[str] = None) -> Dict[str, Any]:
+def add_satellite(config: Any, tag: str, norad: str, name: Optional[str] = None,
+                  line: Optional[FieldsLine] = None) -> Dict[str, Any]:
     """Converge config (a ConfigObj) to carry satellite tag = norad: the
     [Skyfield] [[Satellites]] entry (added, or updated when the number
-    differs -- the invocation is authoritative), the nineteen fields
+    differs -- the invocation is authoritative), the seventeen fields
     entries appended to [LoopData] [[Include]] fields (entries already
     present are left in place), and, when name is given, the display name
     under [StdReport] [[Defaults]] [[[Almanac]]] (an existing name is
@@ -654,7 +1032,9 @@ def add_satellite(config: Any, tag: str, norad: str,
     or reserved tag, a non-numeric catalog number, or a configuration
     with no [LoopData] [[Include]] fields entry.  Returns a report dict:
     'satellites_entry'/'name_entry' statuses, 'previous_norad',
-    'fields_added' and human-readable 'hints'."""
+    'fields_added' and human-readable 'hints'.  Given line, the fields
+    are appended to that model of config's fields line instead, and the
+    caller writes it back (apply_batch, one model across a batch)."""
     _validate_satellite_tag(tag, adding=True)
     if not norad.isdigit():
         raise ValueError("NORAD catalog number '%s' must be all digits "
@@ -665,8 +1045,10 @@ def add_satellite(config: Any, tag: str, norad: str,
                          "installer default); satellites and comets share "
                          "the almanac.<tag> namespace, so choose another "
                          "tag." % tag)
-    fields = _loopdata_fields(config)
-    if fields is None:
+    own_line = line is None
+    if own_line:
+        line = FieldsLine.from_config(config)
+    if line is None:
         raise ValueError('The configuration has no [LoopData] [[Include]] '
                          'fields entry.  Install weewx-loopdata and run '
                          '--migrate-loopdata-fields first; --add-satellite '
@@ -688,10 +1070,9 @@ def add_satellite(config: Any, tag: str, norad: str,
         previous_norad = str(previous)
         satellites[tag] = norad
         satellites_entry = 'updated'
-    present = set(fields)
-    fields_added = [f for f in satellite_fields(tag) if f not in present]
-    if fields_added:
-        config['LoopData']['Include']['fields'] = fields + fields_added
+    fields_added = line.add(satellite_fields(tag))
+    if fields_added and own_line:
+        line.write(config)
     if 'StdReport' not in config:
         config['StdReport'] = {}
     defaults = config['StdReport'].get('Defaults', {})
@@ -726,7 +1107,8 @@ def add_satellite(config: Any, tag: str, norad: str,
             'hints': hints}
 
 
-def remove_satellite(config: Any, tag: str) -> Dict[str, Any]:
+def remove_satellite(config: Any, tag: str,
+                     line: Optional[FieldsLine] = None) -> Dict[str, Any]:
     """Converge config (a ConfigObj) to carry no satellite tag: deletes
     the [Skyfield] [[Satellites]] entry, every fields entry reading the
     satellite (almanac.<tag>.* in any spelling, almanac arguments
@@ -734,7 +1116,9 @@ def remove_satellite(config: Any, tag: str) -> Dict[str, Any]:
     name.  Each piece is removed if present -- removing an
     already-absent satellite is a no-op, not an error.  Returns a report
     dict: 'satellites_entry'/'name_entry' statuses, the removed entry's
-    'norad', 'fields_removed' and human-readable 'hints'."""
+    'norad', 'fields_removed' and human-readable 'hints'.  Given line,
+    the fields are removed from that model of config's fields line
+    instead, and the caller writes it back (see add_satellite)."""
     _validate_satellite_tag(tag, adding=False)
     hints: List[str] = []
     norad: Optional[str] = None
@@ -746,14 +1130,14 @@ def remove_satellite(config: Any, tag: str) -> Dict[str, Any]:
     if tag in satellites:
         norad = str(satellites.pop(tag))
         satellites_entry = 'removed'
-    entry_re = _almanac_entry_re(tag)
-    fields = _loopdata_fields(config)
+    own_line = line is None
+    if own_line:
+        line = FieldsLine.from_config(config)
     fields_removed: List[str] = []
-    if fields is not None:
-        kept = [f for f in fields if not entry_re.match(f)]
-        fields_removed = [f for f in fields if entry_re.match(f)]
-        if fields_removed:
-            config['LoopData']['Include']['fields'] = kept
+    if line is not None:
+        fields_removed = line.remove_tag(tag)
+        if fields_removed and own_line:
+            line.write(config)
     name_entry = 'absent'
     try:
         almanac_names = config['StdReport']['Defaults']['Almanac']
@@ -805,8 +1189,8 @@ def remove_satellite_conf(config_path: str, output_path: str,
     return report
 
 
-def add_comet(config: Any, tag: str, designation: str,
-              name: Optional[str] = None) -> Dict[str, Any]:
+def add_comet(config: Any, tag: str, designation: str, name: Optional[str] = None,
+              line: Optional[FieldsLine] = None) -> Dict[str, Any]:
     """Converge config (a ConfigObj) to carry comet tag = designation: the
     [Skyfield] [[Comets]] entry (added, or updated when the designation
     differs -- the invocation is authoritative), the six fields entries
@@ -817,7 +1201,9 @@ def add_comet(config: Any, tag: str, designation: str,
     reserved tag, a malformed MPC designation, or a configuration with no
     [LoopData] [[Include]] fields entry.  Returns a report dict:
     'comets_entry'/'name_entry' statuses, 'previous_designation',
-    'fields_added' and human-readable 'hints'."""
+    'fields_added' and human-readable 'hints'.  Given line, the fields
+    are appended to that model of config's fields line instead, and the
+    caller writes it back (see add_satellite)."""
     _validate_comet_tag(tag, adding=True)
     if not _COMET_DESIGNATION_RE.match(designation):
         raise ValueError("MPC designation '%s' must be a numbered periodic "
@@ -832,8 +1218,10 @@ def add_comet(config: Any, tag: str, designation: str,
                          "weewx-skyfield installer default); satellites "
                          "and comets share the almanac.<tag> namespace, so "
                          "choose another tag." % tag)
-    fields = _loopdata_fields(config)
-    if fields is None:
+    own_line = line is None
+    if own_line:
+        line = FieldsLine.from_config(config)
+    if line is None:
         raise ValueError('The configuration has no [LoopData] [[Include]] '
                          'fields entry.  Install weewx-loopdata and run '
                          '--migrate-loopdata-fields first; --add-comet '
@@ -855,10 +1243,9 @@ def add_comet(config: Any, tag: str, designation: str,
         previous_designation = str(previous)
         comets[tag] = designation
         comets_entry = 'updated'
-    present = set(fields)
-    fields_added = [f for f in comet_fields(tag) if f not in present]
-    if fields_added:
-        config['LoopData']['Include']['fields'] = fields + fields_added
+    fields_added = line.add(comet_fields(tag))
+    if fields_added and own_line:
+        line.write(config)
     if 'StdReport' not in config:
         config['StdReport'] = {}
     defaults = config['StdReport'].get('Defaults', {})
@@ -895,7 +1282,8 @@ def add_comet(config: Any, tag: str, designation: str,
             'hints': hints}
 
 
-def remove_comet(config: Any, tag: str) -> Dict[str, Any]:
+def remove_comet(config: Any, tag: str,
+                 line: Optional[FieldsLine] = None) -> Dict[str, Any]:
     """Converge config (a ConfigObj) to carry no comet tag: deletes the
     [Skyfield] [[Comets]] entry, every fields entry reading the comet
     (almanac.<tag>.* in any spelling, almanac arguments included), and
@@ -903,7 +1291,9 @@ def remove_comet(config: Any, tag: str) -> Dict[str, Any]:
     is removed if present -- removing an already-absent comet is a no-op,
     not an error.  Returns a report dict: 'comets_entry'/'name_entry'
     statuses, the removed entry's 'designation', 'fields_removed' and
-    human-readable 'hints'."""
+    human-readable 'hints'.  Given line, the fields are removed from
+    that model of config's fields line instead, and the caller writes it
+    back (see add_satellite)."""
     _validate_comet_tag(tag, adding=False)
     hints: List[str] = []
     designation: Optional[str] = None
@@ -915,14 +1305,14 @@ def remove_comet(config: Any, tag: str) -> Dict[str, Any]:
     if tag in comets:
         designation = str(comets.pop(tag))
         comets_entry = 'removed'
-    entry_re = _almanac_entry_re(tag)
-    fields = _loopdata_fields(config)
+    own_line = line is None
+    if own_line:
+        line = FieldsLine.from_config(config)
     fields_removed: List[str] = []
-    if fields is not None:
-        kept = [f for f in fields if not entry_re.match(f)]
-        fields_removed = [f for f in fields if entry_re.match(f)]
-        if fields_removed:
-            config['LoopData']['Include']['fields'] = kept
+    if line is not None:
+        fields_removed = line.remove_tag(tag)
+        if fields_removed and own_line:
+            line.write(config)
     name_entry = 'absent'
     try:
         almanac_names = config['StdReport']['Defaults']['Almanac']
@@ -970,12 +1360,902 @@ def remove_comet_conf(config_path: str, output_path: str,
     return report
 
 
-if __name__ == '__main__':
 
+# ===============================================================================
+# The --batch machinery.
+#
+# Provisioning a dozen satellites one --add-satellite at a time parses and
+# rewrites weewx.conf a dozen times.  A batch applies every add and remove
+# to one in-memory configuration -- through the same add_satellite,
+# remove_satellite, add_comet and remove_comet above, so every rule and
+# every idempotency holds exactly as for single runs -- and writes once.
+# ===============================================================================
+
+# A batch line's verbs: the utility's own flags, without their dashes.
+_BATCH_VERBS = ('add-satellite', 'remove-satellite', 'add-comet', 'remove-comet')
+
+
+def parse_batch(text: str) -> List[Dict[str, Any]]:
+    """Parse a batch file: one operation per line, spelled as the
+    command-line flags are (the leading dashes optional, so a line can be
+    pasted from a command), shell-quoted, # comments and blank lines
+    ignored:
+
+        add-satellite zenit23088=23088 --name 'Zenit-2 23088'
+        --add-comet a3="C/2023 A3" --name=Tsuchinshan-ATLAS
+        remove-satellite tiangong
+
+    Returns a list of operations, each a dict of 'line' (1-based),
+    'verb', 'tag', 'value' (None for a removal) and 'name' (None unless
+    given).  Raises ValueError naming the first malformed line; tags and
+    values are checked when the operation is applied."""
+    import shlex
+    operations: List[Dict[str, Any]] = []
+    for number, line in enumerate(text.splitlines(), 1):
+        try:
+            words = shlex.split(line, comments=True)
+        except ValueError as e:
+            raise ValueError('line %d: %s' % (number, e))
+        if not words:
+            continue
+        verb = words[0].lstrip('-')
+        if verb not in _BATCH_VERBS:
+            raise ValueError("line %d: '%s' is not one of %s."
+                             % (number, words[0], ', '.join(_BATCH_VERBS)))
+        name: Optional[str] = None
+        rest: List[str] = []
+        i = 1
+        while i < len(words):
+            if words[i] == '--name' and i + 1 < len(words):
+                name = words[i + 1]
+                i += 2
+            elif words[i].startswith('--name='):
+                name = words[i][len('--name='):]
+                i += 1
+            else:
+                rest.append(words[i])
+                i += 1
+        adding = verb.startswith('add-')
+        if len(rest) != 1:
+            raise ValueError('line %d: %s takes exactly one %s.'
+                             % (number, verb, 'TAG=VALUE' if adding else 'TAG'))
+        if name is not None and not adding:
+            raise ValueError('line %d: --name only applies to add-satellite '
+                             'and add-comet.' % number)
+        value: Optional[str] = None
+        if adding:
+            tag, sep, value = rest[0].partition('=')
+            tag, value = tag.strip(), value.strip()
+            if not sep or not tag or not value:
+                raise ValueError('line %d: %s takes TAG=%s.'
+                                 % (number, verb,
+                                    'NORAD' if verb == 'add-satellite' else 'DESIGNATION'))
+        else:
+            tag = rest[0].strip()
+        operations.append({'line': number, 'verb': verb, 'tag': tag,
+                           'value': value, 'name': name})
+    return operations
+
+
+def apply_batch(config: Any, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Apply operations (as parse_batch returns them; 'line' optional) to
+    config (a ConfigObj), in order, each through add_satellite,
+    remove_satellite, add_comet or remove_comet -- so a later operation
+    sees every earlier one, and a tag added as a satellite is refused as
+    a comet further down.  Raises ValueError, prefixed with the
+    operation's line, at the first invalid operation: a malformed one
+    (not a dict, an unknown verb, no tag, an add with no value) before
+    anything is edited, one its function refuses with config partly
+    edited -- which is why apply_batch_conf writes nothing on an
+    error.  Returns one consolidated report: 'operations' (each
+    operation with its own 'report'), the net 'fields_added' and
+    'fields_removed' across the whole batch, and the 'hints', each given
+    once.  The fields line is parsed once, handed to every operation
+    and written back once, at the end."""
+    actions = {'add-satellite': add_satellite, 'remove-satellite': remove_satellite,
+               'add-comet': add_comet, 'remove-comet': remove_comet}
+    wheres: List[str] = []
+    for index, op in enumerate(operations, 1):
+        if not isinstance(op, dict):
+            raise ValueError('operation %d: %r is not an operation.' % (index, op))
+        where = 'line %s' % op['line'] if op.get('line') else 'operation %d' % index
+        verb = op.get('verb')
+        if verb not in actions:
+            raise ValueError("%s: '%s' is not one of %s."
+                             % (where, verb, ', '.join(_BATCH_VERBS)))
+        if not isinstance(op.get('tag'), str) or not op['tag']:
+            raise ValueError('%s: %s takes a TAG.' % (where, verb))
+        if verb.startswith('add-') and (not isinstance(op.get('value'), str)
+                                        or not op['value']):
+            raise ValueError('%s: %s takes TAG=%s.'
+                             % (where, verb,
+                                'NORAD' if verb == 'add-satellite' else 'DESIGNATION'))
+        if op.get('name') is not None and not isinstance(op['name'], str):
+            raise ValueError('%s: the name must be text.' % where)
+        wheres.append(where)
+    line = FieldsLine.from_config(config)
+    before = line.fields() if line is not None else []
+    done: List[Dict[str, Any]] = []
+    hints: List[str] = []
+    for where, op in zip(wheres, operations):
+        verb = op['verb']
+        try:
+            if verb.startswith('add-'):
+                report = actions[verb](config, op['tag'], op['value'], op.get('name'),
+                                       line=line)
+            else:
+                report = actions[verb](config, op['tag'], line=line)
+        except ValueError as e:
+            raise ValueError('%s: %s' % (where, e))
+        done.append(dict(op, report=report))
+        for hint in report['hints']:
+            if hint not in hints:
+                hints.append(hint)
+    after = line.fields() if line is not None else []
+    if after != before:
+        line.write(config)  # type: ignore[union-attr]
+    before_set, after_set = set(before), set(after)
+    return {'operations': done,
+            'fields_added': [f for f in after if f not in before_set],
+            'fields_removed': [f for f in before if f not in after_set],
+            'hints': hints}
+
+
+def apply_batch_conf(config_path: str, output_path: str,
+                     operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """apply_batch against the configuration at config_path: one parse,
+    every operation, and -- only when all of them succeed and together
+    they change something -- one atomic write to output_path (see
+    _write_conf_atomically).  Returns the consolidated report."""
     import configobj
-    import optparse
+    config = configobj.ConfigObj(config_path, file_error=True, encoding='utf-8')
+    before = config.dict()
+    report = apply_batch(config, operations)
+    if config.dict() != before:
+        _write_conf_atomically(config, config_path, output_path)
+    return report
+
+
+# ===============================================================================
+# The --fleet machinery.
+#
+# A site that runs dozens of stations upgrades them one config at a time:
+# a fresh interpreter, a fresh import and a fresh ConfigObj parse per
+# weewx.conf.  A fleet run resolves a directory or glob to its
+# configurations and hands each one -- the migration, or a list of
+# operations as apply_batch takes them -- to a worker in a process pool.
+# Every file is still its own edit: read once, changed in memory, backed
+# up and written atomically exactly as --in-place would, and a file that
+# fails (unreadable, unparseable, an operation refused) costs that file
+# alone.  A file the run would leave as it is is not written at all, so
+# no backup is made and a second run over a finished fleet is a no-op.
+# ===============================================================================
+
+def fleet_paths(spec: str) -> List[str]:
+    """The configurations a --fleet SPEC names, sorted: every *.conf file
+    directly in SPEC when it is a directory, else every file the glob
+    pattern SPEC matches (** recursing).  The utility's own backups and
+    temporary files are left out, even where the pattern would match
+    them."""
+    import glob
+    if os.path.isdir(spec):
+        spec = os.path.join(spec, '*.conf')
+    return sorted(p for p in glob.glob(spec, recursive=True)
+                  if os.path.isfile(p) and '.bak-celestial-' not in p
+                  and not os.path.basename(p).startswith('weewx.conf.celestial.'))
+
+
+def _fleet_one(task: Tuple[str, Optional[List[Dict[str, Any]]], bool]) -> Dict[str, Any]:
+    """One fleet member: migrate the configuration at path (operations
+    None) or apply operations to it (see apply_batch), then -- only when
+    that changed something -- back it up to path.bak-celestial-<version>
+    and rewrite it in place.  Never raises: a failure of any kind is the
+    entry's 'status' and 'error' -- in a process pool, an exception
+    escaping one file would end the whole run.  With reports, the entry carries the
+    migration's or apply_batch's own 'report' too."""
+    import configobj
+    import shutil
+    path, operations, reports = task
+    entry: Dict[str, Any] = {'config': path, 'status': 'failed', 'backup': None,
+                             'renamed': 0, 'dropped': 0, 'added': 0, 'removed': 0,
+                             'error': None}
+    try:
+        config = configobj.ConfigObj(path, file_error=True, encoding='utf-8')
+        before = config.dict()
+        if operations is None:
+            line = FieldsLine.from_config(config)
+            if line is None:
+                raise ValueError('no [LoopData] [[Include]] fields entry')
+            new_fields, report = migrate_loopdata_fields(line.fields(),
+                                                         _configured_satellites(config),
+                                                         _configured_comets(config))
+            config['LoopData']['Include']['fields'] = new_fields
+            entry.update(renamed=len(report['renamed']), dropped=len(report['dropped']),
+                         added=len(report['added']))
+        else:
+            report = apply_batch(config, operations)
+            entry.update(added=len(report['fields_added']),
+                         removed=len(report['fields_removed']))
+        if reports:
+            entry['report'] = report
+        if config.dict() == before:
+            entry['status'] = 'unchanged'
+            return entry
+        backup = path + '.bak-celestial-' + CELESTIAL_VERSION
+        if os.path.exists(backup):
+            raise ValueError('backup %s already exists; move it aside first' % backup)
+        shutil.copy2(path, backup)
+        entry['backup'] = backup
+        _write_conf_atomically(config, path, path)
+        entry['status'] = 'written'
+    except Exception as e:
+        entry['error'] = str(e) if isinstance(
+            e, (OSError, ValueError, configobj.ConfigObjError)) else '%s: %s' % (
+            type(e).__name__, e)
+    return entry
+
+
+def run_fleet(paths: List[str], operations: Optional[List[Dict[str, Any]]] = None,
+              jobs: Optional[int] = None, reports: bool = False) -> Dict[str, Any]:
+    """Migrate every configuration in paths (operations None), or apply
+    operations (see apply_batch) to each, in place -- see _fleet_one.
+    jobs is the process pool's size (None: one per CPU; 1: no pool).
+    Returns the consolidated report: 'operation', one entry per path in
+    'files' (its 'status' -- written, unchanged or failed -- its
+    'backup', its 'renamed', 'dropped', 'added' and 'removed' field
+    counts and its 'error' -- and, with reports, its full 'report'), and
+    the 'written', 'unchanged' and 'failed' totals."""
+    tasks = [(path, operations, reports) for path in paths]
+    if jobs == 1 or len(tasks) <= 1:
+        files = [_fleet_one(task) for task in tasks]
+    else:
+        import concurrent.futures
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            files = list(pool.map(_fleet_one, tasks))
+    return {'version': CELESTIAL_VERSION,
+            'operation': 'migrate-loopdata-fields' if operations is None else 'batch',
+            'files': files,
+            'written': sum(1 for f in files if f['status'] == 'written'),
+            'unchanged': sum(1 for f in files if f['status'] == 'unchanged'),
+            'failed': sum(1 for f in files if f['status'] == 'failed')}
+
+
+# ===============================================================================
+# The --estimate-feed machinery.
+#
+# Every entry on the fields line is a key in every loop-data.txt record,
+# and every open page fetches that record every refresh_rate seconds --
+# seventeen keys a satellite, six a comet.  On a metered uplink that is
+# the extension's whole running cost, and nothing says what it comes to.
+# This builds the record the configured line would produce and prices it:
+# its size plain and gzipped, the requests and bytes a day at the
+# report's refresh_rate for a given number of open pages, what each tag
+# contributes, and what the leaner choices would save.
+#
+# The record is weewx-loopdata's json object of the line's distinct
+# entries (a repeated entry is one key).  Its values are stand-ins shaped
+# by each entry's unit and rendition -- a raw epoch, a raw angle, a
+# labelled string -- unless a real loop-data.txt is given as a sample, in
+# which case the values it carries are measured instead, and an entry it
+# does not carry (one the almanac cannot serve) costs nothing.
+# ===============================================================================
+
+# The response headers a web server sends with each loop-data.txt, give
+# or take: paid on every request, gzipped or not.
+_FEED_HEADER_BYTES = 300
+
+
+def _feed_stand_in(entry: FieldEntry, index: int) -> Any:
+    """A value shaped like the one loopdata would write for entry: spread
+    by the golden ratio so neighbouring entries differ the way real
+    values do (which is what gzip sees)."""
+    u = (index * 0.6180339887498949) % 1.0
+    if entry.unit == 'unix_epoch':
+        value = 1.76e9 + u * 86400.0
+    elif entry.unit == 'second':
+        value = u * 86400.0
+    else:
+        value = u * 360.0
+    if entry.rendition in ('raw', 'json'):
+        return value
+    if entry.rendition == 'ordinal_compass':
+        return ('N', 'NNE', 'ENE', 'ESE', 'SSE', 'SSW', 'WSW', 'NW')[index % 8]
+    if entry.rendition == 'long_form':
+        return '%d hours, %d minutes, %d seconds' % (value // 3600 % 24, value // 60 % 60,
+                                                     value % 60)
+    if entry.rendition is not None:
+        return '%.1f' % value
+    return '%.1f\u00b0' % value
+
+
+def feed_refresh_rate(config: Any) -> float:
+    """The refresh_rate of the configuration's Celestial report (the
+    first [StdReport] section with skin = Celestial), or the skin's
+    default of 2 seconds."""
+    try:
+        for section in config['StdReport'].sections:
+            report = config['StdReport'][section]
+            if report.get('skin') == 'Celestial':
+                return float(report.get('Extras', {}).get('refresh_rate', 2))
+    except (KeyError, AttributeError, TypeError, ValueError):
+        pass
+    return 2.0
+
+
+def estimate_feed(fields: List[str], refresh_rate: float = 2.0, viewers: float = 1.0,
+                  satellites: Optional[List[str]] = None,
+                  comets: Optional[List[str]] = None,
+                  sample: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Price the loop-data.txt record fields would produce, fetched every
+    refresh_rate seconds by each of viewers open pages.  satellites and
+    comets are the configured tags (None: the installer defaults, as the
+    migrator assumes); sample, a parsed loop-data.txt, replaces the
+    stand-in values with measured ones.  Returns 'entries' (distinct
+    keys), 'record_bytes', 'gzip_bytes', 'requests_per_hour',
+    'bytes_per_day', 'tags' (one entry per almanac tag -- or root, for
+    other entries -- with its 'kind', 'entries', 'bytes', 'share' and
+    'bytes_per_day', largest first), 'unread' (the almanac entries the
+    Celestial page does not read) and 'savings', the bytes a day each
+    leaner choice would save: 'gzip' (the web server compressing
+    loop-data.txt), 'unread' (dropping those entries, if no other page
+    reads them), 'refresh_rate' (doubling it) and 'per_satellite' (the
+    average satellite dropped)."""
+    import gzip
+    import json
+    sat_tags = list(_INSTALLER_DEFAULT_SATELLITES if satellites is None else satellites)
+    comet_tags = list(_INSTALLER_DEFAULT_COMETS if comets is None else comets)
+    read = set(_MIGRATION_BASE_FIELDS)
+    for tag in sat_tags:
+        read.update(satellite_fields(tag))
+    for tag in comet_tags:
+        read.update(comet_fields(tag))
+    record: Dict[str, Any] = {}
+    for index, text in enumerate(dict.fromkeys(fields)):
+        if sample is None:
+            record[text] = _feed_stand_in(parse_field(text), index)
+        elif text in sample:
+            record[text] = sample[text]
+    body = json.dumps(record).encode('utf-8')
+    packed = gzip.compress(body, 6)
+    requests_per_day = viewers * 86400.0 / refresh_rate
+    groups: Dict[str, Dict[str, Any]] = {}
+    unread: List[str] = []
+    unread_bytes = 0
+    for text, value in record.items():
+        # A key's share of the record: '"key": value' and the ', ' after
+        # it -- the same length as '{"key": value}'.
+        size = len(json.dumps({text: value}).encode('utf-8'))
+        tag = _almanac_tag(text)
+        group = tag if tag is not None else parse_field(text).root
+        if group not in groups:
+            groups[group] = {'tag': group, 'entries': 0, 'bytes': 0,
+                             'kind': ('satellite' if group in sat_tags
+                                      else 'comet' if group in comet_tags
+                                      else 'almanac' if tag is not None else 'other')}
+        groups[group]['entries'] += 1
+        groups[group]['bytes'] += size
+        if tag is not None and text not in read:
+            unread.append(text)
+            unread_bytes += size
+    tags = sorted(groups.values(), key=lambda g: (-g['bytes'], g['tag']))
+    for g in tags:
+        g['share'] = round(100.0 * g['bytes'] / max(1, len(body)), 1)
+        g['bytes_per_day'] = round(g['bytes'] * requests_per_day)
+    per_request = len(body) + _FEED_HEADER_BYTES
+    sat_bytes = [g['bytes'] for g in tags if g['kind'] == 'satellite']
+    return {'entries': len(record),
+            'record_bytes': len(body),
+            'gzip_bytes': len(packed),
+            'refresh_rate': refresh_rate,
+            'viewers': viewers,
+            'requests_per_hour': round(viewers * 3600.0 / refresh_rate, 1),
+            'bytes_per_day': round(per_request * requests_per_day),
+            'tags': tags,
+            'unread': unread,
+            'savings': {
+                'gzip': round((len(body) - len(packed)) * requests_per_day),
+                'unread': round(unread_bytes * requests_per_day),
+                'refresh_rate': round(per_request * requests_per_day / 2.0),
+                'per_satellite': (round(sum(sat_bytes) / len(sat_bytes) * requests_per_day)
+                                  if sat_bytes else 0)}}
 
-    import weeutil.logger
+
+# ===============================================================================
+# The --suggest-satellites machinery.
+#
+# add_satellite warns that every [[Satellites]] entry costs a CelesTrak
+# fetch and seventeen per-packet fields, but it cannot say which satellites
+# are worth that.  This propagates every object in a local TLE catalog
+# (CelesTrak's "visual" or "active" sets, thousands of objects) across the
+# next few days for the configured station, and ranks them by the passes
+# an observer could actually see: the satellite above 10 degrees, in
+# sunlight, against a sky at least civil-twilight dark.  The top of the
+# ranking can then be written through apply_batch, in one atomic edit.
+#
+# The propagation is sgp4's own (the library weewx-skyfield's Skyfield
+# uses), driven over whole arrays of satellites and times, with NumPy
+# doing the geometry and a process pool splitting the catalog.  Both are
+# imported only here: they are present wherever weewx-skyfield is, and
+# nothing else in this module needs them.  The geometry is deliberately
+# coarse -- a low-precision sun, a cylindrical shadow, one sample a
+# minute -- which is plenty to tell a good satellite from a poor one and
+# no substitute for weewx-skyfield's own pass predictions.
+# ===============================================================================
+
+# A visible sample: satellite at least this high, sun at most this high.
+_SUGGEST_MIN_ALT = 10.0
+_SUGGEST_SUN_ALT = -6.0
+# Objects slower than this (revolutions a day) are above low earth orbit:
+# too far away to be naked-eye sights, however long they hang sunlit in a
+# dark sky, so they are not propagated at all.
+_SUGGEST_MIN_MEAN_MOTION = 11.25
+# Satellites per process-pool task.
+_SUGGEST_CHUNK = 128
+
+_EARTH_RADIUS_KM = 6378.137
+_EARTH_FLATTENING = 1.0 / 298.257223563
+
+
+def read_tle_catalog(text: str) -> List[Dict[str, Any]]:
+    """The satellites in a TLE catalog, in file order: two-line sets, each
+    optionally preceded by a name line (CelesTrak's three-line format,
+    with or without the leading '0 ').  Returns dicts of 'name' (the
+    catalog number when the set has no name line), 'norad', 'line1',
+    'line2' and 'mean_motion' (revolutions a day).  A set whose two lines
+    disagree on the catalog number, or whose number is not plain digits
+    (the alpha-5 numbers weewx-skyfield cannot be configured with), is
+    skipped, as is a number seen before."""
+    lines = [line.rstrip() for line in text.splitlines()]
+    satellites: List[Dict[str, Any]] = []
+    seen = set()
+    for i in range(len(lines) - 1):
+        line1, line2 = lines[i], lines[i + 1]
+        if not (line1.startswith('1 ') and line2.startswith('2 ')
+                and len(line1) >= 63 and len(line2) >= 63):
+            continue
+        norad = line1[2:7].strip()
+        if not norad.isdigit() or line2[2:7].strip() != norad or norad in seen:
+            continue
+        try:
+            mean_motion = float(line2[52:63])
+        except ValueError:
+            continue
+        name = norad
+        if i > 0 and lines[i - 1].strip() and not lines[i - 1].startswith(('1 ', '2 ')):
+            name = lines[i - 1].strip()
+            if name.startswith('0 '):
+                name = name[2:].strip()
+        seen.add(norad)
+        satellites.append({'name': name, 'norad': norad, 'line1': line1,
+                           'line2': line2, 'mean_motion': mean_motion})
+    return satellites
+
+
+def station_location(config: Any) -> Tuple[float, float, float]:
+    """(latitude, longitude, altitude in meters) from config's [Station],
+    the altitude in whichever unit it names (foot or meter).  Raises
+    ValueError when the configuration has no usable location."""
+    try:
+        station = config['Station']
+        latitude = float(station['latitude'])
+        longitude = float(station['longitude'])
+        altitude = station.get('altitude', ['0', 'meter'])
+        if isinstance(altitude, str):
+            altitude = [a.strip() for a in altitude.split(',')]
+        meters = float(altitude[0])
+        if len(altitude) > 1 and altitude[1].strip().lower() in ('foot', 'feet'):
+            meters *= 0.3048
+    except (KeyError, IndexError, TypeError, ValueError):
+        raise ValueError('The configuration has no usable [Station] latitude, '
+                         'longitude and altitude to predict passes for.')
+    return latitude, longitude, meters
+
+
+def _suggest_geometry(latitude: float, longitude: float, altitude_m: float,
+                      start_ts: float, days: float, step: float) -> Dict[str, Any]:
+    """Everything about the sampling that does not depend on a satellite:
+    the sample times at which the station's sky is dark (as julian date
+    whole and fractional parts, and their index into the full sampling,
+    so runs of consecutive samples can be told apart), the earth's
+    rotation angle and the sun's direction at each, and the station's
+    position and zenith.  Computed once, then shared by every task."""
+    import numpy as np
+    count = int(days * 86400.0 / step) + 1
+    ts = start_ts + step * np.arange(count)
+    jd = 2440587.5 + ts / 86400.0
+    whole = np.floor(jd)
+    n = jd - 2451545.0
+    # The earth's rotation (GMST; TEME's x axis, to the same precision)
+    # and a low-precision sun (the Astronomical Almanac's, good to about
+    # a hundredth of a degree), both in the equatorial frame.
+    gmst = np.radians((280.46061837 + 360.98564736629 * n) % 360.0)
+    g = np.radians((357.528 + 0.9856003 * n) % 360.0)
+    ecl = np.radians((280.460 + 0.9856474 * n) % 360.0
+                     + 1.915 * np.sin(g) + 0.020 * np.sin(2 * g))
+    obliquity = np.radians(23.439 - 0.0000004 * n)
+    sun = np.stack([np.cos(ecl), np.cos(obliquity) * np.sin(ecl),
+                    np.sin(obliquity) * np.sin(ecl)], axis=-1)
+    phi, lam = np.radians(latitude), np.radians(longitude)
+    e2 = _EARTH_FLATTENING * (2 - _EARTH_FLATTENING)
+    normal = _EARTH_RADIUS_KM / np.sqrt(1 - e2 * np.sin(phi) ** 2)
+    h = altitude_m / 1000.0
+    station = np.array([(normal + h) * np.cos(phi) * np.cos(lam),
+                        (normal + h) * np.cos(phi) * np.sin(lam),
+                        (normal * (1 - e2) + h) * np.sin(phi)])
+    zenith = np.array([np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam),
+                       np.sin(phi)])
+    # The sun's altitude, from its direction rotated into the earth's
+    # frame; only the dark samples are ever propagated.
+    sun_x = np.cos(gmst) * sun[:, 0] + np.sin(gmst) * sun[:, 1]
+    sun_y = -np.sin(gmst) * sun[:, 0] + np.cos(gmst) * sun[:, 1]
+    sun_up = sun_x * zenith[0] + sun_y * zenith[1] + sun[:, 2] * zenith[2]
+    dark = np.flatnonzero(sun_up < np.sin(np.radians(_SUGGEST_SUN_ALT)))
+    return {'index': dark, 'jd': whole[dark], 'fr': (jd - whole)[dark],
+            'gmst': gmst[dark], 'sun': sun[dark], 'station': station,
+            'zenith': zenith, 'step': step}
+
+
+def _suggest_chunk(task: Tuple[List[Tuple[str, str]], Dict[str, Any]]
+                   ) -> List[Optional[Dict[str, Any]]]:
+    """The visible passes of a chunk of satellites (their TLE line pairs)
+    over geometry's dark samples: one dict per satellite -- 'passes',
+    'minutes' visible, 'best_alt' (the highest pass's peak, degrees) and
+    'score' -- or None for a satellite sgp4 cannot propagate.  A pass is
+    a run of consecutive visible samples; the score sums, over the
+    passes, the sine of each one's peak altitude, so a pass overhead
+    counts 1 and one skimming the 10-degree floor counts about a sixth.
+    A process-pool task, so module level and given plain arguments."""
+    import numpy as np
+    from sgp4.api import Satrec, SatrecArray
+    pairs, geometry = task
+    results: List[Optional[Dict[str, Any]]] = [None] * len(pairs)
+    satrecs, where = [], []
+    for k, (line1, line2) in enumerate(pairs):
+        try:
+            satrecs.append(Satrec.twoline2rv(line1, line2))
+            where.append(k)
+        except Exception:
+            pass
+    if not satrecs or not len(geometry['jd']):
+        for k in where:
+            results[k] = {'passes': 0, 'minutes': 0.0, 'best_alt': None, 'score': 0.0}
+        return results
+    error, r, _ = SatrecArray(satrecs).sgp4(geometry['jd'], geometry['fr'])
+    # TEME into the earth-fixed frame: one rotation about the pole.
+    cos_g, sin_g = np.cos(geometry['gmst']), np.sin(geometry['gmst'])
+    x = cos_g * r[..., 0] + sin_g * r[..., 1]
+    y = -sin_g * r[..., 0] + cos_g * r[..., 1]
+    station, zenith = geometry['station'], geometry['zenith']
+    dx, dy, dz = x - station[0], y - station[1], r[..., 2] - station[2]
+    up = (dx * zenith[0] + dy * zenith[1] + dz * zenith[2]) / np.sqrt(dx * dx + dy * dy + dz * dz)
+    altitude = np.degrees(np.arcsin(np.clip(up, -1.0, 1.0)))
+    # In the earth's shadow: behind the earth from the sun, and within
+    # one earth radius of the sun-earth line (a cylinder, no penumbra).
+    sun = geometry['sun']
+    along = np.einsum('stk,tk->st', r, sun)
+    across = np.einsum('stk,stk->st', r, r) - along * along
+    sunlit = (along > 0) | (across > _EARTH_RADIUS_KM ** 2)
+    visible = (error == 0) & sunlit & (altitude >= _SUGGEST_MIN_ALT)
+    index = geometry['index']
+    minutes_per_sample = geometry['step'] / 60.0
+    for row, k in enumerate(where):
+        seen = visible[row]
+        if not seen.any():
+            results[k] = {'passes': 0, 'minutes': 0.0, 'best_alt': None, 'score': 0.0}
+            continue
+        samples = index[seen]
+        starts = np.flatnonzero(np.r_[True, np.diff(samples) > 1])
+        peaks = np.maximum.reduceat(altitude[row][seen], starts)
+        results[k] = {'passes': int(len(starts)),
+                      'minutes': round(float(seen.sum()) * minutes_per_sample, 1),
+                      'best_alt': round(float(peaks.max()), 1),
+                      'score': round(float(np.sin(np.radians(peaks)).sum()), 3)}
+    return results
+
+
+def rank_satellites(satellites: List[Dict[str, Any]], latitude: float,
+                    longitude: float, altitude_m: float, start_ts: float,
+                    days: float = 7.0, step: float = 60.0,
+                    jobs: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Rank satellites (as read_tle_catalog returns them) by their visible
+    passes from the given station over days from start_ts, sampled every
+    step seconds: best score first, then most passes, then catalog
+    number.  Each entry is the satellite's dict plus 'passes', 'minutes',
+    'best_alt' and 'score' (see _suggest_chunk); satellites above low
+    earth orbit, satellites sgp4 cannot propagate and satellites with no
+    visible pass are left out.  jobs is the process pool's size (None:
+    one per CPU; 1: no pool).  Raises ImportError when sgp4 or NumPy is
+    missing."""
+    import numpy  # noqa: F401 -- fail here, before any pool starts
+    import sgp4.api  # noqa: F401
+    candidates = [s for s in satellites if s['mean_motion'] >= _SUGGEST_MIN_MEAN_MOTION]
+    geometry = _suggest_geometry(latitude, longitude, altitude_m, start_ts, days, step)
+    tasks = [([(s['line1'], s['line2']) for s in candidates[i:i + _SUGGEST_CHUNK]], geometry)
+             for i in range(0, len(candidates), _SUGGEST_CHUNK)]
+    if jobs == 1 or len(tasks) <= 1:
+        chunks = [_suggest_chunk(task) for task in tasks]
+    else:
+        import concurrent.futures
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            chunks = list(pool.map(_suggest_chunk, tasks))
+    ranked: List[Dict[str, Any]] = []
+    for satellite, result in zip(candidates, (r for chunk in chunks for r in chunk)):
+        if result is not None and result['passes']:
+            ranked.append(dict(satellite, **result))
+    ranked.sort(key=lambda s: (-s['score'], -s['passes'], int(s['norad'])))
+    return ranked
+
+
+def suggested_satellite_tag(name: str, norad: str, taken: set) -> str:
+    """A tag for a catalog satellite: its name as a lowercase identifier
+    ('ISS (ZARYA)' -> iss_zarya, at most 24 characters), with the catalog
+    number appended when that is taken, reserved or not an identifier at
+    all -- never sat_<number>, weewx-skyfield's alternate spelling."""
+    base = re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')[:24].rstrip('_')
+    return _suggested_tag((base, '%s_%s' % (base, norad), 'norad%s' % norad), taken)
+
+
+def _suggested_tag(candidates: Tuple[str, ...], taken: set) -> str:
+    """The first candidate add_satellite and add_comet would both accept
+    and nothing has taken; failing all, the last one numbered apart."""
+    for tag in candidates:
+        if (_TAG_RE.match(tag) and tag not in taken and tag not in _RESERVED_TAGS
+                and not re.match(r'sat_[0-9]+$', tag)):
+            return tag
+    number = 2
+    while '%s_%d' % (candidates[-1], number) in taken:
+        number += 1
+    return '%s_%d' % (candidates[-1], number)
+
+
+def suggestion_operations(config: Any, ranked: List[Dict[str, Any]],
+                          top: int) -> List[Dict[str, Any]]:
+    """The apply_batch operations that configure the first top entries of
+    ranked, each under a suggested_satellite_tag and its catalog name.
+    A satellite the configuration already carries (by catalog number,
+    under whatever tag) counts toward top and is left alone."""
+    satellites = {}
+    try:
+        satellites = dict(config['Skyfield']['Satellites'])
+    except (KeyError, AttributeError):
+        pass
+    configured = set(str(v) for v in satellites.values())
+    taken = set(satellites) | _other_family_tags(config, 'Comets', _INSTALLER_DEFAULT_COMETS)
+    operations: List[Dict[str, Any]] = []
+    for satellite in ranked[:top]:
+        if satellite['norad'] in configured:
+            continue
+        tag = suggested_satellite_tag(satellite['name'], satellite['norad'], taken)
+        taken.add(tag)
+        operations.append({'verb': 'add-satellite', 'tag': tag,
+                           'value': satellite['norad'], 'name': satellite['name']})
+    return operations
+
+
+# ===============================================================================
+# The --import-comets machinery.
+#
+# add_comet takes one designation at a time, and every configured comet
+# costs six fields in every loop packet, however faint it is.  This reads
+# a local copy of the Minor Planet Center's comet elements (CometEls.txt,
+# the very file weewx-skyfield fetches), predicts every comet's magnitude
+# across the coming weeks, and converges [[Comets]] on the comets brighter
+# than a threshold: the bright ones added, the configured ones that have
+# faded removed -- through apply_batch, so every rule of add_comet and
+# remove_comet holds and the configuration is written once.
+#
+# The prediction is the MPC's own total-magnitude law, m = H + 5 log(delta)
+# + 2.5 K log(r), over two-body orbits from the file's elements and a
+# low-precision earth, for every comet and every day at once in NumPy
+# (imported here only, like --suggest-satellites' sgp4).  Comets are
+# notoriously unruly -- outbursts, fragmentation, a dust tail lit from
+# behind -- so this is the MPC's expectation, no more.
+# ===============================================================================
+
+# The Gaussian gravitational constant (radians a day) and the obliquity
+# of the ecliptic at J2000 (degrees).
+_GAUSS_K = 0.01720209895
+_J2000_OBLIQUITY = 23.4392911
+
+# The name column: '1P/Halley', '73P-BA/Schwassmann-Wachmann',
+# 'C/2023 A3 (Tsuchinshan-ATLAS)', 'P/2010 H2 (Vales)'.
+_MPC_NUMBERED_RE = re.compile(r'(\d{1,4}[PDCXAI](?:-[A-Z0-9]+)?)/(.*)$')
+_MPC_PROVISIONAL_RE = re.compile(
+    r'([PCDXAI]/\d{4} [A-Z]{1,2}\d*(?:-[A-Z0-9]+)?)\s*(?:\((.*)\))?$')
+
+
+def _julian_date(year: int, month: int, day: float) -> float:
+    """The julian date of a Gregorian calendar date with a fractional
+    day (Meeus, Astronomical Algorithms, 7.1)."""
+    if month <= 2:
+        year, month = year - 1, month + 12
+    a = year // 100
+    return (int(365.25 * (year + 4716)) + int(30.6001 * (month + 1))
+            + day + 2 - a + a // 4 - 1524.5)
+
+
+def read_comet_elements(text: str) -> List[Dict[str, Any]]:
+    """The comets in an MPC CometEls.txt, in file order.  Returns dicts of
+    'designation' (as [[Comets]] takes it: '1P', 'C/2023 A3'), 'name'
+    (the comet's name, its designation when it has none), 'perihelion'
+    (julian date), 'q' (perihelion distance, AU), 'e', 'peri', 'node' and
+    'incl' (degrees, J2000 ecliptic), and the magnitude law's 'h' and 'k'
+    (None when the MPC gives none).  A line that does not parse, or whose
+    designation add_comet would refuse, is skipped, as is a designation
+    seen before."""
+    comets: List[Dict[str, Any]] = []
+    seen = set()
+    for line in text.splitlines():
+        label = line[102:158].strip()
+        numbered = _MPC_NUMBERED_RE.match(label)
+        provisional = None if numbered else _MPC_PROVISIONAL_RE.match(label)
+        if numbered:
+            designation, name = numbered.group(1), numbered.group(2).strip()
+        elif provisional:
+            designation, name = provisional.group(1), (provisional.group(2) or '').strip()
+        else:
+            continue
+        if not _COMET_DESIGNATION_RE.match(designation) or designation in seen:
+            continue
+        try:
+            elements = {
+                'perihelion': _julian_date(int(line[14:18]), int(line[19:21]),
+                                           float(line[22:29])),
+                'q': float(line[30:39]), 'e': float(line[41:49]),
+                'peri': float(line[51:59]), 'node': float(line[61:69]),
+                'incl': float(line[71:79])}
+        except ValueError:
+            continue
+        magnitude: Dict[str, Optional[float]] = {'h': None, 'k': None}
+        try:
+            magnitude = {'h': float(line[91:95]), 'k': float(line[96:100])}
+        except ValueError:
+            pass
+        seen.add(designation)
+        comets.append(dict(elements, designation=designation,
+                           name=name or designation, **magnitude))
+    return comets
+
+
+def predict_comet_magnitudes(comets: List[Dict[str, Any]], start_ts: float,
+                             days: float = 30.0) -> List[Dict[str, Any]]:
+    """Each comet (as read_comet_elements returns them) with its brightest
+    predicted magnitude over days from start_ts, sampled daily, as 'mag'
+    (rounded to a tenth) and the unix time it is reached as 'mag_ts';
+    both None for a comet without a magnitude law.  Every comet and every
+    day in one set of array operations: elliptic, parabolic and
+    hyperbolic orbits each solved by their own anomaly equation, the
+    earth from a low-precision sun.  Raises ImportError when NumPy is
+    missing."""
+    import numpy as np
+    known = [c for c in comets if c['h'] is not None]
+    out = [dict(c, mag=None, mag_ts=None) for c in comets]
+    if not known:
+        return out
+    ts = start_ts + 86400.0 * np.arange(int(days) + 1)
+    jd = 2440587.5 + ts / 86400.0
+
+    def col(key):
+        return np.array([c[key] for c in known], dtype=float)[:, None]
+
+    q, e = col('q'), col('e')
+    dt = jd[None, :] - col('perihelion')
+    shape = np.broadcast(q, dt).shape
+    nu = np.zeros(shape)
+    r = np.zeros(shape)
+    ell = np.broadcast_to(e < 0.99999, shape)
+    hyp = np.broadcast_to(e > 1.00001, shape)
+    par = ~(ell | hyp)
+    # Ellipses: Kepler's equation, Newton's method from E = M, or from
+    # E = pi for the eccentric ones (which converges for every
+    # eccentricity below one).
+    if ell.any():
+        a = np.broadcast_to(q / (1 - np.minimum(e, 0.99999)), shape)[ell]
+        ee = np.broadcast_to(e, shape)[ell]
+        m = np.remainder(_GAUSS_K * dt[ell] / a ** 1.5 + np.pi, 2 * np.pi) - np.pi
+        big_e = np.where(ee < 0.8, m, np.pi * np.sign(m))
+        for _ in range(50):
+            big_e = big_e - (big_e - ee * np.sin(big_e) - m) / (1 - ee * np.cos(big_e))
+        r[ell] = a * (1 - ee * np.cos(big_e))
+        nu[ell] = 2 * np.arctan2(np.sqrt(1 + ee) * np.sin(big_e / 2),
+                                 np.sqrt(1 - ee) * np.cos(big_e / 2))
+    # Parabolas, and the orbits too near one to tell apart: Barker's
+    # equation, solved outright.
+    if par.any():
+        qq = np.broadcast_to(q, shape)[par]
+        w = 3 * _GAUSS_K * dt[par] / np.sqrt(2 * qq ** 3)
+        y = np.cbrt(w / 2 + np.sqrt(w * w / 4 + 1))
+        s = y - 1 / y
+        r[par] = qq * (1 + s * s)
+        nu[par] = 2 * np.arctan(s)
+    # Hyperbolas: the hyperbolic Kepler equation, Newton's method from
+    # Danby's starting value.
+    if hyp.any():
+        a = np.broadcast_to(q / (np.maximum(e, 1.00001) - 1), shape)[hyp]
+        ee = np.broadcast_to(e, shape)[hyp]
+        m = _GAUSS_K * dt[hyp] / a ** 1.5
+        big_h = np.sign(m) * np.log(2 * np.abs(m) / ee + 1.8)
+        for _ in range(50):
+            big_h = big_h - (ee * np.sinh(big_h) - big_h - m) / (ee * np.cosh(big_h) - 1)
+        r[hyp] = a * (ee * np.cosh(big_h) - 1)
+        nu[hyp] = 2 * np.arctan2(np.sqrt(ee + 1) * np.sinh(big_h / 2),
+                                 np.sqrt(ee - 1) * np.cosh(big_h / 2))
+    # Heliocentric, J2000 ecliptic.
+    node, incl = np.radians(col('node')), np.radians(col('incl'))
+    u = np.radians(col('peri')) + nu
+    x = r * (np.cos(node) * np.cos(u) - np.sin(node) * np.sin(u) * np.cos(incl))
+    y = r * (np.sin(node) * np.cos(u) + np.cos(node) * np.sin(u) * np.cos(incl))
+    z = r * np.sin(u) * np.sin(incl)
+    # The earth: opposite the sun (the Astronomical Almanac's low-precision
+    # sun, in the ecliptic of date -- a third of a degree from J2000's
+    # this century, which no magnitude notices).
+    n = jd - 2451545.0
+    g = np.radians((357.528 + 0.9856003 * n) % 360.0)
+    ecl = np.radians((280.460 + 0.9856474 * n) % 360.0
+                     + 1.915 * np.sin(g) + 0.020 * np.sin(2 * g))
+    distance = 1.00014 - 0.01671 * np.cos(g) - 0.00014 * np.cos(2 * g)
+    delta = np.sqrt((x + distance * np.cos(ecl)) ** 2
+                    + (y + distance * np.sin(ecl)) ** 2 + z ** 2)
+    mag = col('h') + 5 * np.log10(delta) + 2.5 * col('k') * np.log10(r)
+    best = np.argmin(mag, axis=1)
+    rows = np.arange(len(known))
+    brightest = {c['designation']: (round(float(mag[i, best[i]]), 1), float(ts[best[i]]))
+                 for i, c in zip(rows, known)}
+    for c in out:
+        if c['designation'] in brightest:
+            c['mag'], c['mag_ts'] = brightest[c['designation']]
+    return out
+
+
+def suggested_comet_tag(name: str, designation: str, taken: set) -> str:
+    """A tag for a catalog comet: its name as a lowercase identifier
+    ('Tsuchinshan-ATLAS' -> tsuchinshan_atlas, at most 24 characters),
+    else its designation ('C/2023 A3' -> c_2023_a3, '1P' -> comet_1p)."""
+    slug = re.sub(r'[^a-z0-9]+', '_', designation.lower()).strip('_')
+    if not slug[:1].isalpha():
+        slug = 'comet_' + slug
+    base = re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')[:24].rstrip('_')
+    return _suggested_tag((base, slug, '%s_%s' % (base, slug)), taken)
+
+
+def comet_import_operations(config: Any, predicted: List[Dict[str, Any]],
+                            max_mag: float) -> List[Dict[str, Any]]:
+    """The apply_batch operations that converge [Skyfield] [[Comets]] on
+    max_mag: an add-comet (under a suggested_comet_tag, named by the
+    MPC's name) for every predicted comet at least that bright and not
+    yet configured, then a remove-comet for every configured comet
+    predicted fainter.  A configured comet the predictions do not cover
+    -- not in the file, or without a magnitude law -- is left alone."""
+    comets: Dict[str, Any] = {}
+    try:
+        comets = dict(config['Skyfield']['Comets'])
+    except (KeyError, AttributeError):
+        pass
+    by_designation = {str(v): t for t, v in comets.items()}
+    taken = (set(comets) | _other_family_tags(config, 'Satellites',
+                                              _INSTALLER_DEFAULT_SATELLITES))
+    adds: List[Dict[str, Any]] = []
+    removes: List[Dict[str, Any]] = []
+    for comet in sorted((c for c in predicted if c['mag'] is not None),
+                        key=lambda c: c['mag']):
+        configured = by_designation.get(comet['designation'])
+        if comet['mag'] <= max_mag and configured is None:
+            tag = suggested_comet_tag(comet['name'], comet['designation'], taken)
+            taken.add(tag)
+            adds.append({'verb': 'add-comet', 'tag': tag,
+                         'value': comet['designation'], 'name': comet['name']})
+        elif comet['mag'] > max_mag and configured is not None:
+            removes.append({'verb': 'remove-comet', 'tag': configured,
+                            'value': None, 'name': None})
+    return adds + removes
+
+
+if __name__ == '__main__':
+
+    # Imports are made by the subcommand that needs them: --version and
+    # --print-fields-value are run across whole fleets in loops, and pay
+    # only for the interpreter, optparse and (for the latter) configobj.
+    import optparse
 
     class CantOpenConfigFile(Exception):
         pass
@@ -984,25 +2264,29 @@ if __name__ == '__main__':
         pass
 
     def get_configuration(config_file):
+        import configobj
         try:
             config_dict = configobj.ConfigObj(config_file, file_error=True, encoding='utf-8')
         except IOError:
             raise CantOpenConfigFile("Unable to open configuration file %s" % config_file)
         except configobj.ConfigObjError:
-            raise CantParseConfigFile("Error parsing configuration file %s", config_file)
+            raise CantParseConfigFile("Error parsing configuration file %s" % config_file)
 
         return config_dict
 
-    weeutil.logger.setup('celestial', {})
-    logging.getLogger().addHandler(logging.StreamHandler())
-
     usage = """Usage: python -m user.celestial --help
        python -m user.celestial --version
        python -m user.celestial --migrate-loopdata-fields [--config=<weewx-config-file>] (--output=FILE | --in-place | --print-fields-value)
        python -m user.celestial --add-satellite TAG=NORAD [--name=NAME] [--config=<weewx-config-file>] (--output=FILE | --in-place)
        python -m user.celestial --remove-satellite TAG [--config=<weewx-config-file>] (--output=FILE | --in-place)
        python -m user.celestial --add-comet TAG=DESIGNATION [--name=NAME] [--config=<weewx-config-file>] (--output=FILE | --in-place)
-       python -m user.celestial --remove-comet TAG [--config=<weewx-config-file>] (--output=FILE | --in-place)"""
+       python -m user.celestial --remove-comet TAG [--config=<weewx-config-file>] (--output=FILE | --in-place)
+       python -m user.celestial --batch FILE [--config=<weewx-config-file>] (--output=FILE | --in-place)
+       python -m user.celestial (--migrate-loopdata-fields | --add-satellite ... | --remove-satellite ... | --add-comet ... | --remove-comet ... | --batch FILE) --fleet DIR|GLOB [--jobs=N] --in-place
+       python -m user.celestial --estimate-feed [--viewers=N] [--sample=loop-data.txt] [--config=<weewx-config-file>]
+       python -m user.celestial --suggest-satellites CATALOG.tle [--days=N] [--top=K] [--jobs=N] [--config=<weewx-config-file>] [--output=FILE | --in-place]
+       python -m user.celestial --import-comets CometEls.txt --max-mag=M [--days=N] [--config=<weewx-config-file>] [--output=FILE | --in-place]
+       (add --json to any of these for one machine-readable report on stdout)"""
 
     parser = optparse.OptionParser(usage=usage)
     parser.add_option('--version', action='store_true',
@@ -1022,7 +2306,7 @@ if __name__ == '__main__':
                            'exactly one of --output, --in-place or --print-fields-value.')
     parser.add_option('--add-satellite', dest='add_satellite', type=str, metavar='TAG=NORAD',
                       help='Add an earth satellite to the configuration, one per run: writes '
-                           'TAG = NORAD under [Skyfield] [[Satellites]], appends the nineteen '
+                           'TAG = NORAD under [Skyfield] [[Satellites]], appends the seventeen '
                            '[LoopData] [[Include]] fields entries the sample page reads, and '
                            '(with --name) writes the display name under [StdReport] '
                            '[[Defaults]] [[[Almanac]]].  Every edit is idempotent: pieces '
@@ -1055,32 +2339,148 @@ if __name__ == '__main__':
                            '[LoopData] [[Include]] fields line, and TAG\'s [StdReport] '
                            '[[Defaults]] [[[Almanac]]] display name -- each if present.  Use '
                            'with --config and exactly one of --output or --in-place.')
+    parser.add_option('--batch', dest='batch_file', type=str, metavar='FILE',
+                      help='Apply many satellite and comet edits in one run: FILE lists one '
+                           'operation per line, spelled like these flags (add-satellite '
+                           'TAG=NORAD [--name NAME], remove-satellite TAG, add-comet '
+                           'TAG=DESIGNATION [--name NAME], remove-comet TAG; # comments).  '
+                           'Every operation is checked and applied to one in-memory '
+                           'configuration, and it is written once -- or, if any operation '
+                           'is refused, not at all.  Use with --config and exactly one of '
+                           '--output or --in-place.')
+    parser.add_option('--fleet', dest='fleet', type=str, metavar='DIR|GLOB',
+                      help='With --migrate-loopdata-fields, --add-satellite, '
+                           '--remove-satellite, --add-comet, --remove-comet or --batch: '
+                           'apply it to every configuration in DIR (its *.conf files) or '
+                           'matching GLOB (quote it; ** recurses) instead of one --config, '
+                           'in parallel.  Each file is backed up and rewritten on its own, '
+                           'as --in-place would (which is required); a file left unchanged '
+                           'is not written, and a file that fails costs only itself.  '
+                           'Prints one JSON report of every file\'s counts and failures.')
+    parser.add_option('--suggest-satellites', dest='suggest_catalog', type=str,
+                      metavar='CATALOG.tle',
+                      help='Rank the satellites in a local TLE catalog (e.g. CelesTrak\'s '
+                           '"visual" or "active" set) by the passes visible from the '
+                           'configured station over the next --days: above 10 degrees, '
+                           'sunlit, in a sky at least civil-twilight dark.  Prints the best '
+                           '--top; with --output or --in-place, also configures them (as '
+                           '--batch would, in one write), skipping any already configured.  '
+                           'Needs sgp4 and NumPy, which weewx-skyfield installs.')
+    parser.add_option('--import-comets', dest='comet_elements', type=str,
+                      metavar='CometEls.txt',
+                      help='Converge [Skyfield] [[Comets]] on the comets in a local copy of '
+                           'the Minor Planet Center\'s comet elements predicted at least '
+                           'as bright as --max-mag at some point in the next --days: '
+                           'prints the comets to add and the configured ones that have '
+                           'faded; with --output or --in-place, adds and removes them (as '
+                           '--batch would, in one write).  Needs NumPy, which '
+                           'weewx-skyfield installs.')
+    parser.add_option('--max-mag', dest='max_mag', type=float, metavar='M',
+                      help='With --import-comets: the faintest predicted magnitude to '
+                           'keep (e.g. 10 for binoculars).')
+    parser.add_option('--days', dest='days', type=float, metavar='N',
+                      help='With --suggest-satellites or --import-comets: how many days '
+                           'ahead to look.  Default is 7 for satellites, 30 for comets.')
+    parser.add_option('--top', dest='top', type=int, default=10, metavar='K',
+                      help='With --suggest-satellites: how many satellites to suggest.  '
+                           'Default is 10.')
+    parser.add_option('--jobs', dest='jobs', type=int, metavar='N',
+                      help='With --suggest-satellites or --fleet: how many processes to '
+                           'work with.  Default is one per CPU.')
+    parser.add_option('--estimate-feed', dest='estimate_feed', action='store_true',
+                      help='Estimate what the configured fields line costs in loop-data.txt '
+                           'bandwidth: the record\'s size (plain and gzipped), the requests '
+                           'an hour and bytes a day at the Celestial report\'s refresh_rate '
+                           'for --viewers open pages, each tag\'s share, and what gzip, '
+                           'dropping the almanac entries the page does not read, a doubled '
+                           'refresh_rate or one satellite fewer would save.  Writes nothing.')
+    parser.add_option('--viewers', dest='viewers', type=float, default=1.0, metavar='N',
+                      help='With --estimate-feed: the pages open at once, on average.  '
+                           'Default is 1.')
+    parser.add_option('--sample', dest='sample_file', type=str, metavar='loop-data.txt',
+                      help='With --estimate-feed: a loop-data.txt weewx-loopdata wrote, '
+                           'to measure the values by instead of estimating them.')
     parser.add_option('--output', dest='output_file', type=str, metavar='FILE',
                       help='Write the rewritten configuration to FILE, leaving the --config '
                            'file untouched (diff them, then move FILE into place).')
     parser.add_option('--in-place', dest='in_place', action='store_true',
                       help='Rewrite the --config file itself '
                            '(a .bak-celestial-%s backup is made first).' % CELESTIAL_VERSION)
+    parser.add_option('--json', dest='json', action='store_true',
+                      help='Print the operation\'s report as one JSON document on stdout '
+                           '(with --fleet, each file\'s full report too), and keep the '
+                           'terminal for errors; a refused run prints {"error": ...} and '
+                           'exits 1.  Works with every operation.')
     parser.add_option('--print-fields-value', dest='print_fields', action='store_true',
                       help='With --migrate-loopdata-fields: print the migrated fields value as '
                            'a bare comma-separated list, ready to paste into weewx.conf (do '
                            'NOT add brackets or quotes).')
     (options, args) = parser.parse_args()
 
+    # Everything that writes a configuration (or computes for long enough
+    # to matter) also logs to syslog through WeeWX's logger setup; the
+    # read-only fast paths log to the terminal only.
+    if not (options.version or options.print_fields):
+        import weeutil.logger
+        weeutil.logger.setup('celestial', {})
+    else:
+        logging.getLogger().setLevel(logging.INFO)
+    terminal = logging.StreamHandler()
+    if options.json:
+        # stdout carries the document alone; the terminal keeps only the
+        # errors (syslog still gets every line).
+        terminal.setLevel(logging.WARNING)
+    logging.getLogger().addHandler(terminal)
+
+    def emit(operation, config_path, output_path, report, **extra):
+        """With --json, the operation's report as one JSON document on
+        stdout: the version, the operation, the configuration read, the
+        file written (None when nothing was), anything particular to the
+        operation, and the report its function returned."""
+        if options.json:
+            import json
+            document = {'version': CELESTIAL_VERSION, 'operation': operation,
+                        'config': config_path, 'output': output_path}
+            document.update(extra)
+            document['report'] = report
+            print(json.dumps(document, indent=2))
+
+    def fail(message):
+        """Log message as an error (and, with --json, print it as the
+        document) and exit 1."""
+        log.error(message)
+        if options.json:
+            import json
+            print(json.dumps({'version': CELESTIAL_VERSION, 'error': message}, indent=2))
+        exit(1)
+
+    def read_configuration(config_file):
+        """get_configuration, a configuration that cannot be opened or
+        parsed refused like any other (see fail)."""
+        try:
+            return get_configuration(config_file)
+        except (CantOpenConfigFile, CantParseConfigFile) as e:
+            fail(str(e))
+
     if options.version:
-        log.info("Celestial version is %s." % CELESTIAL_VERSION)
+        if options.json:
+            import json
+            print(json.dumps({'version': CELESTIAL_VERSION}))
+        else:
+            log.info("Celestial version is %s." % CELESTIAL_VERSION)
         exit(0)
 
     if sum([bool(options.migrate), bool(options.add_satellite),
             bool(options.remove_satellite), bool(options.add_comet),
-            bool(options.remove_comet)]) > 1:
-        log.error('Specify only one of --migrate-loopdata-fields, '
-                  '--add-satellite, --remove-satellite, --add-comet or '
-                  '--remove-comet.')
-        exit(1)
+            bool(options.remove_comet), bool(options.batch_file),
+            bool(options.suggest_catalog), bool(options.comet_elements),
+            bool(options.estimate_feed)]) > 1:
+        fail('Specify only one of --migrate-loopdata-fields, '
+             '--add-satellite, --remove-satellite, --add-comet, '
+             '--remove-comet, --batch, --suggest-satellites, '
+             '--import-comets or --estimate-feed.')
     if options.display_name and not (options.add_satellite or options.add_comet):
-        log.error('--name only applies with --add-satellite or --add-comet.')
-        exit(1)
+        fail('--name only applies with --add-satellite or --add-comet.')
 
     def resolve_output(config_path):
         """The output path for a config rewrite, honoring --in-place (the
@@ -1089,30 +2489,106 @@ if __name__ == '__main__':
         if options.in_place:
             backup = config_path + '.bak-celestial-' + CELESTIAL_VERSION
             if os.path.exists(backup):
-                log.error('Backup %s already exists; move it aside first.' % backup)
-                exit(1)
+                fail('Backup %s already exists; move it aside first.' % backup)
             shutil.copy2(config_path, backup)
             log.info('Backed up %s to %s' % (config_path, backup))
             return config_path
         return options.output_file
 
+    def edit_operation():
+        """The one add or remove the command line asks for, as an
+        operation apply_batch takes; ValueError when it is malformed."""
+        if options.add_satellite or options.add_comet:
+            edit_verb = 'add-satellite' if options.add_satellite else 'add-comet'
+            edit_tag, sep, edit_value = (options.add_satellite
+                                         or options.add_comet).partition('=')
+            edit_tag = edit_tag.strip()
+            edit_value = edit_value.strip()
+            if not sep or not edit_tag or not edit_value:
+                if options.add_satellite:
+                    raise ValueError('--add-satellite takes TAG=NORAD '
+                                     '(e.g. --add-satellite zenit23088=23088).')
+                raise ValueError('--add-comet takes TAG=DESIGNATION '
+                                 '(e.g. --add-comet halley=1P, or '
+                                 '--add-comet a3="C/2023 A3" -- quote a '
+                                 'designation with a space).')
+            return {'verb': edit_verb, 'tag': edit_tag, 'value': edit_value,
+                    'name': options.display_name}
+        edit_verb = 'remove-satellite' if options.remove_satellite else 'remove-comet'
+        return {'verb': edit_verb,
+                'tag': (options.remove_satellite or options.remove_comet).strip(),
+                'value': None, 'name': None}
+
+    if options.fleet:
+        import json
+        if not options.in_place or options.output_file or options.print_fields \
+                or options.config_file:
+            fail('--fleet rewrites each configuration it names in place: '
+                 'use it with --in-place, and without --config, --output '
+                 'or --print-fields-value.')
+        if options.jobs is not None and options.jobs <= 0:
+            fail('--jobs must be positive.')
+        try:
+            if options.migrate:
+                fleet_operations = None
+            elif options.batch_file:
+                with open(options.batch_file, encoding='utf-8') as f:
+                    fleet_operations = parse_batch(f.read())
+            elif (options.add_satellite or options.remove_satellite
+                    or options.add_comet or options.remove_comet):
+                fleet_operations = [edit_operation()]
+            else:
+                fail('--fleet takes --migrate-loopdata-fields, --add-satellite, '
+                     '--remove-satellite, --add-comet, --remove-comet or --batch.')
+        except (OSError, ValueError) as e:
+            fail('%s  Nothing was written.' % e)
+        fleet = fleet_paths(options.fleet)
+        if not fleet:
+            fail('%s names no configuration files.' % options.fleet)
+        fleet_report = run_fleet(fleet, fleet_operations, options.jobs,
+                                 reports=bool(options.json))
+        for entry in fleet_report['files']:
+            if entry['status'] == 'failed':
+                log.error('%s: %s' % (entry['config'], entry['error']))
+        for entry in fleet_report['files']:
+            if entry['status'] == 'written':
+                log.info('%s: written (%d renamed, %d dropped, %d added, %d removed; '
+                         'backup %s)' % (entry['config'], entry['renamed'],
+                                         entry['dropped'], entry['added'],
+                                         entry['removed'], entry['backup']))
+            elif entry['status'] == 'unchanged':
+                log.info('%s: unchanged' % entry['config'])
+        log.info('%d configurations: %d written, %d unchanged, %d failed.'
+                 % (len(fleet_report['files']), fleet_report['written'],
+                    fleet_report['unchanged'], fleet_report['failed']))
+        if options.json:
+            print(json.dumps(fleet_report, indent=2))
+        exit(1 if fleet_report['failed'] else 0)
+
     if options.migrate:
         migrate_config = options.config_file if options.config_file else '/home/weewx/weewx.conf'
         if sum([bool(options.output_file), bool(options.in_place), bool(options.print_fields)]) != 1:
-            log.error('Specify exactly one of --output FILE, --in-place or --print-fields-value.')
-            exit(1)
+            fail('Specify exactly one of --output FILE, --in-place or --print-fields-value.')
+        # Read (and refused) before --in-place makes its backup: a run
+        # that cannot migrate leaves no backup behind to trip the next.
+        migrate_dict = read_configuration(migrate_config)
+        migrate_line = FieldsLine.from_config(migrate_dict)
+        if migrate_line is None:
+            fail('%s has no [LoopData] [[Include]] fields entry.' % migrate_config)
         if options.print_fields:
-            migrate_dict = get_configuration(migrate_config)
-            fields = migrate_dict['LoopData']['Include']['fields']
-            if isinstance(fields, str):
-                fields = [f.strip() for f in fields.split(',') if f.strip()]
             new_fields, report = migrate_loopdata_fields(
-                list(fields), _configured_satellites(migrate_dict),
+                migrate_line.fields(), _configured_satellites(migrate_dict),
                 _configured_comets(migrate_dict))
-            print(', '.join(new_fields))
+            migrate_output = None
+            if not options.json:
+                print(', '.join(new_fields))
         else:
             migrate_output = resolve_output(migrate_config)
-            report = migrate_loopdata_conf(migrate_config, migrate_output)
+            import configobj
+            try:
+                report = migrate_loopdata_conf(migrate_config, migrate_output)
+            except (KeyError, OSError, configobj.ConfigObjError) as e:
+                fail('%s  Nothing was written.' % (e.args[0] if e.args else e))
             log.info('Wrote %s' % migrate_output)
         for old_name, new_name in report['renamed']:
             log.info('renamed  %s -> %s' % (old_name, new_name))
@@ -1124,53 +2600,19 @@ if __name__ == '__main__':
                  % (len(report['renamed']), len(report['dropped']), len(report['added'])))
         for note in report['notes']:
             log.info('NOTE: %s' % note)
+        if options.print_fields:
+            emit('migrate-loopdata-fields', migrate_config, None, report, fields=new_fields)
+        else:
+            emit('migrate-loopdata-fields', migrate_config, migrate_output, report)
         exit(0)
 
-    if (options.add_satellite or options.remove_satellite
-            or options.add_comet or options.remove_comet):
-        edit_config = options.config_file if options.config_file else '/home/weewx/weewx.conf'
-        if sum([bool(options.output_file), bool(options.in_place)]) != 1 or options.print_fields:
-            log.error('Specify exactly one of --output FILE or --in-place.')
-            exit(1)
-        config = get_configuration(edit_config)
-        try:
-            if options.add_satellite:
-                edit_tag, sep, edit_value = options.add_satellite.partition('=')
-                edit_tag = edit_tag.strip()
-                edit_value = edit_value.strip()
-                if not sep or not edit_tag or not edit_value:
-                    raise ValueError('--add-satellite takes TAG=NORAD '
-                                     '(e.g. --add-satellite zenit23088=23088).')
-                report = add_satellite(config, edit_tag, edit_value,
-                                       options.display_name)
-            elif options.remove_satellite:
-                edit_tag = options.remove_satellite.strip()
-                report = remove_satellite(config, edit_tag)
-            elif options.add_comet:
-                edit_tag, sep, edit_value = options.add_comet.partition('=')
-                edit_tag = edit_tag.strip()
-                edit_value = edit_value.strip()
-                if not sep or not edit_tag or not edit_value:
-                    raise ValueError('--add-comet takes TAG=DESIGNATION '
-                                     '(e.g. --add-comet halley=1P, or '
-                                     '--add-comet a3="C/2023 A3" -- quote a '
-                                     'designation with a space).')
-                report = add_comet(config, edit_tag, edit_value,
-                                   options.display_name)
-            else:
-                edit_tag = options.remove_comet.strip()
-                report = remove_comet(config, edit_tag)
-        except ValueError as e:
-            log.error(str(e))
-            exit(1)
-        edit_output = resolve_output(edit_config)
-        _write_conf_atomically(config, edit_config, edit_output)
-        log.info('Wrote %s' % edit_output)
-        if options.add_satellite or options.add_comet:
-            section = '[[Satellites]]' if options.add_satellite else '[[Comets]]'
-            entry = report['satellites_entry' if options.add_satellite
-                           else 'comets_entry']
-            previous = report['previous_norad' if options.add_satellite
+    def log_edit(verb, edit_tag, edit_value, display_name, report):
+        """The log lines for one add or remove, from its report."""
+        section = '[[Satellites]]' if verb.endswith('satellite') else '[[Comets]]'
+        entry = report['satellites_entry' if verb.endswith('satellite')
+                       else 'comets_entry']
+        if verb.startswith('add-'):
+            previous = report['previous_norad' if verb.endswith('satellite')
                               else 'previous_designation']
             if entry == 'added':
                 log.info('added  [Skyfield] %s %s = %s' % (section, edit_tag, edit_value))
@@ -1186,15 +2628,12 @@ if __name__ == '__main__':
                 log.info('fields line already complete for %s' % edit_tag)
             if report['name_entry'] in ('added', 'updated'):
                 log.info('%s  [StdReport] [[Defaults]] [[[Almanac]]] %s = %s'
-                         % (report['name_entry'], edit_tag, options.display_name))
+                         % (report['name_entry'], edit_tag, display_name))
             elif report['name_entry'] == 'unchanged':
                 log.info('kept  [StdReport] [[Defaults]] [[[Almanac]]] %s (already named)'
                          % edit_tag)
         else:
-            section = '[[Satellites]]' if options.remove_satellite else '[[Comets]]'
-            entry = report['satellites_entry' if options.remove_satellite
-                           else 'comets_entry']
-            removed_value = report['norad' if options.remove_satellite
+            removed_value = report['norad' if verb.endswith('satellite')
                                    else 'designation']
             if entry == 'removed':
                 log.info('removed  [Skyfield] %s %s = %s'
@@ -1205,8 +2644,241 @@ if __name__ == '__main__':
                 log.info('removed  %s' % name)
             if report['name_entry'] == 'removed':
                 log.info('removed  [StdReport] [[Defaults]] [[[Almanac]]] %s' % edit_tag)
+
+    if (options.add_satellite or options.remove_satellite
+            or options.add_comet or options.remove_comet):
+        edit_config = options.config_file if options.config_file else '/home/weewx/weewx.conf'
+        if sum([bool(options.output_file), bool(options.in_place)]) != 1 or options.print_fields:
+            fail('Specify exactly one of --output FILE or --in-place.')
+        config = read_configuration(edit_config)
+        try:
+            edit_op = edit_operation()
+            if edit_op['verb'] == 'add-satellite':
+                report = add_satellite(config, edit_op['tag'], edit_op['value'],
+                                       edit_op['name'])
+            elif edit_op['verb'] == 'remove-satellite':
+                report = remove_satellite(config, edit_op['tag'])
+            elif edit_op['verb'] == 'add-comet':
+                report = add_comet(config, edit_op['tag'], edit_op['value'],
+                                   edit_op['name'])
+            else:
+                report = remove_comet(config, edit_op['tag'])
+        except ValueError as e:
+            fail(str(e))
+        edit_output = resolve_output(edit_config)
+        _write_conf_atomically(config, edit_config, edit_output)
+        log.info('Wrote %s' % edit_output)
+        log_edit(edit_op['verb'], edit_op['tag'], edit_op['value'], edit_op['name'], report)
+        for note in report['hints']:
+            log.info('NOTE: %s' % note)
+        emit(edit_op['verb'], edit_config, edit_output, report, tag=edit_op['tag'],
+             value=edit_op['value'], name=edit_op['name'])
+        exit(0)
+
+    if options.batch_file:
+        edit_config = options.config_file if options.config_file else '/home/weewx/weewx.conf'
+        if sum([bool(options.output_file), bool(options.in_place)]) != 1 or options.print_fields:
+            fail('Specify exactly one of --output FILE or --in-place.')
+        config = read_configuration(edit_config)
+        try:
+            with open(options.batch_file, encoding='utf-8') as f:
+                operations = parse_batch(f.read())
+            before = config.dict()
+            report = apply_batch(config, operations)
+        except (OSError, ValueError) as e:
+            fail('%s: %s  Nothing was written.' % (options.batch_file, e))
+        if config.dict() == before:
+            # Nothing to change: no write and no backup, so a batch run
+            # again over its own result leaves the file (and the next
+            # --in-place) alone.
+            for op in report['operations']:
+                log_edit(op['verb'], op['tag'], op['value'], op['name'], op['report'])
+            log.info('%s already as the batch leaves it; nothing was written.'
+                     % edit_config)
+            emit('batch', edit_config, None, report)
+            exit(0)
+        edit_output = resolve_output(edit_config)
+        _write_conf_atomically(config, edit_config, edit_output)
+        log.info('Wrote %s' % edit_output)
+        for op in report['operations']:
+            log_edit(op['verb'], op['tag'], op['value'], op['name'], op['report'])
+        log.info('%d operations, %d fields added, %d fields removed.'
+                 % (len(report['operations']), len(report['fields_added']),
+                    len(report['fields_removed'])))
         for note in report['hints']:
             log.info('NOTE: %s' % note)
+        emit('batch', edit_config, edit_output, report)
+        exit(0)
+
+    if options.suggest_catalog:
+        import time
+        edit_config = options.config_file if options.config_file else '/home/weewx/weewx.conf'
+        if (options.output_file and options.in_place) or options.print_fields:
+            fail('Specify at most one of --output FILE or --in-place.')
+        if options.days is None:
+            options.days = 7.0
+        if options.days <= 0 or options.top <= 0 or (options.jobs is not None and options.jobs <= 0):
+            fail('--days, --top and --jobs must be positive.')
+        config = read_configuration(edit_config)
+        try:
+            with open(options.suggest_catalog, encoding='utf-8', errors='replace') as f:
+                catalog = read_tle_catalog(f.read())
+            latitude, longitude, altitude_m = station_location(config)
+            ranked = rank_satellites(catalog, latitude, longitude, altitude_m,
+                                     time.time(), options.days, jobs=options.jobs)
+        except (OSError, ValueError) as e:
+            fail('%s: %s' % (options.suggest_catalog, e))
+        except ImportError as e:
+            fail('--suggest-satellites needs sgp4 and NumPy (%s); run it '
+                 'with the Python weewx-skyfield is installed in.' % e)
+        try:
+            configured = {str(v): t for t, v in config['Skyfield']['Satellites'].items()}
+        except (KeyError, AttributeError):
+            configured = {}
+        log.info('%d of %d satellites in %s have a visible pass from %.4f, %.4f '
+                 'in the next %g days.' % (len(ranked), len(catalog),
+                                           options.suggest_catalog, latitude,
+                                           longitude, options.days))
+        for rank, sat in enumerate(ranked[:options.top], 1):
+            log.info('%2d. %-24s %6s  %3d passes, %5.1f min, highest %4.1f deg, '
+                     'score %.2f%s' % (rank, sat['name'], sat['norad'], sat['passes'],
+                                       sat['minutes'], sat['best_alt'], sat['score'],
+                                       '  (configured as %s)' % configured[sat['norad']]
+                                       if sat['norad'] in configured else ''))
+        report = None
+        edit_output = None
+        if options.output_file or options.in_place:
+            operations = suggestion_operations(config, ranked, options.top)
+            try:
+                report = apply_batch(config, operations)
+            except ValueError as e:
+                fail('%s  Nothing was written.' % e)
+            edit_output = resolve_output(edit_config)
+            _write_conf_atomically(config, edit_config, edit_output)
+            log.info('Wrote %s' % edit_output)
+            for op in report['operations']:
+                log_edit(op['verb'], op['tag'], op['value'], op['name'], op['report'])
+            for note in report['hints']:
+                log.info('NOTE: %s' % note)
+        emit('suggest-satellites', edit_config, edit_output, report,
+             catalog=options.suggest_catalog, satellites=len(catalog), days=options.days,
+             suggested=[dict(sat, configured_as=configured.get(sat['norad']))
+                        for sat in ranked[:options.top]])
+        exit(0)
+
+    if options.comet_elements:
+        import time
+        edit_config = options.config_file if options.config_file else '/home/weewx/weewx.conf'
+        if (options.output_file and options.in_place) or options.print_fields:
+            fail('Specify at most one of --output FILE or --in-place.')
+        if options.max_mag is None:
+            fail('--import-comets needs --max-mag M (e.g. --max-mag 10).')
+        if options.days is None:
+            options.days = 30.0
+        if options.days <= 0:
+            fail('--days must be positive.')
+        config = read_configuration(edit_config)
+        try:
+            with open(options.comet_elements, encoding='utf-8', errors='replace') as f:
+                elements = read_comet_elements(f.read())
+            predicted = predict_comet_magnitudes(elements, time.time(), options.days)
+            operations = comet_import_operations(config, predicted, options.max_mag)
+        except OSError as e:
+            fail('%s: %s' % (options.comet_elements, e))
+        except ImportError as e:
+            fail('--import-comets needs NumPy (%s); run it with the Python '
+                 'weewx-skyfield is installed in.' % e)
+        magnitudes = {c['designation']: c['mag'] for c in predicted}
+        log.info('%d of %d comets in %s are predicted at magnitude %g or brighter '
+                 'in the next %g days.'
+                 % (sum(1 for m in magnitudes.values() if m is not None and m <= options.max_mag),
+                    len(predicted), options.comet_elements, options.max_mag, options.days))
+        try:
+            configured = {t: str(v) for t, v in config['Skyfield']['Comets'].items()}
+        except (KeyError, AttributeError):
+            configured = {}
+        for op in operations:
+            designation = op['value'] or configured[op['tag']]
+            log.info('%s  %s = %s  (brightest %.1f)'
+                     % ('add' if op['verb'] == 'add-comet' else 'remove',
+                        op['tag'], designation, magnitudes[designation]))
+        if not operations:
+            log.info('[[Comets]] already matches; nothing to add or remove.')
+        report = None
+        edit_output = None
+        if options.output_file or options.in_place:
+            try:
+                report = apply_batch(config, operations)
+            except ValueError as e:
+                fail('%s  Nothing was written.' % e)
+            edit_output = resolve_output(edit_config)
+            _write_conf_atomically(config, edit_config, edit_output)
+            log.info('Wrote %s' % edit_output)
+            for op in report['operations']:
+                log_edit(op['verb'], op['tag'], op['value'], op['name'], op['report'])
+            for note in report['hints']:
+                log.info('NOTE: %s' % note)
+        emit('import-comets', edit_config, edit_output, report,
+             elements=options.comet_elements, comets=len(predicted), days=options.days,
+             max_mag=options.max_mag,
+             operations=[dict(op, mag=magnitudes[op['value'] or configured[op['tag']]])
+                         for op in operations])
+        exit(0)
+
+    if options.estimate_feed:
+        import json
+        edit_config = options.config_file if options.config_file else '/home/weewx/weewx.conf'
+        if options.output_file or options.in_place or options.print_fields:
+            fail('--estimate-feed writes nothing; drop --output, --in-place '
+                 'and --print-fields-value.')
+        if options.viewers <= 0:
+            fail('--viewers must be positive.')
+        config = read_configuration(edit_config)
+        feed_line = FieldsLine.from_config(config)
+        if feed_line is None:
+            fail('%s has no [LoopData] [[Include]] fields entry.' % edit_config)
+        sample = None
+        if options.sample_file:
+            try:
+                with open(options.sample_file, encoding='utf-8') as f:
+                    sample = json.load(f)
+            except (OSError, ValueError) as e:
+                fail('%s: %s' % (options.sample_file, e))
+        estimate = estimate_feed(feed_line.fields(), feed_refresh_rate(config),
+                                 options.viewers, _configured_satellites(config),
+                                 _configured_comets(config), sample)
+
+        def size(n):
+            for unit in ('bytes', 'kB', 'MB', 'GB'):
+                if n < 1000.0 or unit == 'GB':
+                    return ('%d %s' if unit == 'bytes' else '%.1f %s') % (n, unit)
+                n /= 1000.0
+
+        log.info('loop-data.txt: %d keys, %s a record (%s gzipped)%s.'
+                 % (estimate['entries'], size(estimate['record_bytes']),
+                    size(estimate['gzip_bytes']),
+                    ', measured from %s' % options.sample_file if sample is not None
+                    else ', values estimated'))
+        log.info('At refresh_rate %g s and %g viewer%s: %g requests an hour, %s a day '
+                 '(with about %d bytes of headers a request).'
+                 % (estimate['refresh_rate'], options.viewers,
+                    '' if options.viewers == 1 else 's', estimate['requests_per_hour'],
+                    size(estimate['bytes_per_day']), _FEED_HEADER_BYTES))
+        savings = estimate['savings']
+        log.info('Savings a day:  gzip on loop-data.txt %s;  refresh_rate %g s %s;  '
+                 'one satellite fewer %s;  the %d almanac entries the page does not read %s.'
+                 % (size(savings['gzip']), 2 * estimate['refresh_rate'],
+                    size(savings['refresh_rate']), size(savings['per_satellite']),
+                    len(estimate['unread']), size(savings['unread'])))
+        for name in estimate['unread']:
+            log.info('  not read by the page: %s' % name)
+        log.info('%-24s %-9s %7s %10s %6s %12s'
+                 % ('tag', 'kind', 'entries', 'bytes', 'share', 'a day'))
+        for g in estimate['tags']:
+            log.info('%-24s %-9s %7d %10d %5.1f%% %12s'
+                     % (g['tag'], g['kind'], g['entries'], g['bytes'], g['share'],
+                        size(g['bytes_per_day'])))
+        emit('estimate-feed', edit_config, None, estimate, sample=options.sample_file)
         exit(0)
 
     parser.print_help()
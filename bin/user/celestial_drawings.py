@@ -0,0 +1,274 @@
+"""
+celestial_drawings.py
+
+Copyright (C)2022-2026 by John A Kline (john@johnkline.com)
+Distributed under the terms of the GNU Public License (GPLv3)
+
+weewx-skyfield's two drawings -- the dome (dome_svg) and the pass chart
+(pass_chart_html) -- drawn once per report cycle and shared by every
+template and every report that asks for the same one (8.3.6).
+
+They are the costly answers a report cycle asks $sky_page for, and they
+were asked for several times over: index.html embeds the dome and the
+pass chart that dome-svg.txt and pass-chart.txt then draw again, for the
+same instant, and a station serving the page in three languages runs the
+skin three times.  $sky_drawings draws each one once.  The templates hand
+it the report's own $sky_page, which does the drawing: $sky_page stays
+weewx-skyfield's SkyPage exactly as celestial_sky.py found it, and
+nothing here looks inside it.
+
+A drawing is known by explicit keys, never by the objects it was asked
+with ($almanac is a new object at every use): the report time, the
+instant drawn, the station's latitude, longitude and altitude, the
+report's lang, its units and its texts, and the plate.  Reports in one
+language share a lang file, but each may set its own unit_system and
+override [Units], [Texts], [Labels] or [Almanac] under [StdReport]; the
+units and texts keys are digests of those sections as the report sees
+them, so two reports that differ there never share a drawing.  The
+report time stands for everything else that may move between cycles:
+nothing is kept in memory past its cycle, so an upgraded weewx-skyfield
+or an edited lang file is never answered from a stale copy.
+
+Optionally, drawings outlive the process too ([Extras] sky_cache_dir, off
+by default; see SkyCache): every weewxd and every weectl report run
+pointed at the same directory then draws a given dome once.
+
+Like celestial_sky.py, nothing here may ever raise into the report except
+what $sky_page itself raises: the templates guard their drawings, and a
+failed drawing is not remembered.
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+import sys
+import tempfile
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from weewx.cheetahgenerator import SearchList
+
+log = logging.getLogger(__name__)
+
+# This cycle's drawings: the report time they belong to, and each drawing
+# by its key (see SkyDrawings._key).
+_cycle: Dict[str, Any] = {'stop': None, 'drawn': {}}
+
+# The skin_dict sections a report's drawings read their words from (see
+# celestial_texts._I18N_SECTIONS, which adds Units); units are keyed on
+# their own, with the report's unit_system.
+_TEXT_SECTIONS = ('Texts', 'Labels', 'Almanac')
+
+# (path, max_bytes, version) -> SkyCache: one per directory for the life
+# of the process, so its count of the bytes on disk carries from one
+# cycle to the next.
+_disk_caches: Dict[Tuple[str, int, str], 'SkyCache'] = {}
+
+
+def _skyfield_version(sky_page) -> str:
+    """What names the weewx-skyfield that draws: its declared version, if
+    it declares one, and its module file's size and time -- an upgrade
+    replaces the file even when nobody bumped a version."""
+    try:
+        module = sys.modules[type(sky_page).__module__]
+        st = os.stat(inspect.getsourcefile(module) or module.__file__)
+        declared = next((getattr(module, a) for a in ('VERSION', '__version__', 'version')
+                         if isinstance(getattr(module, a, None), str)), '')
+        return '%s:%d:%d' % (declared, st.st_size, st.st_mtime_ns)
+    except Exception:
+        return ''
+
+
+def _digest(*values) -> str:
+    """A short, stable name for skin_dict values (sections are dicts)."""
+    return hashlib.sha1(json.dumps(values, sort_keys=True, default=str)
+                        .encode('utf-8')).hexdigest()[:16]
+
+
+class SkyCache:
+    """Drawings on disk, for every process that points here: one file per
+    drawing, named by a hash of its key and of the weewx-skyfield that
+    drew it.  A file is written aside and renamed into place, so a reader
+    in another process never sees half of one.  Reading a file touches it,
+    and when the directory outgrows its cap the least recently used go
+    first.
+
+    The directory is listed only at the first write and when a write takes
+    it over its cap: in between, the bytes on disk are counted here, as
+    they are written (a rewritten drawing counts the difference).  Other processes' writes are counted at the next
+    listing, so the cap holds to within what they wrote since.
+
+    Every failure is a miss: the cache is only ever a shortcut, and a
+    full disk or a bad path costs the shortcut, never the page."""
+
+    SUFFIX = '.sky'
+
+    # An eviction clears down to this share of the cap, so a cache kept
+    # full lists its directory once per so many writes, not at every one.
+    LOW_WATER = 0.75
+
+    def __init__(self, path: str, max_bytes: int, version: str = '') -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.version = version
+        self._total: Optional[int] = None   # bytes on disk, as counted here
+
+    def _file(self, key: Tuple) -> str:
+        digest = hashlib.sha1(('%s|%r' % (self.version, key)).encode('utf-8')).hexdigest()
+        return os.path.join(self.path, digest + self.SUFFIX)
+
+    def get(self, key: Tuple) -> Optional[str]:
+        try:
+            path = self._file(key)
+            with open(path, encoding='utf-8') as f:
+                text = f.read()
+            os.utime(path)
+            return text
+        except Exception:
+            return None
+
+    def put(self, key: Tuple, text: str) -> None:
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            path = self._file(key)
+            try:
+                replaced = os.stat(path).st_size
+            except OSError:
+                replaced = 0
+            fd, tmp = tempfile.mkstemp(prefix='.', suffix='.tmp', dir=self.path)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                os.replace(tmp, path)
+            except Exception:
+                os.unlink(tmp)
+                raise
+            if self._total is None:
+                self._total = sum(e[1] for e in self._entries())
+            else:
+                self._total += len(text.encode('utf-8')) - replaced
+            if self._total > self.max_bytes:
+                self._evict()
+        except Exception as e:
+            log.debug('sky cache write failed (%s)', e)
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """(mtime, size, name) of every drawing in the directory."""
+        entries = []
+        for name in os.listdir(self.path):
+            if name.endswith(self.SUFFIX):
+                try:
+                    st = os.stat(os.path.join(self.path, name))
+                    entries.append((st.st_mtime, st.st_size, name))
+                except OSError:
+                    pass                     # another process evicted it
+        return entries
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        total = sum(e[1] for e in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes * self.LOW_WATER:
+                break
+            try:
+                os.unlink(os.path.join(self.path, name))
+            except OSError:
+                pass
+            total -= size
+        self._total = total
+
+
+class SkyDrawings:
+    """$sky_drawings: one report's access to the cycle's shared drawings.
+    Each method draws through the sky_page it is handed -- the report's
+    own $sky_page -- unless the same drawing is already to hand."""
+
+    def __init__(self, stop: Any, lang: Optional[str],
+                 disk: Optional[Tuple[str, int]] = None,
+                 units: str = '', texts: str = '') -> None:
+        self.stop = stop
+        self.lang = lang
+        self.disk = disk
+        self.units = units      # digest of unit_system and [Units]
+        self.texts = texts      # digest of [Texts], [Labels] and [Almanac]
+
+    def dome_svg(self, sky_page, almanac, palette: str = 'night') -> Any:
+        return self._draw('dome_svg', sky_page, almanac, palette)
+
+    def pass_chart_html(self, sky_page, almanac, palette: str = 'night') -> Any:
+        return self._draw('pass_chart_html', sky_page, almanac, palette)
+
+    def _key(self, name: str, almanac, palette: str) -> Tuple:
+        return (name, self.stop, almanac.time_ts, almanac.lat, almanac.lon,
+                almanac.altitude, self.lang, self.units, self.texts, palette)
+
+    def _draw(self, name: str, sky_page, almanac, palette: str) -> Any:
+        # Looked up first, and unguarded: a weewx-skyfield without this
+        # drawing answers exactly as its own page would.
+        draw = getattr(sky_page, name)
+        try:
+            key: Optional[Tuple] = self._key(name, almanac, palette)
+            hash(key)
+        except Exception:
+            key = None                      # not an almanac: just draw
+        if key is None:
+            return draw(almanac, palette=palette)
+        if self.stop != _cycle['stop']:
+            _cycle.update(stop=self.stop, drawn={})
+        drawn = _cycle['drawn']
+        if key in drawn:
+            return drawn[key]
+        disk = self._disk(sky_page)
+        answer = disk.get(key) if disk is not None else None
+        if answer is None:
+            answer = draw(almanac, palette=palette)
+            if disk is not None and isinstance(answer, str):
+                disk.put(key, answer)
+        drawn[key] = answer
+        return answer
+
+    def _disk(self, sky_page) -> Optional[SkyCache]:
+        if self.disk is None:
+            return None
+        key = self.disk + (_skyfield_version(sky_page),)
+        if key not in _disk_caches:
+            _disk_caches[key] = SkyCache(*key)
+        return _disk_caches[key]
+
+
+class CelestialSkyDrawings(SearchList):
+    """Exposes $sky_drawings to the Celestial skin's templates."""
+
+    def __init__(self, generator) -> None:
+        SearchList.__init__(self, generator)
+
+    def get_extension_list(self, timespan, db_lookup) -> List[Dict[str, Any]]:
+        skin_dict = getattr(self.generator, 'skin_dict', {})
+        drawings = SkyDrawings(getattr(timespan, 'stop', None), None)
+        try:
+            drawings.lang = skin_dict.get('lang')
+            drawings.units = _digest(skin_dict.get('unit_system'),
+                                     skin_dict.get('Units', {}))
+            drawings.texts = _digest(*[skin_dict.get(s, {}) for s in _TEXT_SECTIONS])
+            drawings.disk = self._sky_cache(skin_dict)
+        except Exception as e:
+            log.error('Sky drawings settings unusable (%s); each drawn as asked', e)
+        return [{'sky_drawings': drawings}]
+
+    def _sky_cache(self, skin_dict) -> Optional[Tuple[str, int]]:
+        """The report's [Extras] sky_cache_dir (relative to WEEWX_ROOT) and
+        its cap in bytes (sky_cache_mb); None, the default, keeps no disk
+        cache."""
+        try:
+            extras = skin_dict.get('Extras', {})
+            path = str(extras.get('sky_cache_dir', '')).strip()
+            if not path:
+                return None
+            root = getattr(self.generator, 'config_dict', {}).get('WEEWX_ROOT', '')
+            return (os.path.join(root, path),
+                    int(float(extras.get('sky_cache_mb', 16)) * 1024 * 1024))
+        except Exception as e:
+            log.error('sky_cache_dir unusable (%s); no disk cache', e)
+            return None
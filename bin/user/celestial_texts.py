@@ -0,0 +1,163 @@
+"""
+celestial_texts.py
+
+Copyright (C)2022-2026 by John A Kline (john@johnkline.com)
+Distributed under the terms of the GNU Public License (GPLv3)
+
+The Celestial page's translated strings, compiled once per language into a
+static file (8.3.6).  Everything the page's javascript composes -- the
+badge and roster strings from [Texts], the body names, the cardinals --
+used to ride inline in every generated index.html: re-expanded by the
+template every report cycle, and re-sent to every browser on every load,
+though it changes only when somebody edits the report's lang file.
+
+Now realtime_updater.inc hands that table here, and this module writes it
+beside the page as celestial-texts-<hash>.js, named by a hash of its own
+contents.  The page loads it with a plain <script src>, so a browser (and
+the optional service worker) keeps it for as long as it likes: a changed
+lang file compiles to a different name, never to different contents under
+an old one.  A file that is already on disk is never written again --
+weewxd restarted, or several reports in one language sharing HTML_ROOT.
+When a new bundle is written, the older celestial-texts-*.js beside it
+are deleted: the page regenerated with it names only the new one, and a
+page still open from before already has its strings loaded.
+
+Within a running weewxd the table is not even rebuilt: href answers from
+a fingerprint of the report's own i18n inputs (the lang, the skin.conf
+sections the lang file merges into, and the skin's version, which stands
+for the template's key list), and the template skips the whole table while
+it answers.  Anything that changes those inputs changes the fingerprint,
+and the next cycle compiles afresh.
+
+Like celestial_sky.py, nothing here may ever raise into the report: a
+bundle that cannot be written costs the page its cache-friendliness,
+never its strings.  href and compile return None on any failure, and the
+template then puts the table inline, exactly as before.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from weewx.cheetahgenerator import SearchList
+
+log = logging.getLogger(__name__)
+
+BUNDLE_PREFIX = 'celestial-texts-'
+_BUNDLE_RE = re.compile(re.escape(BUNDLE_PREFIX) + r'[0-9a-f]+\.js$')
+
+# The skin_dict sections a report's lang file merges into, and so
+# everything a bundle's strings can come from besides the template.
+_I18N_SECTIONS = ('Texts', 'Almanac', 'Labels', 'Units')
+
+# (html_root, fingerprint) -> the bundle's file name, for this process.
+_compiled: Dict[Tuple[str, str], str] = {}
+
+
+def _fingerprint(skin_dict) -> Optional[str]:
+    try:
+        inputs = {s: skin_dict.get(s, {}) for s in _I18N_SECTIONS}
+        inputs['lang'] = skin_dict.get('lang')
+        inputs['version'] = skin_dict.get('Extras', {}).get('version')
+        return hashlib.sha1(json.dumps(inputs, sort_keys=True, default=str)
+                            .encode('utf-8')).hexdigest()
+    except Exception:
+        return None
+
+
+def bundle_text(texts: Dict[str, Any]) -> str:
+    """The bundle's contents: one global the page script reads instead of
+    the config block's T, body_labels and cardinals.  json.dumps escapes
+    every non-ASCII character, as the inline block always has."""
+    return 'var CELESTIAL_TEXTS = %s;\n' % json.dumps(
+        texts, sort_keys=True, separators=(',', ':'))
+
+
+class TextsBundle:
+    """$texts_bundle: the one report's bundle, in its HTML_ROOT."""
+
+    def __init__(self, html_root: str, skin_dict) -> None:
+        self.html_root = html_root
+        self.fingerprint = _fingerprint(skin_dict)
+
+    @property
+    def href(self) -> Optional[str]:
+        """The bundle already compiled from these same inputs by this
+        process, if it is still on disk; else None, and the template
+        builds the table and calls compile."""
+        try:
+            name = _compiled.get((self.html_root, self.fingerprint))
+            if name and os.path.exists(os.path.join(self.html_root, name)):
+                return name
+        except Exception:
+            pass
+        return None
+
+    def compile(self, texts: Dict[str, Any]) -> Optional[str]:
+        """Write texts as celestial-texts-<hash>.js unless that file is
+        already there, deleting the older bundles when it is written;
+        return its name, or None if it cannot be had."""
+        try:
+            text = bundle_text(texts)
+            name = '%s%s.js' % (BUNDLE_PREFIX,
+                                hashlib.sha1(text.encode('utf-8')).hexdigest()[:12])
+            path = os.path.join(self.html_root, name)
+            if not os.path.exists(path):
+                os.makedirs(self.html_root, exist_ok=True)
+                # Written aside and renamed into place: a browser (or an
+                # upload) never sees half a bundle under its final name.
+                fd, tmp = tempfile.mkstemp(prefix='.' + BUNDLE_PREFIX, dir=self.html_root)
+                try:
+                    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                        f.write(text)
+                    os.chmod(tmp, 0o644)
+                    os.replace(tmp, path)
+                except Exception:
+                    os.unlink(tmp)
+                    raise
+                log.info('Compiled the page strings into %s', name)
+                self._prune(name)
+            if self.fingerprint is not None:
+                _compiled[(self.html_root, self.fingerprint)] = name
+            return name
+        except Exception as e:
+            log.error('Could not write the page strings bundle (%s); they stay inline', e)
+            return None
+
+
+    def _prune(self, keep: str) -> None:
+        """Delete every bundle in html_root but keep.  Best effort: a
+        bundle that cannot be deleted is only a few kilobytes."""
+        try:
+            names = os.listdir(self.html_root)
+        except OSError:
+            return
+        for name in names:
+            if name != keep and _BUNDLE_RE.match(name):
+                try:
+                    os.unlink(os.path.join(self.html_root, name))
+                except OSError as e:
+                    log.debug('Could not delete the old bundle %s (%s)', name, e)
+
+
+class CelestialTexts(SearchList):
+    """Exposes $texts_bundle to the Celestial skin's templates."""
+
+    def __init__(self, generator) -> None:
+        SearchList.__init__(self, generator)
+
+    def get_extension_list(self, timespan, db_lookup) -> List[Dict[str, Any]]:
+        bundle: Optional[TextsBundle] = None
+        try:
+            skin_dict = self.generator.skin_dict
+            html_root = os.path.join(self.generator.config_dict.get('WEEWX_ROOT', ''),
+                                     skin_dict['HTML_ROOT'])
+            bundle = TextsBundle(html_root, skin_dict)
+        except Exception as e:
+            log.error('Page strings bundle unavailable (%s); they stay inline', e)
+        return [{'texts_bundle': bundle}]
@@ -14,6 +14,8 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
+import hashlib
+import json
 import os
 import sys
 import weewx
@@ -63,10 +65,15 @@ class CelestialInstaller(ExtensionInstaller):
             files = [
                 ('bin/user', [
                     'bin/user/celestial.py',
+                    'bin/user/celestial_drawings.py',
                     'bin/user/celestial_sky.py',
+                    'bin/user/celestial_texts.py',
                     ]),
                 ('skins/Celestial', [
                     'skins/Celestial/celestial.css',
+                    'skins/Celestial/celestial.js',
+                    'skins/Celestial/celestial-motion.js',
+                    'skins/Celestial/celestial-sw.js',
                     'skins/Celestial/dome-svg.txt.tmpl',
                     'skins/Celestial/dome-svg-1.txt.tmpl',
                     'skins/Celestial/dome-svg-2.txt.tmpl',
@@ -78,6 +85,7 @@ class CelestialInstaller(ExtensionInstaller):
                     'skins/Celestial/dome-svg-8.txt.tmpl',
                     'skins/Celestial/dome-svg-9.txt.tmpl',
                     'skins/Celestial/dome-svg-frag.inc',
+                    'skins/Celestial/ephemeris-track.json.tmpl',
                     'skins/Celestial/index.html.tmpl',
                     'skins/Celestial/pass-chart.txt.tmpl',
                     'skins/Celestial/realtime_updater.inc',
@@ -111,7 +119,14 @@ class CelestialInstaller(ExtensionInstaller):
         configuration's own [Skyfield] [[Satellites]] and [[Comets]]
         included.  Honors weectl's dry run.  Returns True exactly when
         the configuration was modified; any failure degrades to a
-        could-not-check line, never a failed install."""
+        could-not-check line, never a failed install.
+
+        A reinstall or upgrade that finds the line exactly as the last
+        install left it, for the same field set and the same
+        [[Satellites]] and [[Comets]], stops there: the migrator is not
+        run, nothing printed, the configuration untouched (see
+        FIELDS_STATE).  When only the satellite or comet set moved, just
+        the new tags' entries are checked."""
         try:
             return self._update_fields(engine)
         except Exception as e:
@@ -119,12 +134,92 @@ class CelestialInstaller(ExtensionInstaller):
                                '(%s); the README shows what the page reads.' % e)
             return False
 
-    def _update_fields(self, engine):
-        celestial = self._load_bundled_celestial()
-        config = engine.config_dict
+    # The state configure() last left the fields line complete for, as
+    # json in this extension's installer directory (EXT_DIR/celestial,
+    # which weectl removes on uninstall): a hash of the field set the
+    # migrator provisions and renames (_field_set), the configured
+    # satellite and comet tags (None where there is no section, as the
+    # migrator reads them), and a hash of the line itself, so an edit by hand or a restored weewx.conf is
+    # never mistaken for the reconciled line.  Only a line with nothing
+    # left to hint is recorded.
+    FIELDS_STATE = 'fields-state.json'
+
+    @staticmethod
+    def _field_set(celestial):
+        """A hash of what the bundled migrator provisions and renames: the
+        page's fields, the per-satellite and per-comet members, and the
+        rename tables.  A release that leaves all of them alone keeps
+        the fingerprint -- a version bump alone checks nothing -- and
+        one that changes any of them checks the line whole again."""
+        field_set = [celestial._MIGRATION_NEW_FIELDS, celestial._SATELLITE_MEMBERS,
+                     celestial._COMET_MEMBERS, celestial._MIGRATION_UPGRADED_FIELDS,
+                     celestial._MIGRATION_FIELD_MAP]
+        return hashlib.sha1(json.dumps(field_set, sort_keys=True)
+                            .encode('utf-8')).hexdigest()
+
+    def _reconciled_state(self, celestial, config):
         try:
             fields = config['LoopData']['Include']['fields']
         except KeyError:
+            return None
+        if isinstance(fields, str):
+            fields = [f.strip() for f in fields.split(',') if f.strip()]
+        state = {'field_set': self._field_set(celestial),
+                 'fields': hashlib.sha1('\n'.join(fields).encode('utf-8')).hexdigest()}
+        for key in ('Satellites', 'Comets'):
+            try:
+                state[key.lower()] = list(config['Skyfield'][key].keys())
+            except (KeyError, AttributeError):
+                state[key.lower()] = None
+        return state
+
+    def _state_path(self, engine):
+        ext_dir = getattr(engine, 'root_dict', {}).get('EXT_DIR')
+        return os.path.join(ext_dir, self['name'], self.FIELDS_STATE) if ext_dir else None
+
+    def _read_state(self, engine):
+        path = self._state_path(engine)
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (TypeError, OSError, ValueError):
+            return None
+
+    def _write_state(self, engine, state):
+        path = self._state_path(engine)
+        if path is None or state is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, sort_keys=True)
+        except OSError:
+            pass   # the next install simply checks the whole line again
+
+    @staticmethod
+    def _new_tag_fields(celestial, line, previous, state):
+        """The entries of the satellites and comets configured since
+        previous (tags the migrator provisions, defaults included) that
+        the line lacks."""
+        wanted = []
+        for key, defaults, fields in (
+                ('satellites', celestial._INSTALLER_DEFAULT_SATELLITES, celestial.satellite_fields),
+                ('comets', celestial._INSTALLER_DEFAULT_COMETS, celestial.comet_fields)):
+            before = defaults if previous[key] is None else previous[key]
+            for tag in defaults if state[key] is None else state[key]:
+                if tag not in before:
+                    wanted.extend(fields(tag))
+        return [f for f in dict.fromkeys(wanted) if f not in line]
+
+    def _update_fields(self, engine):
+        config = engine.config_dict
+        celestial = self._load_bundled_celestial()
+        state = self._reconciled_state(celestial, config)
+        previous = self._read_state(engine)
+        if state is not None and state == previous:
+            return False
+        line = celestial.FieldsLine.from_config(config)
+        if line is None:
             engine.printer.out(
                 'Note: no [LoopData] [[Include]] fields entry found.  The '
                 "page's live values are weewx-loopdata almanac fields; "
@@ -132,11 +227,18 @@ class CelestialInstaller(ExtensionInstaller):
                 '--migrate-loopdata-fields utility to write the fields line '
                 '(the README shows the commands).')
             return False
-        if isinstance(fields, str):
-            fields = [f.strip() for f in fields.split(',') if f.strip()]
-        _, report = celestial.migrate_loopdata_fields(
-            list(fields), celestial._configured_satellites(config),
-            celestial._configured_comets(config))
+        if (isinstance(previous, dict) and state is not None
+                and all(previous.get(k) == state[k] for k in ('field_set', 'fields'))
+                and all(k in previous for k in ('satellites', 'comets'))):
+            # The line is as the last install left it, complete, and the
+            # page's field set has not changed: only the satellites and
+            # comets moved, and only the new ones can be missing.
+            report = {'added': self._new_tag_fields(celestial, line, previous, state),
+                      'renamed': []}
+        else:
+            _, report = celestial.migrate_loopdata_fields(
+                line.fields(), celestial._configured_satellites(config),
+                celestial._configured_comets(config))
         modified = False
         if report['added']:
             if getattr(engine, 'dry_run', False):
@@ -145,8 +247,8 @@ class CelestialInstaller(ExtensionInstaller):
                     '[[Include]] fields (dry run; existing entries are '
                     'never touched).' % len(report['added']))
             else:
-                config['LoopData']['Include']['fields'] = (
-                    list(fields) + list(report['added']))
+                line.add(report['added'])
+                line.write(config)
                 engine.printer.out(
                     'Appended %d entries the page reads to [LoopData] '
                     '[[Include]] fields (append-only: existing entries are '
@@ -187,6 +289,8 @@ class CelestialInstaller(ExtensionInstaller):
                                'the word-diff shows them in place -- a plain diff '
                                'is unreadable on one long fields line), then move '
                                'the file into place.  See the README for detail.')
+        elif not getattr(engine, 'dry_run', False):
+            self._write_state(engine, self._reconciled_state(celestial, config))
         return modified
 
     @staticmethod
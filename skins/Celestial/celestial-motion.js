@@ -0,0 +1,211 @@
+// Copyright (C)2022-2026 by John A Kline (john@johnkline.com)
+// See LICENSE.txt for your rights
+//
+// The Celestial page's motion pipeline: the ten-minute loop-packet
+// history, held as fixed typed-array rings, and the least-squares motion
+// model the page extrapolates with between packets.  One file, two ways in:
+//
+//   - as a dedicated Worker (celestial.js's startMotion), which
+//     is the normal case.  The page posts each NEW packet as one
+//     Float64Array of the motion fields, in the order of a schema it sent
+//     once; the worker keeps the history and posts back the fitted
+//     velocities, accelerations and residuals, in the same order.  Nothing else crosses: no whole records, no
+//     string keys, and the arrays are transferred, not copied.
+//   - as a plain <script> in the page's head, defining CelestialMotion
+//     for the in-page fallback where a Worker cannot be had (file://
+//     pages, which most browsers refuse one, and engines without them).
+//     Same code, so the two paths cannot disagree.
+//
+// The motion changes only when a packet arrives, so it is fitted once
+// per packet, here, and the page's one-second tick reads it out of an
+// array -- never re-deriving it from stored records for every body on
+// every tick.
+//
+// ES5, like the page.  Runs at window scope when loaded as a script, so
+// its one top-level name must not collide with a window built-in.
+var CelestialMotion = (function() {
+  'use strict';
+
+  // schema: [{key: 'almanac.sun.az', wrap: true, degree: 1,
+  // window: 600}, ...] -- wrap marks an azimuth, whose differences are
+  // taken the short way round north; degree and window choose the fit
+  // (see fits).  horizon: seconds of history kept.  capacity: the most packets that
+  // horizon can hold at the page's poll rate (see startMotion); a feed
+  // that somehow outruns it loses its oldest packets early, never the
+  // newest.
+  //
+  // Column-oriented and fixed-size: one Float64Array ring per field plus
+  // one of packet times, all allocated here and never again.  A packet is
+  // a row written at the head; trimming to the horizon moves an index,
+  // not an array's contents.  Missing values are NaN.
+  function History(schema, horizon, capacity) {
+    var i;
+    this.n = schema.length;
+    this.wrap = new Uint8Array(this.n);
+    this.degree = new Uint8Array(this.n);
+    this.win = new Float64Array(this.n);
+    for (i = 0; i < this.n; i++) {
+      this.wrap[i] = schema[i].wrap ? 1 : 0;
+      this.degree[i] = schema[i].degree === 2 ? 2 : 1;
+      this.win[i] = schema[i].window || horizon;
+    }
+    this.horizon = horizon;
+    this.cap = Math.max(2, capacity || 2);
+    this.t = new Float64Array(this.cap);
+    // One field's points at a time, for the fit; reused, never grown.
+    this.scratchT = new Float64Array(this.cap);
+    this.scratchY = new Float64Array(this.cap);
+    this.cols = [];
+    for (i = 0; i < this.n; i++) {
+      this.cols.push(new Float64Array(this.cap));
+    }
+    this.head = 0;         // the slot the NEXT packet is written to
+    this.len = 0;          // packets held
+  }
+
+  // Ring slot of the k-th held packet, 0 = oldest.
+  History.prototype.slot = function(k) {
+    return (this.head - this.len + k + this.cap) % this.cap;
+  };
+
+  History.prototype.push = function(t, v) {
+    if (this.len > 0 && t <= this.t[this.slot(this.len - 1)]) {
+      return false;        // the same (or an older) packet again
+    }
+    var h = this.head;
+    this.t[h] = t;
+    for (var i = 0; i < this.n; i++) {
+      this.cols[i][h] = v[i];
+    }
+    this.head = (h + 1) % this.cap;
+    if (this.len < this.cap) {
+      this.len++;
+    }
+    while (this.len > 0 && t - this.t[this.slot(0)] > this.horizon) {
+      this.len--;
+    }
+    return true;
+  };
+
+  // The least-squares motion model of field i over the packets no older
+  // than `win` seconds before the newest: a straight line (degree 1) or
+  // a parabola (degree 2), in time measured from the newest packet, so
+  // the coefficients ARE the motion at the newest packet -- the one the
+  // page extrapolates from.  Returns [velocity (per second),
+  // acceleration (per second squared), rms residual (the field's own
+  // units)]; NaN throughout when fewer than two packets carry the field.
+  // A parabola with fewer than three points, or with all its points
+  // bunched in time, falls back to the line.
+  //
+  // Azimuths are unwrapped first: each is carried on from its neighbour
+  // the short way round north, so a body crossing 0/360 is a smooth
+  // curve to the fit rather than a 360-degree cliff.
+  History.prototype.fit = function(i, win, degree) {
+    var col = this.cols[i], wrap = this.wrap[i];
+    var tLast = this.t[this.slot(this.len - 1)];
+    var m = 0, prev = NaN, acc = 0;
+    var s0 = 0, s1 = 0, s2 = 0, s3 = 0, s4 = 0, sy = 0, sty = 0, st2y = 0;
+    var ts = this.scratchT, ys = this.scratchY, k;
+    for (k = 0; k < this.len; k++) {
+      var sl = this.slot(k);
+      var tau = this.t[sl] - tLast;
+      var y = col[sl];
+      if (tau < -win || isNaN(y)) {
+        continue;
+      }
+      if (wrap) {
+        if (!isNaN(prev)) {
+          acc += ((y - prev + 540) % 360) - 180;
+        }
+        prev = y;
+        y = acc;
+      }
+      ts[m] = tau;
+      ys[m] = y;
+      m++;
+    }
+    if (m < 2) {
+      return [NaN, NaN, NaN];
+    }
+    for (k = 0; k < m; k++) {
+      var t1 = ts[k], t2 = t1 * t1;
+      s0 += 1; s1 += t1; s2 += t2; s3 += t2 * t1; s4 += t2 * t2;
+      sy += ys[k]; sty += t1 * ys[k]; st2y += t2 * ys[k];
+    }
+    var b0, b1, b2 = 0;
+    var det = (degree >= 2 && m >= 3)
+        ? s0 * (s2 * s4 - s3 * s3) - s1 * (s1 * s4 - s3 * s2) + s2 * (s1 * s3 - s2 * s2)
+        : 0;
+    if (det > 1e-9 * s0 * s2 * s4) {
+      // The 3x3 normal equations by Cramer's rule.
+      b0 = (sy * (s2 * s4 - s3 * s3) - s1 * (sty * s4 - s3 * st2y)
+            + s2 * (sty * s3 - s2 * st2y)) / det;
+      b1 = (s0 * (sty * s4 - st2y * s3) - sy * (s1 * s4 - s3 * s2)
+            + s2 * (s1 * st2y - sty * s2)) / det;
+      b2 = (s0 * (s2 * st2y - s3 * sty) - s1 * (s1 * st2y - s2 * sty)
+            + sy * (s1 * s3 - s2 * s2)) / det;
+    } else {
+      var d = s0 * s2 - s1 * s1;
+      if (d < 1) {
+        return [NaN, NaN, NaN];          // under a second of spread
+      }
+      b1 = (s0 * sty - s1 * sy) / d;
+      b0 = (sy - b1 * s1) / s0;
+    }
+    var ss = 0;
+    for (k = 0; k < m; k++) {
+      var r = ys[k] - (b0 + b1 * ts[k] + b2 * ts[k] * ts[k]);
+      ss += r * r;
+    }
+    return [b1, 2 * b2, Math.sqrt(ss / m)];
+  };
+
+  // Every field's fitted motion at the newest packet, NaN where there is
+  // none yet, in schema order.  The schema says, per field, how far back
+  // to look and which curve to fit:
+  //   - the planets, the moon, the sun and the comets: a line over the
+  //     whole horizon, so short-window jitter averages out of a drift
+  //     that is steady over ten minutes;
+  //   - the satellites: a parabola over a short window.  A LEO pass
+  //     curves through its whole ~10 minutes, so a ring-long line lags
+  //     the turn and every packet snapped the mark back a few pixels;
+  //     the curvature term follows the turn between packets, which is
+  //     what lets a slower refresh_rate still move a satellite smoothly.
+  History.prototype.fits = function() {
+    var rate = new Float64Array(this.n);
+    var accel = new Float64Array(this.n);
+    var resid = new Float64Array(this.n);
+    for (var i = 0; i < this.n; i++) {
+      var f = this.len < 2 ? [NaN, NaN, NaN]
+                           : this.fit(i, this.win[i], this.degree[i]);
+      rate[i] = f[0];
+      accel[i] = f[1];
+      resid[i] = f[2];
+    }
+    return {rate: rate, accel: accel, resid: resid};
+  };
+
+  return {History: History};
+})();
+
+if (typeof importScripts === 'function' && typeof document === 'undefined') {
+  // Running as the page's Worker.  Messages are either the schema (once,
+  // first) or a packet; every packet that is new gets the fitted motion
+  // back, stamped with the packet time it belongs to.
+  (function() {
+    var motion = null;
+    self.onmessage = function(e) {
+      var m = e.data;
+      if (m.schema) {
+        motion = new CelestialMotion.History(m.schema, m.horizon, m.capacity);
+        return;
+      }
+      if (motion === null || !motion.push(m.t, m.v)) {
+        return;
+      }
+      var f = motion.fits();
+      self.postMessage({t: m.t, rate: f.rate, accel: f.accel, resid: f.resid},
+                       [f.rate.buffer, f.accel.buffer, f.resid.buffer]);
+    };
+  })();
+}
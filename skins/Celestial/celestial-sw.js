@@ -0,0 +1,218 @@
+// Copyright (C)2022-2026 by John A Kline (john@johnkline.com)
+// See LICENSE.txt for your rights
+//
+// The Celestial page's OPTIONAL service worker (service_worker in
+// [Extras]; off by default).  Registered by celestial.js from the
+// report's own directory, so its scope is this report and nothing else
+// on the server.  It caches exactly two kinds of response, each by the
+// one identity that makes the cached copy provably the same as a fresh
+// one:
+//
+//   - the copy_once static assets (celestial.css, celestial.js, sky.js
+//     and celestial-motion.js), cache-first, keyed by their version-tagged
+//     URL.  An upgrade changes the ?v= tag the page asks for and the
+//     worker's own ?v=, and the activate handler below drops every other
+//     version's cache.  The compiled page strings
+//     (celestial-texts-<hash>.js) join them untagged: their name is
+//     already a hash of their contents.
+//   - the dome backdrops (dome-svg.txt, dome-svg-1..9.txt), keyed by the
+//     data-dome-ts they carry.  The file NAME is reused every cycle -- it
+//     names a slot, never a cycle -- so a name alone identifies nothing;
+//     but a fragment depicting a given instant is immutable once written.
+//     The page says which instant it wants (&want=, see refreshDome), and
+//     only a cached fragment stamped exactly that is served without
+//     asking the station.  Anything else goes to the network, and what
+//     comes back is stored under its own stamp, evicting every fragment
+//     from an older cycle.
+//
+// Everything else -- the loop feed, the pass chart, whatever else shares
+// the directory -- passes straight through: those are live files, and a
+// cache in front of them would only ever be wrong.  The page document
+// itself is network-first, with the last copy that arrived kept for a
+// reload made while the network is down.
+//
+// The page's own guards still judge every fragment this worker hands it
+// (never backward, never ahead of the station's clock), so a cached
+// answer can cost a refetch at worst, never a wrong sky.
+//
+// ES5, like the page: no arrow functions, no const/let.
+'use strict';
+
+var SW_VERSION = (/[?&]v=([^&]*)/.exec(self.location.search) || [null, ''])[1];
+var STATIC_PREFIX = 'celestial-static-';
+var STATIC_CACHE = STATIC_PREFIX + SW_VERSION;
+var FRAG_CACHE = 'celestial-frags';
+var PAGE_CACHE = 'celestial-page';
+var STATIC_RE = /\/(celestial\.css|celestial\.js|celestial-motion\.js|sky\.js)$/;
+var TEXTS_RE = /\/celestial-texts-[0-9a-f]+\.js$/;
+var FRAG_RE = /\/dome-svg(-[1-9])?\.txt$/;
+
+self.addEventListener('install', function(event) {
+  // Nothing is precached: the page has just fetched everything this
+  // worker would want, and the first request through it fills the cache.
+  self.skipWaiting();
+});
+
+self.addEventListener('activate', function(event) {
+  event.waitUntil(caches.keys().then(function(names) {
+    return Promise.all(names.filter(function(n) {
+      return n.indexOf(STATIC_PREFIX) === 0 && n !== STATIC_CACHE;
+    }).map(function(n) {
+      return caches.delete(n);
+    }));
+  }).then(function() {
+    return self.clients.claim();
+  }));
+});
+
+function stampOf(text, attr) {
+  var m = new RegExp('data-dome-' + attr + '="([0-9.]+)"').exec(text);
+  return m === null ? NaN : parseFloat(m[1]);
+}
+
+function fragKey(url, ts) {
+  // One key per depicted instant: the fragment's path plus its stamp,
+  // never the page's cache-busting ?ts= (a browser clock reading that
+  // would make every key unique).
+  return url.origin + url.pathname + '?dome-ts=' + ts;
+}
+
+function keyTs(key) {
+  var m = /[?&]dome-ts=([0-9.]+)/.exec(key);
+  return m === null ? NaN : parseFloat(m[1]);
+}
+
+function storeFragment(url, text, type) {
+  var ts = stampOf(text, 'ts');
+  if (!isFinite(ts)) {
+    // An empty slot (beyond the archive interval) or a pre-stagger
+    // backdrop: nothing to key it by, so nothing is kept.
+    return Promise.resolve();
+  }
+  // The cycle this fragment belongs to starts at ts - slot*step; every
+  // fragment depicting an instant before that is a past cycle's, and no
+  // page will ask for it again.
+  var slot = stampOf(text, 'slot');
+  var step = stampOf(text, 'step');
+  var base = (isFinite(slot) && isFinite(step)) ? ts - slot * step : ts;
+  return caches.open(FRAG_CACHE).then(function(cache) {
+    return cache.put(fragKey(url, ts), new Response(text, {
+      headers: {'Content-Type': type || 'text/plain'}
+    })).then(function() {
+      return cache.keys();
+    }).then(function(keys) {
+      return Promise.all(keys.filter(function(req) {
+        return keyTs(req.url) < base;
+      }).map(function(req) {
+        return cache.delete(req);
+      }));
+    });
+  });
+}
+
+function newestFragment(url) {
+  // The freshest fragment kept for this file name: the answer of last
+  // resort when the station cannot be reached.  The page refuses it if
+  // it is not newer than the sky already showing.
+  return caches.open(FRAG_CACHE).then(function(cache) {
+    return cache.keys().then(function(keys) {
+      var best = null, bestTs = -Infinity;
+      keys.forEach(function(req) {
+        var ts = keyTs(req.url);
+        if (req.url.indexOf(url.origin + url.pathname + '?') === 0 && ts > bestTs) {
+          best = req;
+          bestTs = ts;
+        }
+      });
+      return best === null ? undefined : cache.match(best);
+    });
+  });
+}
+
+function fragment(request, url) {
+  var want = parseFloat(url.searchParams.get('want'));
+  var cached = isFinite(want)
+      ? caches.open(FRAG_CACHE).then(function(cache) {
+          return cache.match(fragKey(url, want));
+        })
+      : Promise.resolve(undefined);
+  return cached.then(function(hit) {
+    if (hit !== undefined) {
+      return hit;
+    }
+    return fetch(request).then(function(response) {
+      if (response.ok) {
+        var type = response.headers.get('Content-Type');
+        response.clone().text().then(function(text) {
+          return storeFragment(url, text, type);
+        }).catch(function() {});
+      }
+      return response;
+    }, function(err) {
+      return newestFragment(url).then(function(kept) {
+        if (kept === undefined) {
+          throw err;
+        }
+        return kept;
+      });
+    });
+  });
+}
+
+function staticAsset(request) {
+  return caches.open(STATIC_CACHE).then(function(cache) {
+    return cache.match(request).then(function(hit) {
+      if (hit !== undefined) {
+        return hit;
+      }
+      return fetch(request).then(function(response) {
+        if (response.ok) {
+          cache.put(request, response.clone());
+        }
+        return response;
+      });
+    });
+  });
+}
+
+function page(request) {
+  return fetch(request).then(function(response) {
+    if (response.ok) {
+      var copy = response.clone();
+      caches.open(PAGE_CACHE).then(function(cache) {
+        return cache.put(request.url.split('?')[0], copy);
+      });
+    }
+    return response;
+  }, function(err) {
+    return caches.open(PAGE_CACHE).then(function(cache) {
+      return cache.match(request.url.split('?')[0]);
+    }).then(function(kept) {
+      if (kept === undefined) {
+        throw err;
+      }
+      return kept;
+    });
+  });
+}
+
+self.addEventListener('fetch', function(event) {
+  var request = event.request;
+  if (request.method !== 'GET') {
+    return;
+  }
+  var url = new URL(request.url);
+  if (url.origin !== self.location.origin) {
+    return;
+  }
+  if (FRAG_RE.test(url.pathname)) {
+    event.respondWith(fragment(request, url));
+  } else if ((STATIC_RE.test(url.pathname) && /[?&]v=/.test(url.search))
+             || TEXTS_RE.test(url.pathname)) {
+    // Only the version-tagged URLs: an untagged one (a page generated
+    // without [Extras] version) has no identity to key on.
+    event.respondWith(staticAsset(request));
+  } else if (request.mode === 'navigate') {
+    event.respondWith(page(request));
+  }
+});
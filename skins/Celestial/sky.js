@@ -2,8 +2,10 @@
    COPIED from weewx-skyfield skins/Skyfield/sky.js (v2.0) -- that repo
    is the source of truth; re-copy this file when upgrading, never fork.
    Here the .skytip rule lives at the end of celestial.css, and
-   realtime_updater.inc hides an open chip on every fragment swap (a
-   chip does not follow its mark, and this page's marks move).
+   celestial.js hides an open chip on every fragment swap (a
+   chip does not follow its mark, and this page's marks move), and
+   answers taps on the dome itself (domeTap: nearHit below measures
+   every star per tap).
    Tap tooltips for the Sky page's SVG panels.  Every mark already
    carries a native SVG <title> -- the browser shows it on hover, but
    touch has no hover, so a tap finds the mark and shows the same text
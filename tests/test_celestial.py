@@ -25,6 +25,7 @@ import contextlib
 import inspect
 import json
 import logging
+import math
 import os
 import re
 import sys
@@ -95,6 +96,36 @@ LOOPDATA_DIRS = [
 SKIN_DIR = os.path.join(REPO_ROOT, 'skins', 'Celestial')
 
 
+def page_script():
+    """The page's javascript as one text: the per-station config half
+    (realtime_updater.inc) followed by the static script it feeds
+    (celestial.js)."""
+    parts = []
+    for name in ('realtime_updater.inc', 'celestial.js'):
+        with open(os.path.join(SKIN_DIR, name), encoding='utf-8') as f:
+            parts.append(f.read())
+    return '\n'.join(parts)
+
+
+def page_config(html):
+    """The per-station settings a rendered page hands celestial.js (the
+    inline JSON block realtime_updater.inc writes)."""
+    m = re.search(r'<script type="application/json" id="celestial-config">'
+                  r'(.*?)</script>', html, re.S)
+    assert m is not None, 'the page lost its config block'
+    return json.loads(m.group(1))
+
+
+# The skin's copy_once files, which a browser test serves beside the
+# generated page: everything index.html loads by URL.  Read from
+# skin.conf, so a newly shipped asset is served without touching every
+# browser test.
+with open(os.path.join(SKIN_DIR, 'skin.conf'), encoding='utf-8') as _f:
+    COPIED_ASSETS = tuple(
+        a.strip() for a in re.search(r'^\s*copy_once\s*=\s*(.*)$', _f.read(),
+                                     re.M).group(1).split(',') if a.strip())
+
+
 def load_wxskyfield():
     """Import the weewx-skyfield extension (the report almanac the skin
     renders from) and return (module, its user_root), or skip the calling
@@ -146,6 +177,106 @@ def make_sky_page(texts=None, theme=None):
     return wxskyfield_sky.SkyPage(skin_dict)
 
 
+def make_sky_drawings():
+    """$sky_drawings for render tests (what celestial_drawings serves in
+    production), at a report time of its own: nothing one render draws is
+    handed to another's template."""
+    import celestial_drawings
+    return celestial_drawings.SkyDrawings(object(), None)
+
+
+# Just enough of the DOM for patchNode and flattenStars to run under node
+# (no browser, no jsdom): element and text nodes, attributes in order,
+# child lists with insertBefore/removeChild, tag-name queries, and a
+# serializer to compare trees by.
+MINI_DOM_JS = r"""
+function N(type, name, value) {
+  this.nodeType = type;
+  this.nodeName = name;
+  this.nodeValue = value || null;
+  this.attributes = [];
+  this.childNodes = [];
+  this.parentNode = null;
+}
+Object.defineProperty(N.prototype, 'firstChild', {get: function() {
+  return this.childNodes[0] || null;
+}});
+Object.defineProperty(N.prototype, 'nextSibling', {get: function() {
+  if (!this.parentNode) { return null; }
+  var l = this.parentNode.childNodes;
+  return l[l.indexOf(this) + 1] || null;
+}});
+N.prototype.getAttribute = function(n) {
+  for (var i = 0; i < this.attributes.length; i++) {
+    if (this.attributes[i].name === n) { return this.attributes[i].value; }
+  }
+  return null;
+};
+N.prototype.hasAttribute = function(n) { return this.getAttribute(n) !== null; };
+N.prototype.setAttribute = function(n, v) {
+  writes++;
+  for (var i = 0; i < this.attributes.length; i++) {
+    if (this.attributes[i].name === n) { this.attributes[i].value = String(v); return; }
+  }
+  this.attributes.push({name: n, value: String(v)});
+};
+N.prototype.removeAttribute = function(n) {
+  this.attributes = this.attributes.filter(function(a) { return a.name !== n; });
+};
+N.prototype.removeChild = function(c) {
+  var i = this.childNodes.indexOf(c);
+  if (i < 0) { throw new Error('NotFoundError'); }
+  this.childNodes.splice(i, 1);
+  c.parentNode = null;
+  return c;
+};
+N.prototype.insertBefore = function(c, ref) {
+  if (c.parentNode) { c.parentNode.removeChild(c); }
+  if (ref === null) {
+    this.childNodes.push(c);
+  } else {
+    var i = this.childNodes.indexOf(ref);
+    if (i < 0) { throw new Error('NotFoundError'); }
+    this.childNodes.splice(i, 0, c);
+  }
+  c.parentNode = this;
+  return c;
+};
+N.prototype.appendChild = function(c) { return this.insertBefore(c, null); };
+Object.defineProperty(N.prototype, 'textContent', {get: function() {
+  return this.nodeType === 3 ? this.nodeValue
+                             : this.childNodes.map(function(c) { return c.textContent; }).join('');
+}});
+// Tag names only ('svg', 'circle, line'), in document order.
+N.prototype.querySelectorAll = function(sel) {
+  var tags = sel.split(',').map(function(t) { return t.trim(); }), out = [];
+  (function walk(n) {
+    n.childNodes.forEach(function(c) {
+      if (c.nodeType === 1 && tags.indexOf(c.nodeName) >= 0) { out.push(c); }
+      walk(c);
+    });
+  })(this);
+  return out;
+};
+N.prototype.querySelector = function(sel) { return this.querySelectorAll(sel)[0] || null; };
+var document = {createElementNS: function(ns, name) { return el(name, {}); }};
+var writes = 0;
+function el(name, attrs, kids) {
+  var n = new N(1, name);
+  for (var k in attrs) { n.attributes.push({name: k, value: String(attrs[k])}); }
+  (kids || []).forEach(function(c) { n.childNodes.push(c); c.parentNode = n; });
+  return n;
+}
+function tx(v) { return new N(3, '#text', v); }
+function ser(n) {
+  if (n.nodeType === 3) { return n.nodeValue; }
+  return '<' + n.nodeName + n.attributes.map(function(a) {
+    return ' ' + a.name + '="' + a.value + '"';
+  }).join('') + '>' + n.childNodes.map(ser).join('') + '</' + n.nodeName + '>';
+}
+"""
+
+
 def rewindow_pass_chart(markup, rise, sset):
     """Move a rendered pass chart's OWN window (skyfield 2.3.2's
     data-rise/data-set on the track) to the given epochs.  The fixture
@@ -422,6 +553,318 @@ class TestCelestialSkyPage:
         assert hasattr(entry['sky_page'], 'dome_svg')
 
 
+class TestSkyDrawings:
+    """8.3.6's shared drawings (bin/user/celestial_drawings.py): each dome
+    and pass chart drawn once per report cycle for every template and
+    report that asks, known by explicit keys -- report time, instant,
+    station, lang, units, texts, plate -- and, optionally, kept on disk for every
+    process pointed at the same directory."""
+
+    class FakeSkyPage:
+        def __init__(self, lang, calls):
+            self.lang = lang
+            self.calls = calls
+
+        def dome_svg(self, almanac, palette='night'):
+            self.calls.append(('dome_svg', self.lang, almanac.time_ts, palette))
+            if palette == 'boom':
+                raise RuntimeError('boom')
+            return '<svg data-ts="%d">%s</svg>' % (almanac.time_ts, self.lang)
+
+    @staticmethod
+    def _drawings(lang, stop, extras=None, root='', **sections):
+        import celestial_drawings
+
+        class Obj:
+            pass
+        generator = Obj()
+        generator.skin_dict = dict(sections, lang=lang, Extras=extras or {})
+        generator.config_dict = {'WEEWX_ROOT': root}
+        span = Obj()
+        span.stop = stop
+        [entry] = celestial_drawings.CelestialSkyDrawings(generator).get_extension_list(
+            span, None)
+        return entry['sky_drawings']
+
+    @staticmethod
+    def _almanac(ts, lat=LATITUDE):
+        return weewx.almanac.Almanac(ts, lat, LONGITUDE, altitude=ALTITUDE_M)
+
+    def test_drawings_are_shared_per_cycle(self, monkeypatch):
+        """One drawing per report time, instant, station, lang and plate,
+        however many templates and reports ask and from however many
+        fresh almanacs; a failure is not remembered, and nothing is
+        carried into the next cycle."""
+        import celestial_drawings
+        monkeypatch.setattr(celestial_drawings, '_cycle', {'stop': None, 'drawn': {}})
+        calls = []
+        en_page, de_page = self.FakeSkyPage('en', calls), self.FakeSkyPage('de', calls)
+        en, de = self._drawings('en', TIME_TS), self._drawings('de', TIME_TS)
+        assert en.dome_svg(en_page, self._almanac(TIME_TS)) == (
+            '<svg data-ts="%d">en</svg>' % TIME_TS)
+        # Another template of the same report, another report in the
+        # same language: drawn already.
+        assert self._drawings('en', TIME_TS).dome_svg(
+            self.FakeSkyPage('en', calls), self._almanac(TIME_TS)) == (
+            '<svg data-ts="%d">en</svg>' % TIME_TS)
+        assert len(calls) == 1
+        # Another language, instant, plate or station is another drawing.
+        assert de.dome_svg(de_page, self._almanac(TIME_TS)).endswith('de</svg>')
+        en.dome_svg(en_page, self._almanac(TIME_TS + 60))
+        en.dome_svg(en_page, self._almanac(TIME_TS), 'light')
+        en.dome_svg(en_page, self._almanac(TIME_TS, lat=-LATITUDE))
+        assert len(calls) == 5
+        # A failure is the template's to guard, and is not remembered.
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                en.dome_svg(en_page, self._almanac(TIME_TS), 'boom')
+        assert calls.count(('dome_svg', 'en', TIME_TS, 'boom')) == 2
+        # What the page does not draw, $sky_drawings does not either.
+        with pytest.raises(AttributeError):
+            en.pass_chart_html(en_page, self._almanac(TIME_TS))
+        # The next report time starts over.
+        del calls[:]
+        self._drawings('en', TIME_TS + 300).dome_svg(en_page, self._almanac(TIME_TS))
+        assert calls == [('dome_svg', 'en', TIME_TS, 'night')]
+
+    def test_report_units_and_texts_are_part_of_the_key(self, monkeypatch):
+        """Two reports in one language still draw apart when one sets its
+        own unit_system or overrides [Units], [Texts], [Labels] or
+        [Almanac]; reports that agree on all of them share."""
+        import celestial_drawings
+        monkeypatch.setattr(celestial_drawings, '_cycle', {'stop': None, 'drawn': {}})
+        calls = []
+        page = self.FakeSkyPage('en', calls)
+        us = {'unit_system': 'us', 'Units': {'Groups': {'group_altitude': 'foot'}},
+              'Texts': {'Dome': 'Sky'}}
+        reports = [
+            us,
+            dict(us),
+            dict(us, unit_system='metric'),
+            dict(us, Units={'Groups': {'group_altitude': 'meter'}}),
+            dict(us, Texts={'Dome': 'Dome'}),
+            dict(us, Labels={'hemispheres': ['N', 'S', 'O', 'W']}),
+            dict(us, Almanac={'iss': 'ISS (Zarya)'}),
+        ]
+        for sections in reports:
+            self._drawings('en', TIME_TS, **sections).dome_svg(page, self._almanac(TIME_TS))
+        assert len(calls) == len(reports) - 1
+
+    def test_disk_cache_outlives_the_process(self, tmp_path, monkeypatch):
+        """[Extras] sky_cache_dir: a drawing made by one process is read,
+        not redrawn, by the next -- the in-memory sharing cleared stands
+        in for a new process."""
+        import celestial_drawings
+        calls = []
+        for _ in range(2):
+            monkeypatch.setattr(celestial_drawings, '_cycle', {'stop': None, 'drawn': {}})
+            drawings = self._drawings('en', TIME_TS, {'sky_cache_dir': 'cache'},
+                                      str(tmp_path))
+            assert drawings.dome_svg(self.FakeSkyPage('en', calls),
+                                     self._almanac(TIME_TS)).startswith('<svg')
+        assert len(calls) == 1
+        assert len(list((tmp_path / 'cache').glob('*.sky'))) == 1
+        assert list((tmp_path / 'cache').glob('.*')) == []
+        # One SkyCache per directory for the process: its count of the
+        # bytes on disk carries from cycle to cycle.
+        assert len([k for k in celestial_drawings._disk_caches
+                    if k[0] == str(tmp_path / 'cache')]) == 1
+
+        # Another weewx-skyfield is another drawing.
+        cache = celestial_drawings.SkyCache(str(tmp_path / 'cache'), 1 << 20)
+        key = ('dome_svg', 'x')
+        cache.put(key, 'a')
+        assert cache.get(key) == 'a'
+        cache.version += '-upgraded'
+        assert cache.get(key) is None
+
+    def test_disk_cache_evicts_least_recently_used(self, tmp_path, monkeypatch):
+        """The directory is listed at the first write and then only when
+        a write takes it over its cap; an eviction clears it to
+        three-quarters of the cap, least recently used first."""
+        import celestial_drawings
+        listings = []
+        listdir = os.listdir
+        monkeypatch.setattr(celestial_drawings.os, 'listdir',
+                            lambda path: listings.append(path) or listdir(path))
+        cache = celestial_drawings.SkyCache(str(tmp_path), 40)
+
+        def put(i):
+            cache.put(('k', i), 'x' * 10)
+            os.utime(cache._file(('k', i)), (1000 + i, 1000 + i))
+        for i in range(4):
+            put(i)
+        assert len(listings) == 1
+        # 50 bytes against a 40-byte cap: the two oldest go, leaving 30.
+        put(4)
+        assert len(listings) == 2
+        assert cache.get(('k', 0)) is None and cache.get(('k', 1)) is None
+        # Reading is using: k2 is now the newest, so k3 and k4 go next.
+        assert cache.get(('k', 2)) == 'x' * 10
+        put(5)
+        assert len(listings) == 2
+        put(6)
+        assert len(listings) == 3
+        assert cache.get(('k', 3)) is None and cache.get(('k', 4)) is None
+        assert cache.get(('k', 2)) == cache.get(('k', 5)) == cache.get(('k', 6)) == 'x' * 10
+
+    def test_disk_cache_counts_a_rewrite_once(self, tmp_path, monkeypatch):
+        """Rewriting a drawing replaces its file: the count moves by the
+        difference, so a key written over and over never reaches the
+        cap."""
+        import celestial_drawings
+        listings = []
+        listdir = os.listdir
+        monkeypatch.setattr(celestial_drawings.os, 'listdir',
+                            lambda path: listings.append(path) or listdir(path))
+        cache = celestial_drawings.SkyCache(str(tmp_path), 40)
+        for text in ('x' * 10, 'x' * 10, 'x' * 30, 'x' * 5, 'x' * 5):
+            cache.put(('k',), text)
+        assert cache._total == 5
+        assert len(listings) == 1
+        assert cache.get(('k',)) == 'x' * 5
+
+    def test_disk_cache_failures_are_misses(self, tmp_path):
+        import celestial_drawings
+        blocker = tmp_path / 'file'
+        blocker.write_text('')
+        cache = celestial_drawings.SkyCache(str(blocker / 'cache'), 1 << 20)
+        cache.put(('k',), 'x')
+        assert cache.get(('k',)) is None
+
+
+class TestTextsBundle:
+    """8.3.6's compiled page strings (bin/user/celestial_texts.py): the
+    table the page's javascript composes from is written once per
+    language as celestial-texts-<hash>.js, named by its own contents, and
+    the page loads it instead of carrying the table inline.  Never a
+    failure of the report: no bundle means the inline table, as before."""
+
+    @staticmethod
+    def _bundle(tmp_path, **skin):
+        import celestial_texts
+        skin_dict = {'lang': 'en', 'Texts': {'LIVE': 'LIVE'},
+                     'Extras': {'version': celestial.CELESTIAL_VERSION}}
+        skin_dict.update(skin)
+        return celestial_texts.TextsBundle(str(tmp_path), skin_dict)
+
+    def test_compiles_once_by_content(self, tmp_path, monkeypatch):
+        import celestial_texts
+        monkeypatch.setattr(celestial_texts, '_compiled', {})
+        texts = {'T': {'LIVE': 'LIVE'}, 'body_labels': {'moon': 'Moon'},
+                 'cardinals': ['N', 'E', 'S', 'W']}
+        bundle = self._bundle(tmp_path)
+        assert bundle.href is None
+        name = bundle.compile(texts)
+        assert re.match(r'celestial-texts-[0-9a-f]{12}\.js$', name)
+        path = tmp_path / name
+        text = path.read_text(encoding='utf-8')
+        assert text.startswith('var CELESTIAL_TEXTS = ') and text.endswith(';\n')
+        assert json.loads(text[len('var CELESTIAL_TEXTS = '):-2]) == texts
+        # The same inputs answer from memory; the same strings are never
+        # written again (a restarted weewxd, a second report).
+        assert bundle.href == name
+        os.utime(path, (0, 0))
+        monkeypatch.setattr(celestial_texts, '_compiled', {})
+        assert self._bundle(tmp_path).compile(dict(texts)) == name
+        assert path.stat().st_mtime == 0
+        # A changed lang file is a changed fingerprint: href stops
+        # answering, and the template rebuilds the table.
+        assert self._bundle(tmp_path, Texts={'LIVE': 'LIVE!'}).href is None
+        # The file vanishing (HTML_ROOT wiped) is noticed too.
+        path.unlink()
+        assert self._bundle(tmp_path).href is None
+
+    def test_a_new_bundle_replaces_the_old(self, tmp_path, monkeypatch):
+        """Edited strings are a new file under a new name, and the older
+        bundles go with it; anything else in HTML_ROOT stays."""
+        import celestial_texts
+        monkeypatch.setattr(celestial_texts, '_compiled', {})
+        texts = {'T': {'LIVE': 'LIVE'}, 'body_labels': {}, 'cardinals': []}
+        name = self._bundle(tmp_path).compile(texts)
+        (tmp_path / 'celestial-texts-0123456789ab.js').write_text('')
+        (tmp_path / 'celestial-texts-notes.txt').write_text('')
+        (tmp_path / 'celestial.js').write_text('')
+        # Compiling the same strings again writes nothing, so prunes nothing.
+        assert self._bundle(tmp_path).compile(dict(texts)) == name
+        assert len(list(tmp_path.glob('celestial-texts-*.js'))) == 2
+        other = self._bundle(tmp_path, Texts={'LIVE': 'EN DIRECT'}).compile(
+            dict(texts, T={'LIVE': 'EN DIRECT'}))
+        assert other != name
+        assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+            [other, 'celestial-texts-notes.txt', 'celestial.js'])
+        # The old inputs' name is gone, and href says so.
+        assert self._bundle(tmp_path).href is None
+
+    def test_unwritable_root_stays_inline(self, tmp_path):
+        blocker = tmp_path / 'file'
+        blocker.write_text('')
+        bundle = self._bundle(blocker / 'celestial')
+        assert bundle.compile({'T': {}}) is None
+        assert bundle.href is None
+
+    def test_search_list_never_raises(self, tmp_path):
+        import celestial_texts
+
+        class Obj:
+            pass
+        generator = Obj()
+        generator.skin_dict = {'HTML_ROOT': 'public_html/celestial'}
+        generator.config_dict = {'WEEWX_ROOT': str(tmp_path)}
+        [entry] = celestial_texts.CelestialTexts(generator).get_extension_list(None, None)
+        assert entry['texts_bundle'].html_root == str(tmp_path / 'public_html' / 'celestial')
+        generator.skin_dict = {}
+        [entry] = celestial_texts.CelestialTexts(generator).get_extension_list(None, None)
+        assert entry == {'texts_bundle': None}
+
+    def test_page_loads_the_bundle(self, tmp_path, monkeypatch):
+        """The rendered page names the bundle in a script element before
+        celestial.js and leaves the table out of its config block; the
+        next cycle with the same inputs skips the table altogether."""
+        import celestial_texts
+        monkeypatch.setattr(celestial_texts, '_compiled', {})
+        lookups = []
+
+        class Texts(dict):
+            def get(self, key, default=None):
+                lookups.append(key)
+                return dict.get(self, key, default)
+
+        with saved_almanacs():
+            weewx.almanac.almanacs[:] = [weewx.almanac.WeeutilAlmanacType()]
+            plain = weewx.almanac.Almanac(TIME_TS, LATITUDE, LONGITUDE, altitude=ALTITUDE_M,
+                                          formatter=weewx.units.get_default_formatter())
+            html = TestSampleSkinRenders.render(
+                plain, lang='de', texts=Texts(approaching='n\u00e4hert sich'),
+                texts_bundle=self._bundle(tmp_path))
+            [name] = [p.name for p in tmp_path.glob('celestial-texts-*.js')]
+            tag = '<script src="%s"></script>' % name
+            assert (html.index('id="celestial-config"') < html.index(tag)
+                    < html.index('<script src="celestial.js?v='))
+            config = page_config(html)
+            assert not {'T', 'body_labels', 'cardinals'} & set(config)
+            bundle = (tmp_path / name).read_text(encoding='utf-8')
+            assert '"approaching":"n\\u00e4hert sich"' in bundle
+            assert '"cardinals":["N","E","S","W"]' in bundle
+            assert 'approaching' in lookups
+
+            del lookups[:]
+            again = TestSampleSkinRenders.render(
+                plain, lang='de', texts=Texts(approaching='n\u00e4hert sich'),
+                texts_bundle=self._bundle(tmp_path))
+        assert tag in again
+        assert 'approaching' not in lookups
+        # The script takes the bundle's strings when it is loaded, and the
+        # block's otherwise.
+        js = open(os.path.join(SKIN_DIR, 'celestial.js')).read()
+        assert ("TEXTS = typeof CELESTIAL_TEXTS === 'object' ? CELESTIAL_TEXTS : CELESTIAL;"
+                in js)
+        assert 'T = TEXTS.T;' in js
+        sw = open(os.path.join(SKIN_DIR, 'celestial-sw.js')).read()
+        texts_re = re.search(r'var TEXTS_RE = /(.*)/;', sw).group(1).replace('\\/', '/')
+        assert re.search(texts_re, '/celestial/' + name)
+
+
 class TestSampleSkinRenders:
     """Render the bundled sample skin end to end, through Cheetah's
     errorCatcher, exactly as weewx does.  Template.compile alone is NOT
@@ -432,7 +875,7 @@ class TestSampleSkinRenders:
 
     @staticmethod
     def render(almanac_obj, with_time_zone=True, lang='en', texts=None, labels=None,
-               sky_page=None, current=None):
+               sky_page=None, current=None, texts_bundle=None):
         from Cheetah.Template import Template
 
         class Obj:
@@ -496,6 +939,13 @@ class TestSampleSkinRenders:
             # real weewx-skyfield SkyPage, or None when skyfield is absent
             # (the dome panel then degrades to its skyhint).
             'sky_page': sky_page,
+            # What celestial_drawings.CelestialSkyDrawings serves in
+            # production.
+            'sky_drawings': make_sky_drawings(),
+            # What celestial_texts.CelestialTexts serves in production.
+            # Absent by default, which is the inline fallback every other
+            # test reads the strings from.
+            'texts_bundle': texts_bundle,
         }])
         return str(template)
 
@@ -523,22 +973,24 @@ class TestSampleSkinRenders:
             assert 'id="geo-row-%s"' % body in html
             alt_cell = self.cell(html, 'geo-alt-%s' % body)
             assert alt_cell.startswith('alt ') or alt_cell == 'below horizon', body
-        # The dial container and the inlined javascript engine rendered.
+        # The dial container, the version-tagged script, and the
+        # settings block it reads.
         assert 'id="dial"' in html
-        assert 'function buildDial(' in html
-        assert 'function setOdometer(' in html
-        assert '/gauge-data/loop-data.txt' in html
+        assert ('<script src="celestial.js?v=%s"></script>'
+                % celestial.CELESTIAL_VERSION) in html
+        config = page_config(html)
+        assert config['loop_data_file'] == '/gauge-data/loop-data.txt'
         # The stylesheet URL is version-tagged so browser caches refetch
         # it after an upgrade (skin.conf supplies version in production).
         assert 'href="celestial.css?v=%s"' % celestial.CELESTIAL_VERSION in html
-        assert 'PER_AU = 92955807' in html and "DIST_LABEL = ' miles'" in html
-        assert '37.44' in html
+        assert config['per_au'] == 92955807 and config['dist_label'] == ' miles'
+        assert config['station_lat'] == pytest.approx(37.4425)
         # The station clock's pre-packet anchor, baked from the report's
         # own instant.  Asserted on the RENDERED value, never on the
         # template text: under #errorCatcher Echo a bad placeholder is
         # echoed as error prose instead of raising, so a broken bake
         # would ship a page whose clock never started.
-        assert 'GEN_TS = %d;' % int(TIME_TS) in html
+        assert config['gen_ts'] == int(TIME_TS)
         # The header's "updated" stamp first-paints that same instant, in
         # the shape fmtHMS repaints it in (%H:%M:%S, station-local, the
         # chip-detail precedent) -- the page displays on its own, and the
@@ -703,8 +1155,7 @@ class TestSampleSkinRenders:
         assert self.cell(html, 'geo-au-halley').endswith(' au')
         assert self.cell(html, 'geo-alt-halley').startswith('alt ')
         assert self.cell(html, 'geo-alt-hale_bopp') == 'below horizon'
-        assert 'COMET_NAMES = ["halley", "hale_bopp", "bright", "mcnaught"];' in html
-        assert 'function renderComets(' in html
+        assert page_config(html)['comet_names'] == ['halley', 'hale_bopp', 'bright', 'mcnaught']
         # The countdown row: the pass chip and the windowed guests
         # first-paint hidden; the sun, shower and darkness chips
         # first-paint the COUNTDOWN ITSELF -- the remaining time at
@@ -839,6 +1290,7 @@ class TestSampleSkinRenders:
             out = self.render_dome_fragment('dome-svg.txt.tmpl', {
                 'almanac': wxskyfield_almanac,
                 'sky_page': make_sky_page(),
+                'sky_drawings': make_sky_drawings(),
                 'current': type('C', (), {'interval': interval})(),
             })
             assert '<svg' in out, label
@@ -848,7 +1300,7 @@ class TestSampleSkinRenders:
         # A nonsense interval falls back rather than emptying the set.
         out = self.render_dome_fragment('dome-svg.txt.tmpl', {
             'almanac': wxskyfield_almanac,
-            'sky_page': make_sky_page(),
+            'sky_page': make_sky_page(), 'sky_drawings': make_sky_drawings(),
             'current': type('C', (), {'interval': Val(0.0, 0.0)})(),
         })
         assert '<svg' in out
@@ -861,7 +1313,8 @@ class TestSampleSkinRenders:
         never error text the javascript would inject.  Without a
         $current the interval falls back to 300 s: step 60, count 5."""
         out = self.render_dome_fragment('dome-svg.txt.tmpl', {
-            'almanac': wxskyfield_almanac, 'sky_page': make_sky_page()})
+            'almanac': wxskyfield_almanac, 'sky_page': make_sky_page(),
+            'sky_drawings': make_sky_drawings()})
         assert out.lstrip().startswith('<div class="domefrag" data-dome-ts="')
         assert 'data-dome-ts="%d"' % TIME_TS in out
         assert 'data-dome-slot="0"' in out
@@ -983,7 +1436,8 @@ class TestSampleSkinRenders:
         page loaded, and again on every refetch."""
         out = self.render_dome_fragment('dome-svg.txt.tmpl', {
             'almanac': wxskyfield_almanac,
-            'sky_page': make_sky_page(theme='light')})
+            'sky_page': make_sky_page(theme='light'),
+            'sky_drawings': make_sky_drawings()})
         assert '#efece2' in out.lower()
         assert '#161f3d' not in out.lower()
 
@@ -997,7 +1451,8 @@ class TestSampleSkinRenders:
         for theme, palette in (('light', 'light'), ('dark', 'night')):
             out = self.render_dome_fragment('dome-svg.txt.tmpl', {
                 'almanac': wxskyfield_almanac,
-                'sky_page': make_sky_page(theme=theme)})
+                'sky_page': make_sky_page(theme=theme),
+                'sky_drawings': make_sky_drawings()})
             assert 'data-dome-palette="%s"' % palette in out, theme
 
     def test_updater_reloads_once_when_the_plate_flips(self):
@@ -1006,7 +1461,7 @@ class TestSampleSkinRenders:
         page whose plate keeps disagreeing (a cached copy, say) must wear
         one stale plate rather than reload for ever.  Source-pinned;
         there is no browser in CI."""
-        js = open(os.path.join(SKIN_DIR, 'realtime_updater.inc')).read()
+        js = page_script()
         assert re.search(r"var PAGE_PALETTE\s*=", js), 'the page plate is gone'
         assert "indexOf('theme-light')" in js
         guard = re.search(r"data-dome-palette.*?\n(.*?)\n\s*var m = ", js, re.S)
@@ -1043,12 +1498,12 @@ class TestSampleSkinRenders:
         the source, since the bug only shows within minutes of
         sunrise."""
         frag = open(os.path.join(SKIN_DIR, 'dome-svg-frag.inc')).read()
-        call = re.search(r'\$sky_page\.dome_svg\((.*?)\)</div>', frag)
+        call = re.search(r'\$sky_drawings\.dome_svg\(\$sky_page, (.*?)\)</div>', frag)
         assert call is not None, 'the dome_svg call moved'
         # The slot's re-bound almanac draws the sky; the palette does not
         # come from it.
         assert 'almanac_time=$frag_ts' in call.group(1)
-        assert 'palette=$palette' in call.group(1)
+        assert call.group(1).endswith(', $palette')
         resolve = re.search(r'#set \$palette = .*?theme\((.*?)\)', frag)
         assert resolve is not None, 'the palette resolution moved'
         assert resolve.group(1) == '$almanac', resolve.group(1)
@@ -1072,6 +1527,7 @@ class TestSampleSkinRenders:
                     second=SimpleNamespace(raw=interval_minutes * 60)))
             return self.render_dome_fragment(name, {
                 'almanac': wxskyfield_almanac, 'sky_page': make_sky_page(),
+                'sky_drawings': make_sky_drawings(),
                 'current': current})
 
         out0 = render('dome-svg.txt.tmpl', 5)
@@ -1121,6 +1577,7 @@ class TestSampleSkinRenders:
                 name = 'dome-svg.txt.tmpl' if k == 0 else 'dome-svg-%d.txt.tmpl' % k
                 frag = self.render_dome_fragment(name, {
                     'almanac': wxskyfield_almanac, 'sky_page': make_sky_page(),
+                    'sky_drawings': make_sky_drawings(),
                     'current': current(seconds)})
                 if frag.strip():
                     out.append((k, frag))
@@ -1164,7 +1621,7 @@ class TestSampleSkinRenders:
         from the fragment at all.  Pins that it has not come back, and
         keeps the simulation of both arithmetics as the record of what
         fragment-relative walking actually did."""
-        src = open(os.path.join(SKIN_DIR, 'realtime_updater.inc')).read()
+        src = page_script()
         # 8.3.5 settles the zigzag by removing its cause rather than
         # correcting for it: the cycle base is computed from the
         # STATION's clock against the archive interval, so no arithmetic
@@ -1400,7 +1857,7 @@ class TestSampleSkinRenders:
         assert fetches(True, 200) == 3600 // step
         # Unpaced, the late station is answered with a fetch storm.
         assert fetches(False, 200) > 15 * fetches(True, 200)
-        src = open(os.path.join(SKIN_DIR, 'realtime_updater.inc')).read()
+        src = page_script()
         assert re.search(r'if \(\(want === null \|\| want\.ts === lastDomeWant\)'
                          r'\s*&& Date\.now\(\) / 1000 - lastDomeFetch < DOME_REFRESH\) \{',
                          src), 'the repeat-want pacing is gone'
@@ -1416,7 +1873,8 @@ class TestSampleSkinRenders:
         from Cheetah.Template import Template
         source = open(os.path.join(SKIN_DIR, 'pass-chart.txt.tmpl')).read()
         out = str(Template(source, searchList=[{
-            'almanac': wxskyfield_sat_almanac, 'sky_page': make_sky_page()}]))
+            'almanac': wxskyfield_sat_almanac, 'sky_page': make_sky_page(),
+            'sky_drawings': make_sky_drawings()}]))
         assert out.lstrip().startswith('<div class="passhead">')
         assert '<svg' in out
         assert '<g class="dome-track" data-body="iss" ' in out
@@ -1440,7 +1898,8 @@ class TestSampleSkinRenders:
                         % wxskyfield.WXSKYFIELD_VERSION)
         source = open(os.path.join(SKIN_DIR, 'pass-chart.txt.tmpl')).read()
         out = str(Template(source, searchList=[{
-            'almanac': wxskyfield_sat_almanac, 'sky_page': make_sky_page()}]))
+            'almanac': wxskyfield_sat_almanac, 'sky_page': make_sky_page(),
+            'sky_drawings': make_sky_drawings()}]))
         m = re.search(r'<g class="dome-track" data-body="iss" '
                       r'data-rise="(\d+)" data-set="(\d+)" ', out)
         assert m, 'the track carries no data-rise/data-set in the expected shape'
@@ -1449,8 +1908,7 @@ class TestSampleSkinRenders:
         assert rise == int(round(nvp.rise.raw)) and sset == int(round(nvp.set.raw))
         assert rise < sset
         # And the include reads exactly these two names off the track.
-        src = open(os.path.join(SKIN_DIR, 'realtime_updater.inc'),
-                   encoding='utf-8').read()
+        src = page_script()
         assert "attrNum(track, 'data-rise')" in src
         assert "attrNum(track, 'data-set')" in src
 
@@ -1482,13 +1940,12 @@ class TestSampleSkinRenders:
         and the baked "updated" stamp) is in test_renders_with_skyfield_almanac;
         the browser half (a viewer's clock half an hour wrong changes
         nothing) is test_viewer_clock_skew_changes_nothing_in_a_real_browser."""
-        src = open(os.path.join(SKIN_DIR, 'realtime_updater.inc'),
-                   encoding='utf-8').read()
+        src = page_script()
         # THE clock: the packet's stamp, or the generation instant.
         assert re.search(r'function serverNow\(\) \{', src)
         assert re.search(r'return latestTs === 0 \? GEN_TS : latestTs;', src), \
             'serverNow is the packet stamp, or GEN_TS before the first packet'
-        assert 'GEN_TS = $int($almanac.time_ts);' in src, \
+        assert "'gen_ts': int($almanac.time_ts)" in src, \
             'GEN_TS must be baked from the report generation instant'
         # The stopwatch, the only way the browser clock is read: packetAge
         # (both readings the browser's own), and no other subtraction of
@@ -1534,11 +1991,14 @@ class TestSampleSkinRenders:
         assert re.search(r'var k = Math\.floor\(\(serverNow\(\) - base\) / m\.step\);', src)
         assert re.search(r'parseFloat\(m\[1\]\) > serverNow\(\)', src), \
             'the ceiling that refuses a sky the station has not reached is gone'
+        # The ephemeris track is fetched when the page's clock leaves it.
+        track = src[src.index('function refreshTrack() {'):src.index('function trackAt(')]
+        assert 'var now = serverNow();' in track
         # Counted over code only: the comments legitimately name the
         # function while explaining what reads it and why.
         assert len([l for l in src.split('\n') if 'serverNow()' in l
-                    and not l.lstrip().startswith('//')]) == 8 + 1, \
-            'eight serverNow call sites plus the definition; a new one needs a reason here'
+                    and not l.lstrip().startswith('//')]) == 9 + 1, \
+            'nine serverNow call sites plus the definition; a new one needs a reason here'
         # No timer drives a clock reader.  localTick paints motion and
         # housekeeping only; the chips, rosters and "updated" stamp
         # render in the packet handler.
@@ -1564,9 +2024,11 @@ class TestSampleSkinRenders:
         # the only thing that moves the clock, so it is the only thing
         # that can change which slot the sky should be showing.  Nearly
         # every one of these returns at refreshDome's want-gate without
-        # a request.
+        # a request.  So does the ephemeris track's, which fetches only
+        # when the clock has left the track in hand.
         gate = re.search(r'if \(latestTs !== prevTs\) \{\s*if \(document\.readyState === \'loading\'\) \{\s*renderWanted = true;[^\n]*\s*\}'
                          r'\s*refreshDome\(\);'
+                         r'\s*refreshTrack\(\);'
                          r'\s*renderPacket\(nowTs\);\s*\}', code(onload))
         assert gate is not None, 'the poll-side renders are not gated on a new packet'
         gate_at = onload.index("if (latestTs !== prevTs) {\n          if (document.readyState")
@@ -1625,7 +2087,8 @@ class TestSampleSkinRenders:
         source = open(os.path.join(SKIN_DIR, 'pass-chart.txt.tmpl')).read()
         out = str(Template(source, searchList=[{
             'almanac': wxskyfield_sat_almanac,
-            'sky_page': make_sky_page(theme='light')}]))
+            'sky_page': make_sky_page(theme='light'),
+            'sky_drawings': make_sky_drawings()}]))
         assert '<svg' in out
         assert '#efece2' in out.lower()
         assert '#161f3d' not in out.lower()
@@ -1637,7 +2100,8 @@ class TestSampleSkinRenders:
         from Cheetah.Template import Template
         source = open(os.path.join(SKIN_DIR, 'pass-chart.txt.tmpl')).read()
         out = str(Template(source, searchList=[{
-            'almanac': wxskyfield_almanac, 'sky_page': make_sky_page()}]))
+            'almanac': wxskyfield_almanac, 'sky_page': make_sky_page(),
+            'sky_drawings': make_sky_drawings()}]))
         assert out.strip() == ''
 
     def test_javascript_reads_only_the_field_set(self):
@@ -1646,7 +2110,7 @@ class TestSampleSkinRenders:
         the literal moon-phase and dateTime keys), must equal
         _MIGRATION_NEW_FIELDS exactly -- the skin consumes the whole
         migrated field set and nothing else."""
-        include = open(os.path.join(SKIN_DIR, 'realtime_updater.inc')).read()
+        include = page_script()
         m = re.search(r'var GEO_BODIES = \[(.*?)\];', include, re.DOTALL)
         assert m is not None
         bodies = re.findall(r"'([a-z_]+)'", m.group(1))
@@ -1714,7 +2178,9 @@ class TestSampleSkinRenders:
                         + PASS_BASES + PASS_ATTRS):
             assert "'%s'" % literal in include, literal
         for sat in sats:
-            for suffix in ('.az', '.alt', '.sunlit', '.label'):
+            # az/alt are read too, when a hand-written line carries them,
+            # but not provisioned: the ephemeris track places the marker.
+            for suffix in ('.sunlit', '.label'):
                 keys.add('almanac.%s%s' % (sat, suffix))
             for base in PASS_BASES:
                 for attr in PASS_ATTRS:
@@ -1761,9 +2227,9 @@ class TestSampleSkinRenders:
                   'statusbar', 'locationbar', 'personalbar', 'localStorage',
                   'sessionStorage', 'indexedDB', 'caches', 'customElements',
                   'frameElement', 'speechSynthesis', 'visualViewport'}
-        include = open(os.path.join(SKIN_DIR, 'realtime_updater.inc')).read()
-        # Top level in this file is two-space indentation directly under
-        # <script>; nested code is indented further.
+        include = page_script()
+        # Top level in celestial.js is two-space indentation (as it was
+        # inline under <script>); nested code is indented further.
         names = set(re.findall(r'^  var ([A-Za-z_$][\w$]*)', include, re.MULTILINE))
         names |= set(re.findall(r'^  function ([A-Za-z_$][\w$]*)', include, re.MULTILINE))
         names |= set(re.findall(r'^  ([A-Za-z_$][\w$]*) =', include, re.MULTILINE))
@@ -1858,7 +2324,7 @@ class TestSampleSkinRenders:
         html = relib.sub(r'data-dome-ts="\d+"', 'data-dome-ts="%d"' % wall,
                          html, count=1)
         (tmp_path / 'index.html').write_text(html)
-        for asset in ('celestial.css', 'sky.js'):
+        for asset in COPIED_ASSETS:
             (tmp_path / asset).write_bytes(
                 open(os.path.join(SKIN_DIR, asset), 'rb').read())
 
@@ -2008,7 +2474,7 @@ class TestSampleSkinRenders:
 
         (tmp_path / 'index.html').write_text(
             self.render(wxskyfield_almanac, sky_page=make_sky_page()))
-        for asset in ('celestial.css', 'sky.js'):
+        for asset in COPIED_ASSETS:
             (tmp_path / asset).write_bytes(
                 open(os.path.join(SKIN_DIR, asset), 'rb').read())
 
@@ -2089,7 +2555,7 @@ class TestSampleSkinRenders:
         far = TIME_TS + 86400
         html = rewindow_pass_chart(html, far, far + 600)
         (tmp_path / 'index.html').write_text(html)
-        for asset in ('celestial.css', 'sky.js'):
+        for asset in COPIED_ASSETS:
             (tmp_path / asset).write_bytes(
                 open(os.path.join(SKIN_DIR, asset), 'rb').read())
         # The fragment refreshDome swaps in when the fast-forwarded minute
@@ -2294,7 +2760,7 @@ class TestSampleSkinRenders:
         html = rewindow_pass_chart(html, int(time.time()) - 60,
                                    int(time.time()) + 600)
         (tmp_path / 'index.html').write_text(html)
-        for asset in ('celestial.css', 'sky.js'):
+        for asset in COPIED_ASSETS:
             (tmp_path / asset).write_bytes(
                 open(os.path.join(SKIN_DIR, asset), 'rb').read())
 
@@ -2453,7 +2919,8 @@ class TestSampleSkinRenders:
         # refetch brings back the same finished chart.
         frag = str(Template(open(os.path.join(SKIN_DIR, 'pass-chart.txt.tmpl')).read(),
                             searchList=[{'almanac': wxskyfield_sat_almanac,
-                                         'sky_page': sky_page}]))
+                                         'sky_page': sky_page,
+                                         'sky_drawings': make_sky_drawings()}]))
         # The chart's own window -- in progress now, over in a few
         # seconds -- is anchored to the browser's FIRST REQUEST for the
         # page, at serve time, so nothing that precedes it (a fresh
@@ -2462,7 +2929,7 @@ class TestSampleSkinRenders:
         # them.  A pre-2.3.2 sibling skips here, as everywhere.
         if not re.search(r'<g class="dome-track"[^>]* data-set="\d+"', html):
             pytest.skip('this weewx-skyfield emits no data-rise/data-set (pre-2.3.2)')
-        for asset in ('celestial.css', 'sky.js'):
+        for asset in COPIED_ASSETS:
             (tmp_path / asset).write_bytes(
                 open(os.path.join(SKIN_DIR, asset), 'rb').read())
         win = {}
@@ -2672,7 +3139,7 @@ class TestSampleSkinRenders:
         # of every roster line -- this test is about the chart alone.
         html = rewindow_pass_chart(html, PACKET_TS + 3600, PACKET_TS + 4200)
         (tmp_path / 'index.html').write_text(html)
-        for asset in ('celestial.css', 'sky.js'):
+        for asset in COPIED_ASSETS:
             (tmp_path / asset).write_bytes(
                 open(os.path.join(SKIN_DIR, asset), 'rb').read())
         # A live feed, one packet repeated: renderPass returns at its
@@ -2781,7 +3248,7 @@ class TestSampleSkinRenders:
         html = rewindow_pass_chart(html, None, None)      # a pre-2.3.2 chart
         assert 'data-set=' not in html.split('id="pass-chart"', 1)[1].split('</svg>', 1)[0]
         (tmp_path / 'index.html').write_text(html)
-        for asset in ('celestial.css', 'sky.js'):
+        for asset in COPIED_ASSETS:
             (tmp_path / asset).write_bytes(
                 open(os.path.join(SKIN_DIR, asset), 'rb').read())
 
@@ -2879,8 +3346,7 @@ class TestSampleSkinRenders:
         shape: no seedAppliedFrag, no load-time refetch, the first-packet
         refetch in updateCurrent, the same-or-older guard, and the
         loadend re-check that closes the in-flight window."""
-        src = open(os.path.join(SKIN_DIR, 'realtime_updater.inc'),
-                   encoding='utf-8').read()
+        src = page_script()
         assert 'seedAppliedFrag' not in src
         # No UNCONDITIONAL load-time refetch.  The one load handler that
         # can call refreshDome does so only to make a refetch that was
@@ -2982,7 +3448,7 @@ class TestSampleSkinRenders:
         html = relib.sub(r'data-dome-ts="\d+"', 'data-dome-ts="%d"' % now,
                          html, count=1)
         (tmp_path / 'index.html').write_text(html)
-        for asset in ('celestial.css', 'sky.js'):
+        for asset in COPIED_ASSETS:
             (tmp_path / asset).write_bytes(
                 open(os.path.join(SKIN_DIR, asset), 'rb').read())
 
@@ -3115,7 +3581,7 @@ class TestSampleSkinRenders:
         html = relib.sub(r'data-dome-ts="\d+"', 'data-dome-ts="%d"' % now,
                          html, count=1)
         (tmp_path / 'index.html').write_text(html)
-        for asset in ('celestial.css', 'sky.js'):
+        for asset in COPIED_ASSETS:
             (tmp_path / asset).write_bytes(
                 open(os.path.join(SKIN_DIR, asset), 'rb').read())
 
@@ -3252,7 +3718,7 @@ class TestSampleSkinRenders:
         # the embedded backdrop's data-dome-ts is a year behind the feed.
         (tmp_path / 'index.html').write_text(
             self.render(wxskyfield_sat_almanac, sky_page=make_sky_page()))
-        for asset in ('celestial.css', 'sky.js'):
+        for asset in COPIED_ASSETS:
             (tmp_path / asset).write_bytes(
                 open(os.path.join(SKIN_DIR, asset), 'rb').read())
         # The first-packet refetch (8.3.5) fires within the test's life, so
@@ -3261,6 +3727,7 @@ class TestSampleSkinRenders:
         if serve_fragment:
             frag = self.render_dome_fragment('dome-svg.txt.tmpl', {
                 'sky_page': make_sky_page(),
+                'sky_drawings': make_sky_drawings(),
                 'almanac': wxskyfield_sat_almanac,
             })
             assert '<svg' in frag
@@ -3439,7 +3906,7 @@ class TestSampleSkinRenders:
 
         (tmp_path / 'index.html').write_text(
             self.render(wxskyfield_almanac, sky_page=make_sky_page()))
-        for asset in ('celestial.css', 'sky.js'):
+        for asset in COPIED_ASSETS:
             (tmp_path / asset).write_bytes(
                 open(os.path.join(SKIN_DIR, asset), 'rb').read())
 
@@ -3453,7 +3920,8 @@ class TestSampleSkinRenders:
         # a real sky, served with a 200.
         AHEAD = 1200
         frag = self.render_dome_fragment('dome-svg.txt.tmpl', {
-            'sky_page': make_sky_page(), 'almanac': wxskyfield_almanac})
+            'sky_page': make_sky_page(),
+            'sky_drawings': make_sky_drawings(), 'almanac': wxskyfield_almanac})
         assert '<svg' in frag
         frag = relib.sub(r'data-dome-ts="\d+"',
                          'data-dome-ts="%d"' % (now + AHEAD), frag, count=1)
@@ -3575,7 +4043,7 @@ class TestSampleSkinRenders:
         (tmp_path / 'index.html').write_text(
             self.render(wxskyfield_almanac, sky_page=make_sky_page()))
         frag = self.render_dome_fragment('dome-svg.txt.tmpl', {
-            'sky_page': make_sky_page(),
+            'sky_page': make_sky_page(), 'sky_drawings': make_sky_drawings(),
             'almanac': wxskyfield_almanac,
         })
         assert '<svg' in frag
@@ -3594,7 +4062,7 @@ class TestSampleSkinRenders:
                              'data-dome-slot="%d"' % slot, f, count=1)
         polls = {'n': 0}
         asked = []                     # every backdrop fragment requested
-        for asset in ('celestial.css', 'sky.js'):
+        for asset in COPIED_ASSETS:
             (tmp_path / asset).write_bytes(
                 open(os.path.join(SKIN_DIR, asset), 'rb').read())
 
@@ -3728,14 +4196,14 @@ class TestSampleSkinRenders:
 
         html = self.render(wxskyfield_almanac, sky_page=make_sky_page())
         (tmp_path / 'index.html').write_text(html)
-        for asset in ('celestial.css', 'sky.js'):
+        for asset in COPIED_ASSETS:
             (tmp_path / asset).write_bytes(
                 open(os.path.join(SKIN_DIR, asset), 'rb').read())
         page_dome_ts = relib.search(r'data-dome-ts="(\d+)"', html).group(1)
         # The fragment the station would serve for slot 0 of THIS cycle:
         # the same sky the page holds, stamped the same.
         frag = self.render_dome_fragment('dome-svg.txt.tmpl', {
-            'sky_page': make_sky_page(),
+            'sky_page': make_sky_page(), 'sky_drawings': make_sky_drawings(),
             'almanac': wxskyfield_almanac,
         })
         assert 'data-dome-ts="%s"' % page_dome_ts in frag
@@ -3852,11 +4320,11 @@ class TestSampleSkinRenders:
         page_dome_ts = int(relib.search(r'data-dome-ts="(\d+)"', html).group(1))
         cut = html.index('id="dome-svg"') + 2000      # well inside the dome
         head, tail = html[:cut].encode(), html[cut:].encode()
-        for asset in ('celestial.css', 'sky.js'):
+        for asset in COPIED_ASSETS:
             (tmp_path / asset).write_bytes(
                 open(os.path.join(SKIN_DIR, asset), 'rb').read())
         frag = self.render_dome_fragment('dome-svg.txt.tmpl', {
-            'sky_page': make_sky_page(),
+            'sky_page': make_sky_page(), 'sky_drawings': make_sky_drawings(),
             'almanac': wxskyfield_almanac,
         })
         frag = relib.sub(r'data-dome-ts="\d+"', 'data-dome-ts="%d"' % (page_dome_ts + 60),
@@ -4005,7 +4473,7 @@ class TestSampleSkinRenders:
         head, tail = html[:cut].encode(), html[cut:].encode()
         assert b'id="chip-dark-v"' not in head
         assert b'setInterval(updateCurrent' in head     # the include has parsed and run
-        for asset in ('celestial.css', 'sky.js'):
+        for asset in COPIED_ASSETS:
             (tmp_path / asset).write_bytes(
                 open(os.path.join(SKIN_DIR, asset), 'rb').read())
         now = int(time.time())
@@ -4150,7 +4618,7 @@ class TestSampleSkinRenders:
         (tmp_path / 'index.html').write_text(
             self.render(wxskyfield_almanac, sky_page=make_sky_page()))
         frag = self.render_dome_fragment('dome-svg.txt.tmpl', {
-            'sky_page': make_sky_page(),
+            'sky_page': make_sky_page(), 'sky_drawings': make_sky_drawings(),
             'almanac': wxskyfield_almanac,
         })
         assert '<svg' in frag
@@ -4193,7 +4661,7 @@ class TestSampleSkinRenders:
 
         polls = {'n': 0}
         asked = []
-        for asset in ('celestial.css', 'sky.js'):
+        for asset in COPIED_ASSETS:
             (tmp_path / asset).write_bytes(
                 open(os.path.join(SKIN_DIR, asset), 'rb').read())
 
@@ -4321,7 +4789,7 @@ class TestSampleSkinRenders:
                                r'\g<1>%d\g<2>' % int(now + 5000), html)
         assert n_subs == 1
         (tmp_path / 'index.html').write_text(html)
-        for asset in ('celestial.css', 'sky.js'):
+        for asset in COPIED_ASSETS:
             (tmp_path / asset).write_bytes(
                 open(os.path.join(SKIN_DIR, asset), 'rb').read())
 
@@ -4531,7 +4999,7 @@ class TestSampleSkinRenders:
         assert '<span id="last-update">%s</span>' % gen_hms in html
         baked_dark = re.search(r'id="chip-dark-v"[^>]*>([^<]*)<', html).group(1)
         (tmp_path / 'index.html').write_text(html)
-        for asset in ('celestial.css', 'sky.js'):
+        for asset in COPIED_ASSETS:
             (tmp_path / asset).write_bytes(
                 open(os.path.join(SKIN_DIR, asset), 'rb').read())
 
@@ -4730,7 +5198,7 @@ class TestSampleSkinRenders:
 
         (tmp_path / 'index.html').write_text(
             self.render(wxskyfield_comet_almanac, sky_page=make_sky_page()))
-        for asset in ('celestial.css', 'sky.js'):
+        for asset in COPIED_ASSETS:
             (tmp_path / asset).write_bytes(
                 open(os.path.join(SKIN_DIR, asset), 'rb').read())
 
@@ -4921,12 +5389,1225 @@ class TestSampleSkinRenders:
         IAU values.  The AU-per-light-year divisor (Proxima's dial label)
         lives in the include."""
         template = open(os.path.join(SKIN_DIR, 'index.html.tmpl')).read()
-        include = open(os.path.join(SKIN_DIR, 'realtime_updater.inc')).read()
+        include = page_script()
         for source, name in ((template, 'index.html.tmpl'), (include, 'realtime_updater.inc')):
             per_au = {float(m) for m in re.findall(r'\$per_au = ([0-9.e+]+)', source)}
             assert per_au == {9.2955807e7, 1.4959787e8}, name
         assert re.search(r'AU_PER_LY = 63241\.077', include)
 
+    def test_service_worker_is_opt_in_and_keys_by_identity(self):
+        """The service worker is off unless [Extras] service_worker says
+        otherwise, ships and installs like the other copy_once files, and
+        caches only what carries its own identity.  Run under node: the
+        page's registration block against a fake navigator, and the
+        worker's own fetch and activate handlers against fake caches and
+        a fake network -- version-tagged static files by their URL, dome
+        backdrops by the instant they depict, and the live files never."""
+        import shutil
+        import subprocess
+        node = shutil.which('node')
+        if node is None:
+            pytest.skip('node is not available')
+        with saved_almanacs():
+            weewx.almanac.almanacs[:] = [weewx.almanac.WeeutilAlmanacType()]
+            plain = weewx.almanac.Almanac(TIME_TS, LATITUDE, LONGITUDE, altitude=ALTITUDE_M,
+                                          formatter=weewx.units.get_default_formatter())
+            html = self.render(plain)
+        config = page_config(html)
+        assert config['service_worker'] is False
+        assert config['sw_href'] == 'celestial-sw.js?v=%s' % celestial.CELESTIAL_VERSION
+
+        skin_conf = open(os.path.join(SKIN_DIR, 'skin.conf')).read()
+        assert re.search(r'^\s+service_worker = false$', skin_conf, re.M)
+        assert re.search(r'^\s+copy_once = .*\bcelestial-sw\.js\b', skin_conf, re.M)
+        install_src = open(os.path.join(REPO_ROOT, 'install.py')).read()
+        assert "'skins/Celestial/celestial-sw.js'" in install_src
+
+        include = page_script()
+        start = include.index('  // The service worker, registered once')
+        register = include[start:include.index('\n  });\n', start) + len('\n  });\n')]
+        script = r"""
+        var registered = [], unregistered = [];
+        function addLoadEvent(f) { f(); }
+        function registration(url) {
+          return {active: {scriptURL: url}, waiting: null, installing: null,
+                  unregister: function() { unregistered.push(url); }};
+        }
+        var navigator = {serviceWorker: {
+          register: function(href) { registered.push(href); return Promise.resolve(); },
+          getRegistrations: function() {
+            return Promise.resolve([registration('https://wx.example/celestial/celestial-sw.js?v=1'),
+                                    registration('https://wx.example/other/sw.js')]);
+          }
+        }};
+        var SW_HREF = 'celestial-sw.js?v=9.9';
+        function runRegistration(SERVICE_WORKER) {
+        """ + register + r"""
+        }
+        runRegistration(true);
+        runRegistration(false);
+        """ + r"""
+        var handlers = {}, fetches = [], online = true, bodies = {};
+        var self = {
+          location: new URL('https://wx.example/celestial/celestial-sw.js?v=9.9'),
+          addEventListener: function(name, f) { handlers[name] = f; },
+          skipWaiting: function() {},
+          clients: {claim: function() { return Promise.resolve(); }}
+        };
+        function keyOf(k) { return typeof k === 'string' ? k : k.url; }
+        function FakeCache() { this.m = new Map(); }
+        FakeCache.prototype.put = function(k, r) {
+          this.m.set(keyOf(k), r); return Promise.resolve();
+        };
+        FakeCache.prototype.match = function(k) {
+          var r = this.m.get(keyOf(k));
+          return Promise.resolve(r === undefined ? undefined : r.clone());
+        };
+        FakeCache.prototype.keys = function() {
+          return Promise.resolve(Array.from(this.m.keys()).map(function(u) {
+            return {url: u};
+          }));
+        };
+        FakeCache.prototype.delete = function(k) {
+          return Promise.resolve(this.m.delete(keyOf(k)));
+        };
+        var stores = new Map();
+        var caches = {
+          open: function(n) {
+            if (!stores.has(n)) { stores.set(n, new FakeCache()); }
+            return Promise.resolve(stores.get(n));
+          },
+          keys: function() { return Promise.resolve(Array.from(stores.keys())); },
+          delete: function(n) { return Promise.resolve(stores.delete(n)); }
+        };
+        function fetch(request) {
+          var url = new URL(request.url);
+          fetches.push(url.pathname + url.search);
+          if (!online) { return Promise.reject(new TypeError('offline')); }
+          return Promise.resolve(new Response(bodies[url.pathname] || 'page', {
+            headers: {'Content-Type': 'text/plain'}}));
+        }
+        function keys(name) {
+          return stores.has(name) ? Array.from(stores.get(name).m.keys()).map(function(k) {
+            return k.replace(self.location.origin, '');
+          }) : [];
+        }
+        function settle() { return new Promise(function(r) { setTimeout(r, 10); }); }
+        function get(path, mode) {
+          var ev = {request: {url: self.location.origin + path, method: 'GET',
+                              mode: mode || 'cors'},
+                    answer: null,
+                    respondWith: function(p) { this.answer = p; }};
+          handlers.fetch(ev);
+          if (ev.answer === null) { return Promise.resolve(null); }
+          return ev.answer.then(function(r) { return r.text(); }).then(function(text) {
+            return settle().then(function() { return text; });
+          });
+        }
+        function frag(ts, slot) {
+          return '<g data-dome-ts="' + ts + '" data-dome-slot="' + slot
+                 + '" data-dome-step="60"></g>';
+        }
+        """ + open(os.path.join(SKIN_DIR, 'celestial-sw.js')).read() + r"""
+        (async function() {
+          var out = {registered: registered, unregistered: unregistered};
+          bodies['/celestial/dome-svg-2.txt'] = frag(1120, 2);
+          bodies['/celestial/dome-svg.txt'] = frag(1000, 0);
+          await get('/celestial/dome-svg.txt?ts=1&want=1000');
+          await get('/celestial/dome-svg-2.txt?ts=1&want=1120');
+          out.stored = keys('celestial-frags').sort();
+          fetches.length = 0;
+          out.hit = await get('/celestial/dome-svg-2.txt?ts=2&want=1120');
+          out.hitFetches = fetches.slice();
+          await get('/celestial/dome-svg-2.txt?ts=3&want=1180');
+          await get('/celestial/dome-svg-2.txt?ts=4');
+          out.missFetches = fetches.slice();
+          bodies['/celestial/dome-svg.txt'] = frag(1200, 0);
+          await get('/celestial/dome-svg.txt?ts=5&want=1200');
+          out.nextCycle = keys('celestial-frags');
+          online = false;
+          out.offline = await get('/celestial/dome-svg.txt?ts=6&want=1260');
+          online = true;
+          fetches.length = 0;
+          out.live = [await get('/celestial/loop-data.txt?ts=7'),
+                      await get('/celestial/pass-chart.txt?ts=7'),
+                      await get('/celestial/celestial.js'),
+                      await get('/elsewhere/dome-svg.txt.bak')];
+          out.liveFetches = fetches.slice();
+          await get('/celestial/celestial.js?v=9.9');
+          await get('/celestial/celestial.js?v=9.9');
+          await get('/celestial/celestial-texts-0123abcd.js');
+          await get('/celestial/celestial-texts-0123abcd.js');
+          out.staticFetches = fetches.slice();
+          out.static = keys('celestial-static-9.9').sort();
+          await get('/celestial/index.html?x=1', 'navigate');
+          online = false;
+          out.page = await get('/celestial/index.html?x=2', 'navigate');
+          out.pageKeys = keys('celestial-page');
+          await caches.open('celestial-static-9.8');
+          var waited = null;
+          handlers.activate({waitUntil: function(p) { waited = p; }});
+          await waited;
+          out.caches = Array.from(stores.keys()).sort();
+          console.log(JSON.stringify(out));
+        })();
+        """
+        out = json.loads(subprocess.run([node, '-e', script], capture_output=True,
+                                         text=True, check=True).stdout)
+        # Registered only when turned on; turned off, only this skin's
+        # own leftover worker is removed.
+        assert out['registered'] == ['celestial-sw.js?v=9.9']
+        assert out['unregistered'] == ['https://wx.example/celestial/celestial-sw.js?v=1']
+        # A backdrop is keyed by its path and the instant it depicts --
+        # never by the page's cache-busting ?ts= -- and served from the
+        # cache only for exactly the instant the page wants.
+        assert out['stored'] == ['/celestial/dome-svg-2.txt?dome-ts=1120',
+                                 '/celestial/dome-svg.txt?dome-ts=1000']
+        assert out['hit'] == '<g data-dome-ts="1120" data-dome-slot="2" data-dome-step="60"></g>'
+        assert out['hitFetches'] == []
+        assert out['missFetches'] == ['/celestial/dome-svg-2.txt?ts=3&want=1180',
+                                      '/celestial/dome-svg-2.txt?ts=4']
+        # A new cycle's first backdrop evicts every older cycle's.
+        assert out['nextCycle'] == ['/celestial/dome-svg.txt?dome-ts=1200']
+        # Offline, the newest kept copy of that file is the answer.
+        assert 'data-dome-ts="1200"' in out['offline']
+        # The live files, untagged statics and other paths pass through.
+        assert out['live'] == [None] * 4 and out['liveFetches'] == []
+        assert out['staticFetches'] == ['/celestial/celestial.js?v=9.9',
+                                        '/celestial/celestial-texts-0123abcd.js']
+        assert out['static'] == ['/celestial/celestial-texts-0123abcd.js',
+                                 '/celestial/celestial.js?v=9.9']
+        assert out['page'] == 'page' and out['pageKeys'] == ['/celestial/index.html']
+        # Activation drops the other versions' static caches.
+        assert out['caches'] == ['celestial-frags', 'celestial-page', 'celestial-static-9.9']
+
+    def test_page_script_is_static_and_fed_by_a_config_block(self):
+        """The page's javascript is celestial.js, a copy_once file served
+        version-tagged and cached like the stylesheet: nothing in it is
+        template.  Everything per-station arrives in one inline JSON block
+        written just before the <script> that loads it, and no string in
+        that block can close the element it sits in."""
+        js = open(os.path.join(SKIN_DIR, 'celestial.js'), encoding='utf-8').read()
+        assert not re.search(r'\$[A-Za-z_{(]', js), 'a Cheetah placeholder in celestial.js'
+        assert not re.search(r'^\s*#', js, re.M), 'a Cheetah directive in celestial.js'
+        assert "document.getElementById('celestial-config')" in js
+        assert 'celestial.js' in COPIED_ASSETS
+        assert "'skins/Celestial/celestial.js'" in open(
+            os.path.join(REPO_ROOT, 'install.py')).read()
+        sw = open(os.path.join(SKIN_DIR, 'celestial-sw.js')).read()
+        static_re = re.search(r'var STATIC_RE = /(.*)/;', sw).group(1).replace('\\/', '/')
+        assert re.search(static_re, '/celestial/celestial.js')
+
+        with saved_almanacs():
+            weewx.almanac.almanacs[:] = [weewx.almanac.WeeutilAlmanacType()]
+            plain = weewx.almanac.Almanac(TIME_TS, LATITUDE, LONGITUDE, altitude=ALTITUDE_M,
+                                          formatter=weewx.units.get_default_formatter())
+            html = self.render(plain, texts={'LIVE': '</script><b>LIVE'})
+        # The block precedes the script that reads it, and is the page's
+        # only script that is not a file.
+        assert (html.index('id="celestial-config"')
+                < html.index('<script src="celestial.js?v=%s"></script>'
+                             % celestial.CELESTIAL_VERSION))
+        assert re.findall(r'<script>', html) == []
+        config = page_config(html)
+        assert config['T']['LIVE'] == '</script><b>LIVE'
+        assert config['refresh_rate'] == 2 and config['expiration_time'] == 24
+        assert config['frame_rate'] == 30            # not set: the default
+        assert config['page_update_pwd'] == 'foo'
+        # Every value the script reads off the block is in it.
+        read = set(re.findall(r'CELESTIAL\.([a-z_A-Z]+)', js))
+        assert read and read <= set(config), read - set(config)
+
+    def test_motion_pipeline_runs_off_the_page_thread(self):
+        """The packet history and the rates live in celestial-motion.js,
+        started as a Worker and loaded into the page as the fallback, so
+        the two paths run the same code.  What crosses to the worker is
+        one Float64Array per packet, transferred; the page keeps no
+        whole-record history of its own, and the renders read rates by
+        key without re-deriving them."""
+        include = page_script()
+        template = open(os.path.join(SKIN_DIR, 'index.html.tmpl')).read()
+        motion = open(os.path.join(SKIN_DIR, 'celestial-motion.js')).read()
+        assert 'new Worker(MOTION_HREF)' in include
+        assert 'motionWorker.postMessage({t: t, v: v}, [v.buffer]);' in include
+        assert 'new CelestialMotion.History(schema, HISTORY_SEC, HISTORY_CAP)' in include
+        assert 'var packets' not in include
+        assert 'rateBetween' not in include
+        # The history is fixed-size columns -- one Float64Array ring per
+        # field plus the packet times, sized once from the poll rate --
+        # never an array of records trimmed with shift().
+        assert '.shift()' not in motion
+        assert 'this.t = new Float64Array(this.cap);' in motion
+        assert 'this.cols.push(new Float64Array(this.cap));' in motion
+        assert ('var HISTORY_CAP = Math.ceil(HISTORY_SEC / Math.max(1, refresh_rate)) + 2;'
+                in include)
+        # Loaded blocking, not deferred: a first packet can arrive while
+        # the page is still parsing, and the fallback needs the module.
+        assert '<script src="$motion_href"></script>' in template
+        assert 'celestial-motion.js' in COPIED_ASSETS
+        assert "'skins/Celestial/celestial-motion.js'" in open(
+            os.path.join(REPO_ROOT, 'install.py')).read()
+        # The worker half answers only inside a worker; loaded as a page
+        # script, the file defines its one global and nothing else.
+        assert re.findall(r'^var ([A-Za-z_$][\w$]*)', motion, re.M) == ['CelestialMotion']
+        assert "typeof importScripts === 'function'" in motion
+        # The schema covers every motion key the renders ask for.
+        for member in ("'az', 'alt', 'earth_distance'", "'az', 'alt'"):
+            assert member in include, member
+        assert "wrap: member === 'az'" in include
+
+    def test_motion_model_is_least_squares_per_kind(self):
+        """The motion model's shape, pinned where the page states it: a
+        line over the whole history for bodies and comets, a parabola
+        over the short window for satellites, azimuths unwrapped, the
+        curvature term bounded by the window it was fitted over, and
+        the residuals reachable from the console."""
+        include = page_script()
+        motion = open(os.path.join(SKIN_DIR, 'celestial-motion.js')).read()
+        assert "add(tag, ['az', 'alt', 'earth_distance'], 1, HISTORY_SEC);" in include
+        assert "add(tag, ['az', 'alt'], 2, SAT_FIT_SEC);" in include
+        assert 'var SAT_FIT_SEC = Math.max(30, 4 * refresh_rate);' in include
+        assert 'var tq = Math.min(dt, SAT_FIT_SEC);' in include
+        assert 'function motionReport()' in include
+        assert 'recentRateOf' not in include
+        assert 'acc += ((y - prev + 540) % 360) - 180;' in motion
+        # The page's extrapolation sites all go through motionAhead
+        # (directly, or by way of liveValue), so none of them can quietly
+        # drop the curvature term -- or the ephemeris track.
+        assert len(re.findall(r'(?:motionAhead|liveValue)\(', include)) >= 7
+        assert 'Rate || 0) * dt' not in include
+
+        # The fit itself, run: a satellite-like track crossing north,
+        # az = 350 + 0.5 t + 0.01 t^2 (mod 360), and a noisy planet-like
+        # line.  The parabola must recover the velocity and acceleration
+        # at the newest packet exactly; the line its slope, with the
+        # noise showing up as residual.  Needs node (any version with
+        # typed arrays); the browser tests cover the page's own use.
+        import shutil
+        import subprocess
+        node = shutil.which('node')
+        if node is None:
+            pytest.skip('node is not available')
+        script = motion + """
+        var h = new CelestialMotion.History(
+            [{key: 'a', wrap: true, degree: 2, window: 30},
+             {key: 'b', degree: 1}], 600, 400);
+        for (var t = 0; t <= 60; t += 2) {
+          h.push(t, new Float64Array([(350 + 0.5 * t + 0.01 * t * t) % 360,
+                                      3 + 0.25 * t + (t % 4 ? 0.01 : -0.01)]));
+        }
+        var f = h.fits();
+        console.log(JSON.stringify([Array.prototype.slice.call(f.rate),
+                                    Array.prototype.slice.call(f.accel),
+                                    Array.prototype.slice.call(f.resid)]));
+        """
+        out = subprocess.run([node, '-e', script], capture_output=True,
+                             text=True, check=True).stdout
+        rate, accel, resid = json.loads(out)
+        assert abs(rate[0] - (0.5 + 0.02 * 60)) < 1e-9
+        assert abs(accel[0] - 0.02) < 1e-9
+        assert resid[0] < 1e-9
+        assert abs(rate[1] - 0.25) < 1e-3
+        assert accel[1] == 0
+        assert 0.005 < resid[1] < 0.015
+
+    def _run_motion(self, script, prelude=''):
+        """script, run under node after celestial-motion.js (and prelude
+        before it); what it console.logs, as JSON (NaN arrives as null)."""
+        import shutil
+        import subprocess
+        node = shutil.which('node')
+        if node is None:
+            pytest.skip('node is not available')
+        motion = open(os.path.join(SKIN_DIR, 'celestial-motion.js')).read()
+        return json.loads(subprocess.run([node, '-e', prelude + motion + script], capture_output=True,
+                                         text=True, check=True).stdout)
+
+    @staticmethod
+    def _least_squares(points, degree):
+        """The reference fit: exact normal equations over (tau, y) pairs,
+        in Fractions -- (velocity, 2 * b2, rms residual)."""
+        from fractions import Fraction
+        ts = [Fraction(t) for t, _ in points]
+        ys = [Fraction(y) for _, y in points]
+        n = degree + 1
+        a = [[sum(t ** (i + j) for t in ts) for j in range(n)]
+             + [sum(y * t ** i for t, y in zip(ts, ys))] for i in range(n)]
+        for i in range(n):
+            for k in range(i + 1, n):
+                q = a[k][i] / a[i][i]
+                a[k] = [x - q * z for x, z in zip(a[k], a[i])]
+        b = [Fraction(0)] * n
+        for i in reversed(range(n)):
+            b[i] = (a[i][n] - sum(a[i][j] * b[j] for j in range(i + 1, n))) / a[i][i]
+        b += [Fraction(0)] * (3 - n)
+        ss = sum((y - (b[0] + b[1] * t + b[2] * t * t)) ** 2 for t, y in zip(ts, ys))
+        return float(b[1]), float(2 * b[2]), math.sqrt(ss / len(ts))
+
+    def test_motion_fit_matches_least_squares(self):
+        """History.fit, run against an exact least-squares reference: a
+        noisy linear drift, a noisy parabola, azimuths crossing north
+        both ways, the window cutting off older packets, and each
+        degenerate case falling back as the code says -- a parabola
+        with too few or bunched points to a line, a line with under a
+        second of spread to nothing."""
+        noise = [0.013, -0.021, 0.004, 0.017, -0.009, -0.015, 0.022, -0.002,
+                 0.011, -0.019, 0.006]
+        cases = {
+            'line': (1, 600, [(t, 12 + 0.03 * t + noise[i])
+                              for i, t in enumerate(range(-100, 1, 10))]),
+            'parabola': (2, 600, [(t, 40 - 0.7 * t + 0.004 * t * t + noise[i])
+                                  for i, t in enumerate(range(-50, 1, 5))]),
+            'north_up': (1, 600, [(t, (359.5 + 0.05 * t + noise[i]) % 360)
+                                  for i, t in enumerate(range(-100, 1, 10))]),
+            'north_down': (2, 600, [(t, (0.4 - 0.3 * t + 0.001 * t * t + noise[i]) % 360)
+                                    for i, t in enumerate(range(-20, 1, 2))]),
+            'window': (2, 20, [(t, 5 + (0.2 * t if t > -25 else 9 * t) + noise[i])
+                               for i, t in enumerate(range(-50, 1, 5))]),
+            'two_points': (2, 600, [(-10, 1), (0, 3)]),
+            'bunched': (2, 600, [(-10, 1), (-1e-6, 3), (0, 3.5)]),
+            'no_spread': (1, 600, [(-0.6, 1), (-0.3, 2), (0, 4)]),
+        }
+        script = 'var out = {};\n'
+        for name, (degree, window, points) in cases.items():
+            script += """
+            (function() {
+              var h = new CelestialMotion.History(
+                  [{key: 'x', wrap: %s, degree: %d, window: %d}], 600, 64);
+              %s.forEach(function(p) { h.push(p[0], new Float64Array([p[1]])); });
+              var f = h.fits();
+              out.%s = [f.rate[0], f.accel[0], f.resid[0]];
+            })();
+            """ % ('true' if name.startswith('north') else 'false', degree, window,
+                   json.dumps([[t + 1000, y] for t, y in points]), name)
+        out = self._run_motion(script + 'console.log(JSON.stringify(out));')
+
+        def unwrap(points):
+            result, acc, prev = [], 0.0, None
+            for t, y in points:
+                if prev is not None:
+                    acc += ((y - prev + 540) % 360) - 180
+                prev = y
+                result.append((t, acc))
+            return result
+
+        def close(got, want, tol=1e-9):
+            assert len(got) == len(want)
+            for g, w in zip(got, want):
+                assert g is not None and abs(g - w) < tol * max(1, abs(w)), (got, want)
+
+        close(out['line'], self._least_squares(cases['line'][2], 1))
+        assert abs(out['line'][0] - 0.03) < 1e-3 and out['line'][1] == 0
+        close(out['parabola'], self._least_squares(cases['parabola'][2], 2))
+        assert abs(out['parabola'][1] - 0.008) < 1e-4
+        close(out['north_up'], self._least_squares(unwrap(cases['north_up'][2]), 1))
+        assert abs(out['north_up'][0] - 0.05) < 1e-3
+        close(out['north_down'], self._least_squares(unwrap(cases['north_down'][2]), 2))
+        assert abs(out['north_down'][0] + 0.3) < 1e-2
+        # Only the packets no more than 20 s old: the steep older segment
+        # never reaches the fit.
+        close(out['window'], self._least_squares(
+            [p for p in cases['window'][2] if p[0] >= -20], 2))
+        assert abs(out['window'][0] - 0.2) < 1e-2
+        close(out['two_points'], [0.2, 0, 0])
+        close(out['bunched'], self._least_squares(cases['bunched'][2], 1), 1e-6)
+        assert out['bunched'][1] == 0
+        assert out['no_spread'] == [None, None, None]
+
+    def test_motion_ring_wraps_and_trims(self):
+        """The history's rings, run: a packet past capacity overwrites the
+        oldest slot, a packet past the horizon ages the far end out, the
+        same packet (or an older one) again is refused, and a field a
+        packet lacks (NaN) is skipped by its fit without costing the
+        other fields theirs."""
+        held = """
+        function held(h) {
+          var out = [];
+          for (var k = 0; k < h.len; k++) {
+            out.push([h.t[h.slot(k)], h.cols[0][h.slot(k)]]);
+          }
+          return out;
+        }
+        """
+        out = self._run_motion(held + """
+        var r = {};
+        // Capacity 4, horizon never reached: ten packets wrap the ring
+        // twice, and the last four are what is held, oldest first.
+        var h = new CelestialMotion.History([{key: 'a', degree: 1}], 600, 4);
+        for (var t = 0; t < 10; t++) {
+          h.push(t * 10, new Float64Array([2 * t * 10]));
+        }
+        r.wrapped = held(h);
+        r.head = h.head;
+        r.wrappedRate = h.fits().rate[0];
+        r.sameArrays = h.t.length === 4 && h.cols[0].length === 4;
+        // Duplicate and older packets change nothing.
+        r.dup = h.push(90, new Float64Array([0]));
+        r.older = h.push(85, new Float64Array([0]));
+        r.afterRefused = held(h);
+        // Horizon 10 s: a packet more than 10 s older than the newest
+        // goes; one exactly 10 s older stays.
+        var g = new CelestialMotion.History([{key: 'a', degree: 1}], 10, 100);
+        [0, 5, 10, 15].forEach(function(t) { g.push(t, new Float64Array([t])); });
+        r.trimmed = held(g);
+        // NaN: field b is missing from all but one packet, field a from
+        // one; a's fit skips the hole, b has nothing to fit.
+        var n = new CelestialMotion.History(
+            [{key: 'a', degree: 1}, {key: 'b', degree: 1}], 600, 10);
+        n.push(0, new Float64Array([1, NaN]));
+        r.first = Array.prototype.slice.call(n.fits().rate);
+        n.push(2, new Float64Array([NaN, 4]));
+        n.push(4, new Float64Array([3, NaN]));
+        var f = n.fits();
+        r.nan = [Array.prototype.slice.call(f.rate), Array.prototype.slice.call(f.resid)];
+        console.log(JSON.stringify(r));
+        """)
+        assert out['wrapped'] == [[60, 120], [70, 140], [80, 160], [90, 180]]
+        assert out['head'] == 10 % 4
+        assert out['wrappedRate'] == 2
+        assert out['sameArrays'] is True
+        assert out['dup'] is False and out['older'] is False
+        assert out['afterRefused'] == out['wrapped']
+        assert out['trimmed'] == [[5, 5], [10, 10], [15, 15]]
+        assert out['first'] == [None, None]
+        assert out['nan'] == [[0.5, None], [0, None]]     # (3 - 1) / 4 s
+
+    def test_motion_worker_round_trip(self):
+        """The worker half, driven the way the page drives it -- schema
+        first, then one Float64Array per packet, transferred -- with
+        structuredClone standing in for the message channel, so a
+        transfer list naming one buffer twice (or a detached one) fails
+        here as it would in a browser.  Each new packet gets one reply,
+        stamped with its time, in schema order; a repeated packet, or
+        one before the schema, gets none."""
+        out = self._run_motion(prelude="""
+        var self = {};
+        function importScripts() {}
+        """, script="""
+        var page = [];
+        self.postMessage = function(m, transfer) {
+          page.push(structuredClone(m, {transfer: transfer}));
+        };
+        function toWorker(m, transfer) {
+          self.onmessage({data: structuredClone(m, {transfer: transfer || []})});
+        }
+        var r = {};
+        var early = new Float64Array([1, 2]);
+        toWorker({t: 0, v: early}, [early.buffer]);
+        r.beforeSchema = page.length;
+        toWorker({schema: [{key: 'almanac.iss.az', wrap: true, degree: 2, window: 30},
+                           {key: 'almanac.sun.alt', degree: 1}],
+                  horizon: 600, capacity: 40});
+        for (var t = 10; t <= 40; t += 10) {
+          var v = new Float64Array([(358 + t) % 360, 0.1 * t]);
+          toWorker({t: t, v: v}, [v.buffer]);
+          r.detached = v.byteLength;
+        }
+        var again = new Float64Array([8, 4]);
+        toWorker({t: 40, v: again}, [again.buffer]);
+        var last = page[page.length - 1];
+        r.replies = page.map(function(m) { return m.t; });
+        r.types = [last.rate instanceof Float64Array, last.rate.length];
+        r.rate = Array.prototype.slice.call(last.rate);
+        r.accel = Array.prototype.slice.call(last.accel);
+        console.log(JSON.stringify(r));
+        """)
+        assert out['beforeSchema'] == 0
+        assert out['detached'] == 0                 # transferred, not copied
+        assert out['replies'] == [10, 20, 30, 40]   # the repeat got none
+        assert out['types'] == [True, 2]
+        # Across north, the short way: 1 degree per second, no curvature.
+        assert abs(out['rate'][0] - 1) < 1e-9 and abs(out['accel'][0]) < 1e-9
+        assert abs(out['rate'][1] - 0.1) < 1e-9
+
+    def test_ephemeris_track_is_the_almanac_per_step(self):
+        """ephemeris-track.json.tmpl: the report's own almanac re-bound to
+        each step, spelled with the loop feed's keys, covering the archive
+        interval plus a step; empty without an extended almanac.  And the
+        page side: the track is preferred inside motionAhead, fetched on
+        the packet, and interpolated the short way round north."""
+        from types import SimpleNamespace
+        from Cheetah.Template import Template
+        source = os.path.join(SKIN_DIR, 'ephemeris-track.json.tmpl')
+        include = page_script()
+        conf = open(os.path.join(SKIN_DIR, 'skin.conf')).read()
+        assert 'template = ephemeris-track.json.tmpl' in conf
+        assert "'skins/Celestial/ephemeris-track.json.tmpl'" in open(
+            os.path.join(REPO_ROOT, 'install.py')).read()
+        assert '\n#errorCatcher' not in open(source).read()
+        # The track's body list is the dial's.
+        body_tags = re.search(r"#set \$body_tags = (\[.*?\])",
+                              open(source).read()).group(1)
+        gb = re.search(r'GEO_BODIES = \[(.*?)\]', include, re.S).group(1)
+        assert (re.findall(r"'(\w+)'", body_tags)
+                == re.findall(r"'(\w+)'", gb))
+        assert 'var moved = trackAhead(key, latestTs, dt);' in include
+        assert 'refreshTrack();' in include
+        assert "TRACK_FILE + '?ts=' + Date.now()" in include
+
+        current = SimpleNamespace(interval=SimpleNamespace(
+            second=SimpleNamespace(raw=300)))
+        with saved_almanacs():
+            weewx.almanac.almanacs[:] = [weewx.almanac.WeeutilAlmanacType()]
+            plain = weewx.almanac.Almanac(
+                TIME_TS, LATITUDE, LONGITUDE, altitude=ALTITUDE_M,
+                formatter=weewx.units.get_default_formatter())
+            out = str(Template(file=source, searchList=[
+                {'almanac': plain, 'sky_page': None, 'current': current}]))
+        assert out.strip() == ''
+
+        pytest.importorskip('ephem')
+        with saved_almanacs():
+            weewx.almanac.almanacs[:] = [weewx.almanac.PyEphemAlmanacType()]
+            alm = weewx.almanac.Almanac(
+                TIME_TS, LATITUDE, LONGITUDE, altitude=ALTITUDE_M,
+                formatter=weewx.units.get_default_formatter())
+            track = json.loads(str(Template(file=source, searchList=[
+                {'almanac': alm, 'sky_page': None, 'current': current}])))
+            at = alm(almanac_time=TIME_TS + 240)
+            moon_az, mars_alt = float(at.moon.az), float(at.mars.alt)
+            moon_far = float(alm(almanac_time=TIME_TS + 360).moon.earth_distance)
+        assert track['t0'] == TIME_TS and track['interval'] == 300
+        bodies = track['tracks'][0]
+        assert bodies['step'] == 60
+        assert len(bodies['fields']['almanac.moon.az']) == 300 // 60 + 2
+        assert abs(bodies['fields']['almanac.moon.az'][4] - moon_az) < 1e-3
+        assert abs(bodies['fields']['almanac.mars.alt'][4] - mars_alt) < 1e-3
+        # PyEphem has no Proxima: its samples are null, the file survives.
+        assert set(bodies['fields']['almanac.proxima_centauri.az']) == {None}
+        assert track['tracks'][1] == {'step': 10, 'fields': {}}
+        # The distances are sampled at the interval's two ends only.
+        dists = track['tracks'][2]
+        assert dists['step'] == (300 // 60 + 1) * 60
+        assert 'almanac.moon.earth_distance' not in bodies['fields']
+        assert len(dists['fields']['almanac.moon.earth_distance']) == 2
+        assert abs(dists['fields']['almanac.moon.earth_distance'][1] - moon_far) < 1e-9
+
+        # A configured satellite is listed whether or not the almanac can
+        # place it (all null here: PyEphem knows no 'iss'), so the page
+        # can hide a marker the loop feed does not carry.
+        class SatPage:
+            def satellite_names(self):
+                return ['iss']
+
+            def comet_names(self):
+                return []
+
+        with saved_almanacs():
+            weewx.almanac.almanacs[:] = [weewx.almanac.PyEphemAlmanacType()]
+            alm = weewx.almanac.Almanac(
+                TIME_TS, LATITUDE, LONGITUDE, altitude=ALTITUDE_M,
+                formatter=weewx.units.get_default_formatter())
+            track = json.loads(str(Template(file=source, searchList=[
+                {'almanac': alm, 'sky_page': SatPage(),
+                 'sky_drawings': make_sky_drawings(), 'current': current}])))
+        sats = track['tracks'][1]['fields']
+        assert sorted(sats) == ['almanac.iss.alt', 'almanac.iss.az']
+        # The satellites' samples end where the bodies' do: a minute past
+        # the interval (see the next test for the page's side of it).
+        assert (len(sats['almanac.iss.az']) - 1) * 10 == (
+            len(track['tracks'][0]['fields']['almanac.moon.az']) - 1) * 60 == 300 + 60
+        assert set(sats['almanac.iss.az']) == {None}
+        assert '!hasKey(azKey) && !trackHas(azKey)' in include
+
+    def test_ephemeris_track_rations_its_lookups(self):
+        """The track's cost on the station, counted with a stand-in
+        almanac: one re-binding per step (never one per satellite per
+        step), distances at the two ends only, and a satellite looked up
+        only at the steps its next_pass can touch -- none at all for one
+        whose pass is hours away.  A satellite whose pass the almanac
+        cannot bound is looked up at every step, as before."""
+        from types import SimpleNamespace
+        from Cheetah.Template import Template
+        source = os.path.join(SKIN_DIR, 'ephemeris-track.json.tmpl')
+        t0 = TIME_TS
+        calls = {'rebind': 0, 'distance': 0}
+        looked = {'pass': [], 'far': [], 'geo': []}
+        passes = {'pass': (t0 + 300, t0 + 400), 'far': (t0 + 5000, t0 + 5400),
+                  'geo': (None, None)}
+
+        class Body:
+            def __init__(self, ts):
+                self.az, self.alt = 100 + 0.004 * (ts - t0), 20.0
+
+            @property
+            def earth_distance(self):
+                calls['distance'] += 1
+                return 1.0
+
+        class Sat:
+            def __init__(self, tag, ts):
+                self.tag, self.ts = tag, ts
+                rise, set_ = passes[tag]
+                self.next_pass = SimpleNamespace(rise=SimpleNamespace(raw=rise),
+                                                 set=SimpleNamespace(raw=set_))
+
+            @property
+            def alt(self):
+                looked[self.tag].append(self.ts)
+                if self.tag == 'geo':
+                    return 20.0
+                return 20 - abs(self.ts - (t0 + 350)) * 0.4
+
+            @property
+            def az(self):
+                return (355 + 0.1 * (self.ts - t0)) % 360
+
+        class Almanac:
+            hasExtras = True
+
+            def __init__(self, ts):
+                self.time_ts = ts
+
+            def __call__(self, almanac_time):
+                calls['rebind'] += 1
+                return Almanac(almanac_time)
+
+            def __getattr__(self, tag):
+                return Sat(tag, self.time_ts) if tag in passes else Body(self.time_ts)
+
+        class SatPage:
+            def satellite_names(self):
+                return ['pass', 'far', 'geo']
+
+            def comet_names(self):
+                return []
+
+        current = SimpleNamespace(interval=SimpleNamespace(
+            second=SimpleNamespace(raw=600)))
+        track = json.loads(str(Template(file=source, searchList=[
+            {'almanac': Almanac(t0), 'sky_page': SatPage(),
+             'sky_drawings': make_sky_drawings(), 'current': current}])))
+        body_n, sat_n = 600 // 60 + 2, (600 + 60) // 10 + 1
+        assert calls['rebind'] == body_n + sat_n
+        assert calls['distance'] == 2 * 11
+        assert looked['far'] == []
+        # rise - 120 s .. set + 120 s, plus the step after.
+        assert looked['pass'] == [t0 + 10 * i for i in range(18, 54)]
+        assert looked['geo'] == [t0 + 10 * i for i in range(sat_n)]
+        sats = track['tracks'][1]['fields']
+        assert set(sats['almanac.far.az']) == {None}
+        kept = [i for i, v in enumerate(sats['almanac.pass.alt']) if v is not None]
+        assert kept == list(range(30, 41))      # up (31..39), and one step either side
+        assert None not in sats['almanac.geo.az']
+
+    def test_track_is_refetched_when_its_shortest_track_ends(self):
+        """The page reads the next cycle's track from the instant the
+        SHORTEST of this one's tracks runs out -- run under node through
+        the page's own parseTrack and refreshTrack -- so a satellite with
+        no az/alt in the feed is never left without samples mid-pass
+        while a longer track (the distances) still covers the clock."""
+        import shutil
+        import subprocess
+        node = shutil.which('node')
+        if node is None:
+            pytest.skip('node is not available')
+        include = page_script()
+        start = include.index("  var TRACK_FILE = 'ephemeris-track.json';")
+        script = include[start:include.index('  function trackHas(key) {', start)] + r"""
+        var pageTimedOut = false, DOME_REFRESH = 60, now = 0, fetched = [];
+        function serverNow() { return now; }
+        function XMLHttpRequest() {}
+        XMLHttpRequest.prototype.open = function(m, url) { fetched.push(now); };
+        XMLHttpRequest.prototype.send = function() {
+          trackFetchInFlight = false;
+        };
+        var t0 = 1000000;
+        track = parseTrack(JSON.stringify({t0: t0, interval: 300, tracks: [
+          {step: 60, fields: {'almanac.moon.az': [1, 2, 3, 4, 5, 6, 7]}},
+          {step: 10, fields: {'almanac.iss.az': [1, 2, 3, 4]}},
+          {step: 360, fields: {}}]}));
+        var out = {t1: track.t1};
+        now = t0 + 20;
+        refreshTrack();
+        now = t0 + 30;
+        refreshTrack();
+        out.fetched = fetched.map(function(t) { return t - t0; });
+        out.empty = parseTrack(JSON.stringify({t0: t0, tracks: []})).t1 - t0;
+        console.log(JSON.stringify(out));
+        """
+        out = json.loads(subprocess.run([node, '-e', script], capture_output=True,
+                                        text=True, check=True).stdout)
+        assert out['t1'] == 1000000 + 30
+        assert out['fetched'] == [30]
+        assert out['empty'] == 0
+
+    def test_satellite_is_placed_from_the_track_alone(self):
+        """A fields line provisioned since 8.3.6 carries no satellite
+        az/alt.  The dome marker is then placed from the ephemeris track,
+        interpolated to the packet's time plus its age -- run under node
+        through the page's own renderSats, liveValue and trackAt -- and
+        hidden again once the track has the satellite below the
+        horizon."""
+        import shutil
+        import subprocess
+        node = shutil.which('node')
+        if node is None:
+            pytest.skip('node is not available')
+        include = page_script()
+
+        def cut(start, end):
+            return include[include.index(start):include.index(end, include.index(start))]
+        script = (
+            cut('  function setAttr(el, name, value) {', '  function num(r, key) {')
+            + cut('  function num(r, key) {', '\n\n')
+            + cut('  function liveValue(key, dt) {', '  // ---- rendering')
+            + cut('  var DOME_CX = 340', '  function numOr(')
+            + cut('  function renderSats(svg) {', '  function domeFragMeta() {')
+            + r"""
+        function Node() { this.attrs = {}; this.textContent = ''; }
+        Node.prototype.getAttribute = function(n) {
+          return n in this.attrs ? this.attrs[n] : null;
+        };
+        Node.prototype.setAttribute = function(n, v) { this.attrs[n] = v; };
+        Node.prototype.removeAttribute = function(n) { delete this.attrs[n]; };
+        var SAT_NAMES = ['iss'], satMarks = null, latest = null, latestTs = 0, age = 0;
+        function packetAge() { return age; }
+        function motionAhead() { throw new Error('no feed value to extrapolate'); }
+        function staticSatMark() { return {g: null, lab: null}; }
+        function setShown() {}
+        function satLabel(name) { return 'ISS'; }
+        function buildSatMark() {
+          return {g: new Node(), dot: new Node(), lab: new Node()};
+        }
+        var t0 = 1000000;
+        track = parseTrack(JSON.stringify({t0: t0, interval: 300, tracks: [
+          {step: 10, fields: {'almanac.iss.az': [350, 356, 2, 8, null],
+                              'almanac.iss.alt': [10, 20, 30, 40, null]}}]}));
+        latest = {'current.dateTime.raw': t0 + 10, 'almanac.iss.sunlit': true,
+                  'almanac.sun.alt': -20};
+        latestTs = t0 + 10;
+        age = 5;                            // t0 + 15: halfway from 356 to 2
+        var out = {};
+        renderSats({});
+        var m = satMarks.iss;
+        out.shown = m.g.getAttribute('display');
+        out.dot = [m.dot.getAttribute('cx'), m.dot.getAttribute('cy')];
+        var want = domeXY(359, 25);
+        out.want = [want[0].toFixed(1), want[1].toFixed(1)];
+        age = 28;                           // t0 + 38: past the last up sample
+        renderSats({});
+        out.hidden = m.g.getAttribute('display');
+        console.log(JSON.stringify(out));
+        """)
+        out = json.loads(subprocess.run([node, '-e', script], capture_output=True,
+                                        text=True, check=True).stdout)
+        assert out['shown'] is None
+        assert out['dot'] == out['want']
+        assert out['hidden'] == 'none'
+
+    def test_frame_loop_moves_marks_only_within_a_budget(self):
+        """The animation-frame loop, run under node on a mocked clock:
+        off with frame_rate = 0, idle while the tab is hidden or the feed
+        silent, frames drawn renderLite (marks only) and spaced at least
+        1/frame_rate apart, the gap doubling when a frame overruns its
+        budget and halving back once frames come in well under it, and
+        frameReport() counting all of it."""
+        import shutil
+        import subprocess
+        node = shutil.which('node')
+        if node is None:
+            pytest.skip('node is not available')
+        with saved_almanacs():
+            weewx.almanac.almanacs[:] = [weewx.almanac.WeeutilAlmanacType()]
+            plain = weewx.almanac.Almanac(TIME_TS, LATITUDE, LONGITUDE, altitude=ALTITUDE_M,
+                                          formatter=weewx.units.get_default_formatter())
+            assert page_config(self.render(plain))['frame_rate'] == 30
+        include = page_script()
+        loop = include[include.index('  var FRAME_BUDGET_MS = 8;'):
+                       include.index('  function updateCurrent() {')]
+        script = r"""
+        function load(frame_rate) {
+          var latest = {}, pageTimedOut = false, clock = 0, cost = 1;
+          var requested = 0, lite = [];
+          var window = {performance: {now: function() { return clock; }},
+                        requestAnimationFrame: function() { requested++; }};
+          var document = {hidden: false};
+          function renderGeo() { lite.push(renderLite); clock += cost; }
+          function renderDome(ts) { lite.push(renderLite); }
+          function renderPass() { lite.push(renderLite); }
+        """ + loop + r"""
+          return {
+            frame: function(t, ms) { cost = ms; motionFrame(t); return frameReport().gapMs; },
+            hide: function(hidden) { document.hidden = hidden; },
+            silence: function() { latest = null; },
+            report: frameReport,
+            requested: function() { return requested; },
+            lite: function() { return lite.concat([renderLite]); }
+          };
+        }
+        var off = load(0), on = load(30), out = {};
+        out.offRequested = off.requested();
+        out.startRequested = on.requested();
+        out.gaps = [
+          on.frame(1000, 1),      // drawn: cheap, the gap stays 1000/30
+          on.frame(1010, 1),      // skipped: 10 ms after the last
+          on.frame(1040, 20),     // drawn, over budget: the gap doubles
+          on.frame(1080, 20),     // skipped: inside the doubled gap
+          on.frame(1110, 20),     // drawn, over budget again: doubles again
+          on.frame(1250, 1),      // drawn, well under: halves
+          on.frame(1320, 1)       // drawn, well under: back to 1000/30
+        ];
+        on.hide(true);
+        on.frame(1500, 1);        // hidden: neither drawn nor skipped
+        on.hide(false);
+        on.silence();
+        on.frame(1600, 1);        // no packet yet: nothing to move
+        out.report = on.report();
+        out.requested = on.requested();
+        out.lite = on.lite();
+        out.emptyReport = load(30).report();
+        console.log(JSON.stringify(out));
+        """
+        out = json.loads(subprocess.run([node, '-e', script], capture_output=True,
+                                        text=True, check=True).stdout)
+        # frame_rate = 0 never starts the loop; otherwise it asks for a
+        # frame at load and again from every frame, drawn or not.
+        assert out['offRequested'] == 0
+        assert out['startRequested'] == 1 and out['requested'] == 1 + 9
+        step = 1000 / 30
+        assert out['gaps'] == pytest.approx([step, step, 2 * step, 2 * step,
+                                             4 * step, 2 * step, step])
+        report = out['report']
+        assert (report['drawn'], report['skipped']) == (5, 2)
+        assert report['gapMs'] == pytest.approx(step) and report['budgetMs'] == 8
+        assert report['meanMs'] == pytest.approx((1 + 20 + 20 + 1 + 1) / 5)
+        assert (report['p95Ms'], report['maxMs']) == (20, 20)
+        # Every render a frame made saw renderLite, and it is off again.
+        assert out['lite'] == [True] * 15 + [False]
+        assert out['emptyReport']['meanMs'] is None
+
+    def test_render_writes_only_what_changed(self):
+        """The write layer: setAttr/setText/setHtml touch the DOM only on a
+        real change, element handles are resolved once and forgotten on
+        every fragment swap, and a render through it -- the dome's live
+        satellite marks, here -- writes nothing when nothing moved and
+        only the moved coordinates when something did.  Run under node
+        against fake elements that count their mutations."""
+        import shutil
+        import subprocess
+        node = shutil.which('node')
+        if node is None:
+            pytest.skip('node is not available')
+        include = page_script()
+
+        def cut(start, end):
+            return include[include.index(start):include.index(end, include.index(start))]
+        layer = cut('  var idCache = {};', '  function num(r, key) {')
+        script = """
+        var writes = 0, lookups = 0;
+        function Fake() { this.attrs = {}; this.text = ''; this.html = ''; }
+        Fake.prototype.getAttribute = function(n) {
+          return n in this.attrs ? this.attrs[n] : null;
+        };
+        Fake.prototype.setAttribute = function(n, v) {
+          writes++; this.attrs[n] = String(v);
+        };
+        Object.defineProperty(Fake.prototype, 'textContent', {
+          get: function() { return this.text; },
+          set: function(v) { writes++; this.text = v; }
+        });
+        Object.defineProperty(Fake.prototype, 'innerHTML', {
+          get: function() { return this.html; },
+          set: function(v) { writes++; this.html = v; }
+        });
+        var cell = new Fake();
+        var document = {getElementById: function(id) {
+          lookups++; return id === 'cell' ? cell : null;
+        }};
+        """ + layer + """
+        var el = new Fake();
+        setAttr(el, 'cx', '12.5'); setAttr(el, 'cx', 12.5); setAttr(el, 'cx', '12.6');
+        setText(el, 'ISS'); setText(el, 'ISS');
+        setHtml('cell', '<b>1</b>'); setHtml('cell', '<b>1</b>'); setHtml('cell', '<b>2</b>');
+        setHtml('missing', 'x'); setHtml('missing', 'x');
+        var afterCell = lookups;
+        forgetIds(); setHtml('cell', '<b>2</b>');
+        console.log(JSON.stringify([writes, afterCell, lookups]));
+        """
+        out = subprocess.run([node, '-e', script], capture_output=True,
+                             text=True, check=True).stdout
+        writes, after_cell, lookups = json.loads(out)
+        # cx twice (12.5 then 12.6), text once, html twice.
+        assert writes == 5
+        # 'cell' resolved once; a miss is never cached.
+        assert after_cell == 3
+        # A swap forgets the handle; the element's own memory still
+        # elides the unchanged write.
+        assert lookups == 4
+
+        script = (
+            cut('  function setAttr(el, name, value) {', '  function num(r, key) {')
+            + cut('  function num(r, key) {', '\n\n')
+            + cut('  function liveValue(key, dt) {', '  // ---- rendering')
+            + cut('  var DOME_CX = 340', '  function numOr(')
+            + cut('  function renderSats(svg) {', '  function domeFragMeta() {')
+            + r"""
+        var written = [];
+        function Node(role) { this.role = role; this.attrs = {}; this.text = ''; }
+        Node.prototype.getAttribute = function(n) {
+          return n in this.attrs ? this.attrs[n] : null;
+        };
+        Node.prototype.setAttribute = function(n, v) {
+          written.push(this.role + '.' + n); this.attrs[n] = String(v);
+        };
+        Node.prototype.removeAttribute = function(n) {
+          if (n in this.attrs) { written.push(this.role + '.-' + n); delete this.attrs[n]; }
+        };
+        Object.defineProperty(Node.prototype, 'textContent', {
+          get: function() { return this.text; },
+          set: function(v) { written.push(this.role + '.text'); this.text = v; }
+        });
+        var SAT_NAMES = ['iss'], satMarks = null, latest = null, latestTs = 0, age = 0;
+        function packetAge() { return age; }
+        function motionAhead() { throw new Error('no feed value to extrapolate'); }
+        function staticSatMark() { return {g: null, lab: null}; }
+        function setShown() {}
+        function satLabel(name) { return 'ISS'; }
+        function buildSatMark() {
+          return {g: new Node('g'), dot: new Node('dot'), lab: new Node('lab')};
+        }
+        var t0 = 1000000;
+        track = parseTrack(JSON.stringify({t0: t0, interval: 300, tracks: [
+          {step: 10, fields: {'almanac.iss.az': [350, 356, 2, 8, 14],
+                              'almanac.iss.alt': [10, 20, 30, 40, 50]}}]}));
+        latest = {'current.dateTime.raw': t0 + 10, 'almanac.iss.sunlit': true,
+                  'almanac.sun.alt': -20};
+        latestTs = t0 + 10;
+        age = 5;
+        var out = {};
+        renderSats({});
+        out.first = written.length;
+        written = [];
+        renderSats({});
+        out.same = written;
+        written = [];
+        age = 6;
+        renderSats({});
+        out.moved = written;
+        written = [];
+        latest['almanac.sun.alt'] = 0;
+        renderSats({});
+        out.dawn = written;
+        console.log(JSON.stringify(out));
+        """)
+        out = json.loads(subprocess.run([node, '-e', script], capture_output=True,
+                                        text=True, check=True).stdout)
+        assert out['first'] > 0
+        assert out['same'] == []
+        assert sorted(out['moved']) == ['dot.cx', 'dot.cy', 'lab.x', 'lab.y']
+        assert sorted(out['dawn']) == ['dot.class', 'lab.class']
+
+    def test_backdrop_is_patched_in_place(self):
+        """A refetched backdrop is patched into the dome on the page:
+        surviving nodes keep their identity (keyed bodies even when the
+        order changes), a risen star is inserted and a set one removed,
+        the nudges' transform comes off, the page's own live satellite
+        marks survive on top, and the result serializes exactly as the
+        new fragment.  A patch that throws falls back to the whole swap.
+        Run under node against a minimal DOM."""
+        include = page_script()
+        assert 'patched = patchDome(wrap, this.responseText);' in include
+        apply = include[include.index('patched = patchDome(wrap'):]
+        apply = apply[:apply.index('domeRestored = false;')]
+        assert 'wrap.innerHTML = this.responseText;' in apply
+        assert 'refreshDomeBase();' in apply
+        assert "'data-live': 'sat'" in include
+
+        import shutil
+        import subprocess
+        node = shutil.which('node')
+        if node is None:
+            pytest.skip('node is not available')
+        layer = include[include.index('  function setAttr(el, name, value) {'):
+                        include.index('  function setText(el, text) {')]
+        patch = include[include.index('  function domeKey(n) {'):
+                        include.index('  function patchDome(wrap, html) {')]
+        script = MINI_DOM_JS + layer + patch + r"""
+        function star(x) { return el('circle', {'class': 'star', cx: x, cy: 1}); }
+        function body(k, x) {
+          return el('g', {'class': 'dome-body', 'data-body': k},
+                    [el('circle', {cx: x, cy: 5})]);
+        }
+        function label(k, x) { return el('text', {'data-body': k, x: x}, [tx(k)]); }
+        var curMars = body('mars', 10), curVenus = body('venus', 20);
+        var curStar = star(1);
+        var live = el('g', {'data-live': 'sat'}, [el('circle', {cx: 99})]);
+        curMars.setAttribute('transform', 'translate(1 1)');
+        var cur = el('div', {'data-dome-ts': 100}, [el('svg', {}, [
+            curStar, star(2), star(3), curMars, label('mars', 10),
+            curVenus, label('venus', 20), live])]);
+        // The next backdrop: star 3 has set, a fourth has risen, venus and
+        // mars have swapped places in the drawing order, and the label
+        // text changed.
+        var next = el('div', {'data-dome-ts': 160}, [el('svg', {}, [
+            star(1.5), star(2.5), star(3.5), body('venus', 21), label('venus', 21),
+            body('mars', 11), label('mars', 'eleven'), el('text', {}, [tx('new')])])]);
+        var expected = ser(next);
+        writes = 0;
+        patchNode(cur, next);
+        var svg = cur.childNodes[0];
+        var last = svg.childNodes[svg.childNodes.length - 1];
+        svg.removeChild(last);
+        console.log(JSON.stringify({
+          same: ser(cur) === expected,
+          starKept: svg.childNodes[0] === curStar,
+          marsKept: svg.childNodes.indexOf(curMars) >= 0,
+          venusKept: svg.childNodes.indexOf(curVenus) >= 0,
+          transform: curMars.getAttribute('transform'),
+          liveOnTop: last === live
+        }));
+        """
+        out = subprocess.run([node, '-e', script], capture_output=True,
+                             text=True, check=True).stdout
+        r = json.loads(out)
+        assert r == {'same': True, 'starKept': True, 'marsKept': True,
+                     'venusKept': True, 'transform': None, 'liveOnTop': True}, r
+
+    def test_star_field_is_lifted_onto_a_canvas(self):
+        """dome_canvas lifts the star field out of a backdrop: titled
+        small dots and untitled lines painted by their own attributes go
+        into typed arrays, batched by paint, and a foreignObject takes the
+        first one's place; body groups, transformed, big or stroked marks
+        stay SVG.  The grid answers a tap with the nearest dot inside the
+        radius, and two lifted backdrops patch into each other cleanly.
+        Run under node against a minimal DOM."""
+        include = page_script()
+        patch_dome = include[include.index('  function patchDome(wrap, html) {'):]
+        patch_dome = patch_dome[:patch_dome.index('    patchNode(cur, next);')]
+        assert 'starField = flattenStars(next);' in patch_dome
+        assert "addLoadEvent(function() {" in include[
+            include.index('  if (DOME_CANVAS) {'):]
+        assert 'drawStarField();' in include[
+            include.index('patched = patchDome(wrap'):
+            include.index('domeRestored = false;  // a fresh sky')]
+
+        import shutil
+        import subprocess
+        node = shutil.which('node')
+        if node is None:
+            pytest.skip('node is not available')
+        layer = include[include.index('  function setAttr(el, name, value) {'):
+                        include.index('  function setText(el, text) {')]
+        patch = include[include.index('  function domeKey(n) {'):
+                        include.index('  function patchDome(wrap, html) {')]
+        lift = include[include.index('  var DOME_W = 680'):
+                       include.index('  function drawStarField() {')]
+        grid = include[include.index('  var TAP_CELL = 32;'):
+                       include.index('  function ownTitle(el) {')]
+        script = MINI_DOM_JS + layer + patch + lift + grid + r"""
+        function star(x, y, name) {
+          return el('circle', {cx: x, cy: y, r: 1.2, fill: 'white'}, [el('title', {}, [tx(name)])]);
+        }
+        function seg(x) { return el('line', {x1: x, y1: 0, x2: x, y2: 9, stroke: 'blue'}); }
+        function sky(dx) {
+          return el('div', {'data-dome-ts': 100}, [el('svg', {}, [
+            el('circle', {cx: 340, cy: 348, r: 296, fill: 'black'}),
+            el('g', {}, [seg(1 + dx), seg(2 + dx)]),
+            el('g', {}, [star(100 + dx, 100, 'Sirius'), star(300, 300, 'Vega'),
+                         star(102, 130, 'Rigel'),
+                         el('circle', {cx: 5, cy: 5, r: 1, fill: 'red', transform: 'rotate(9)'},
+                            [el('title', {}, [tx('Turned')])])]),
+            el('g', {'data-body': 'mars'}, [star(50, 50, 'Mars')]),
+            el('text', {}, [tx('N')])])]);
+        }
+        function near(x, y) {
+          var best = nearestMark(f.taps, {radius: 24, d: Infinity, a: Infinity,
+                                          text: null, box: null}, x, y);
+          return best.text;
+        }
+        var cur = sky(0);
+        var f = flattenStars(cur);
+        var svg = cur.childNodes[0];
+        var first = svg.childNodes[1].childNodes[0];
+        var next = sky(0.5);
+        var expected = ser(next);
+        flattenStars(next);
+        patchNode(cur, next);
+        console.log(JSON.stringify({
+          titles: f.taps.titles,
+          dots: Array.prototype.slice.call(f.dots),
+          segs: f.segs.length,
+          runs: f.runs.map(function(r) { return [r.dot, r.paint, r.from, r.to]; }),
+          fo: first.nodeName + '#' + first.getAttribute('id'),
+          left: svg.querySelectorAll('circle, line').length,
+          sirius: near(103, 100),
+          rigel: near(102, 124),
+          none: near(200, 200),
+          patched: ser(cur) === ser(next),
+          fresh: expected.indexOf('Sirius') >= 0 && ser(cur).indexOf('Sirius') < 0
+        }));
+        """
+        out = subprocess.run([node, '-e', script], capture_output=True,
+                             text=True, check=True).stdout
+        r = json.loads(out)
+        assert r['titles'] == ['Sirius', 'Vega', 'Rigel'], r
+        assert r['dots'][:3] == [100, 100, pytest.approx(1.2)], r
+        assert r['segs'] == 8
+        assert r['runs'] == [[False, 'blue', 0, 2], [True, 'white', 0, 3]], r
+        assert r['fo'] == 'foreignObject#dome-starfield'
+        # The backdrop, the turned dot and the body's own circle remain.
+        assert r['left'] == 3
+        assert (r['sirius'], r['rigel'], r['none']) == ('Sirius', 'Rigel', None)
+        assert r['patched'] and r['fresh'], r
+
+    def test_dome_answers_its_own_taps_from_a_grid(self):
+        """sky.js's nearHit scans every <title> in a panel per tap, so the
+        dome answers its own taps -- on its persistent wrapper, keeping
+        the tap from sky.js's document listener -- with sky.js's rules
+        (exact hit first, then the nearest small mark within the radius,
+        the smaller at a tie) over a grid of the still marks built once
+        per backdrop.  sky.js itself stays the verbatim copy.  The grid
+        is run under node: a mark spanning cells is found from any of
+        them, the radius bounds the search, and the tie rule holds."""
+        include = page_script()
+        tap = include[include.index('  function domeTap(e) {'):]
+        tap = tap[:tap.index('  addLoadEvent(')]
+        assert 'e.stopPropagation();' in tap
+        assert tap.index('ownTitle(el)') < tap.index('indexDomeMarks(')
+        assert "wrap.addEventListener('click', domeTap);" in include
+        apply = include[include.index('patched = patchDome(wrap'):]
+        assert 'domeMarks = null;' in apply[:apply.index('domeRestored = false;')]
+        sky = open(os.path.join(SKIN_DIR, 'sky.js')).read()
+        assert 'function nearHit(svg, x, y) {' in sky
+
+        import shutil
+        import subprocess
+        node = shutil.which('node')
+        if node is None:
+            pytest.skip('node is not available')
+        grid = include[include.index('  var DOME_W = 680'):
+                       include.index('  var STAR_MAX_R')]
+        grid += include[include.index('  var TAP_RADIUS = 24;'):
+                        include.index('  function ownTitle(el) {')]
+        script = grid + r"""
+        var ix = indexMarks(new Float32Array([
+            10, 10, 12, 12,          // a dot
+            30, 5, 100, 40,          // a wide label across three cells
+            0, 0, 50, 50,            // a box around the dot...
+            10.5, 10.5, 11.5, 11.5   // ...and a smaller dot inside the dot
+        ]), ['dot', 'wide', 'box', 'inner']);
+        function near(x, y, radius) {
+          return nearestMark(ix, {radius: radius, d: Infinity, a: Infinity,
+                                  text: null, box: null}, x, y).text;
+        }
+        console.log(JSON.stringify({
+          inside: near(11, 11, 24),
+          far: near(98, 20, 24),
+          edge: near(110, 20, 24),
+          beyond: near(140, 20, 24),
+          empty: near(600, 600, 24),
+          listed: ix.items.length
+        }));
+        """
+        out = subprocess.run([node, '-e', script], capture_output=True,
+                             text=True, check=True).stdout
+        r = json.loads(out)
+        # Inside all three nested marks: the smallest wins, as in sky.js.
+        assert r == {'inside': 'inner', 'far': 'wide', 'edge': 'wide',
+                     'beyond': None, 'empty': None,
+                     'listed': 1 + 8 + 4 + 1}, r
+
     def test_sky_js_and_skytip_in_step_with_skyfield(self):
         """sky.js is COPIED from weewx-skyfield -- that repo is the source
         of truth, celestial re-copies on upgrade and never forks -- and the
@@ -5170,14 +6851,13 @@ class TestSampleSkinRenders:
                 auto_tz = open('/etc/timezone').read().strip()
             except OSError:
                 pass
-        assert "time_zone = '%s'" % auto_tz in html
+        assert page_config(html)['time_zone'] == auto_tz
 
     @staticmethod
     def _body_names(html):
         """The roster's display names, and the javascript's BODY_LABELS."""
         rows = re.findall(r'<span class="chip [^"]*"></span>([^<]*)<', html)
-        labels = json.loads(
-            re.search(r'BODY_LABELS = (\{.*?\});', html).group(1))
+        labels = page_config(html)['body_labels']
         return rows, labels
 
     def test_body_names_come_from_almanac_texts(self, wxskyfield_almanac):
@@ -6117,23 +7797,38 @@ class TestMigrateLoopdataFields:
 
     def test_satellites_follow_configured_set(self):
         """With a configured satellite set, the appended satellite entries
-        are that set exactly -- the nineteen-entry pattern per tag, in
+        are that set exactly -- the seventeen-entry pattern per tag, in
         configuration order, the installer defaults nowhere in sight --
         and a second run adds nothing."""
         new, report = celestial.migrate_loopdata_fields(
             ['current.outTemp'], satellites=['terra', 'noaa21'])
-        assert len([f for f in new if f.startswith('almanac.terra.')]) == 19
-        assert len([f for f in new if f.startswith('almanac.noaa21.')]) == 19
+        assert len([f for f in new if f.startswith('almanac.terra.')]) == 17
+        assert len([f for f in new if f.startswith('almanac.noaa21.')]) == 17
         assert 'almanac.noaa21.next_pass.visible' in new
         assert not any(f.startswith(('almanac.iss.', 'almanac.tiangong.'))
                        for f in new)
-        assert new.index('almanac.terra.az') < new.index('almanac.noaa21.az')
+        assert new.index('almanac.terra.sunlit') < new.index('almanac.noaa21.sunlit')
         assert any('almanac.terra.*' in note and '[[Satellites]]' in note
                    for note in report['notes'])
         twice, report2 = celestial.migrate_loopdata_fields(
             new, satellites=['terra', 'noaa21'])
         assert twice == new and report2['added'] == []
 
+    def test_satellite_positions_stay_on_the_line(self):
+        """A satellite's az/alt, provisioned through 8.3.5 and no longer
+        since, are never removed -- another page may read them, and this
+        one falls back on them where the track runs out -- but the note
+        says what they cost.  A second run changes nothing."""
+        fields = ['current.outTemp', 'almanac.terra.az', 'almanac.terra.alt',
+                  'almanac.terra.sunlit', 'almanac.hst.az']
+        new, report = celestial.migrate_loopdata_fields(fields, satellites=['terra'])
+        assert new[:5] == fields
+        assert report['dropped'] == []
+        assert any(note.startswith('almanac.terra.az, almanac.terra.alt kept')
+                   and 'ephemeris-track.json' in note for note in report['notes'])
+        twice, report2 = celestial.migrate_loopdata_fields(new, satellites=['terra'])
+        assert twice == new and report2['added'] == []
+
     def test_empty_satellites_appends_none_keeps_existing(self):
         """A present-but-empty [[Satellites]] is authoritative: no
         satellite fields are appended (a deliberately emptied set is not
@@ -6150,8 +7845,8 @@ class TestMigrateLoopdataFields:
         """No [[Satellites]] to follow (weewx-skyfield absent or pre-2.0):
         the installer defaults are provisioned, and the note says so."""
         new, report = celestial.migrate_loopdata_fields(['current.outTemp'])
-        assert len([f for f in new if f.startswith('almanac.iss.')]) == 19
-        assert len([f for f in new if f.startswith('almanac.tiangong.')]) == 19
+        assert len([f for f in new if f.startswith('almanac.iss.')]) == 17
+        assert len([f for f in new if f.startswith('almanac.tiangong.')]) == 17
         assert any('installer defaults' in note for note in report['notes'])
 
     def test_conf_rewrite(self, tmp_path):
@@ -6175,7 +7870,7 @@ class TestMigrateLoopdataFields:
         assert 'current.outTemp' in fields          # non-celestial preserved
         assert 'almanac.mars.az' in fields          # sample-report fields appended
         assert 'almanac.proxima_centauri.az' in fields
-        assert 'almanac.iss.az' in fields           # no [Skyfield]: default satellites
+        assert 'almanac.iss.sunlit' in fields       # no [Skyfield]: default satellites
         # The rest of the configuration survives the round trip.
         assert migrated['Station']['location'] == 'Test Station'
         # The original file is untouched.
@@ -6199,8 +7894,8 @@ class TestMigrateLoopdataFields:
         report = celestial.migrate_loopdata_conf(str(conf), str(out))
         import configobj
         fields = configobj.ConfigObj(str(out))['LoopData']['Include']['fields']
-        assert len([f for f in fields if f.startswith('almanac.terra.')]) == 19
-        assert len([f for f in fields if f.startswith('almanac.noaa21.')]) == 19
+        assert len([f for f in fields if f.startswith('almanac.terra.')]) == 17
+        assert len([f for f in fields if f.startswith('almanac.noaa21.')]) == 17
         assert not any(f.startswith(('almanac.iss.', 'almanac.tiangong.'))
                        for f in fields)
         assert any('[[Satellites]]' in note for note in report['notes'])
@@ -6267,16 +7962,110 @@ class TestMigrateLoopdataFields:
         import configobj
         fields = configobj.ConfigObj(str(out))['LoopData']['Include']['fields']
         assert len([f for f in fields if f.startswith('almanac.a3.')]) == 6
-        assert len([f for f in fields if f.startswith('almanac.iss.')]) == 19
+        assert len([f for f in fields if f.startswith('almanac.iss.')]) == 17
         assert not any(f.startswith(('almanac.halley.', 'almanac.tiangong.'))
                        for f in fields)
         assert any('[[Comets]]' in note for note in report['notes'])
 
 
+class TestFieldsLine:
+    """The parsed, indexed fields-line model every fields edit goes
+    through."""
+
+    def test_parse(self):
+        e = celestial.parse_field(
+            'almanac(horizon=-18).sun(use_center=1).rise.unix_epoch.raw')
+        assert (e.root, e.args, e.tag, e.path, e.unit, e.rendition) == (
+            'almanac', 'horizon=-18', 'sun', ('rise',), 'unix_epoch', 'raw')
+        e = celestial.parse_field('almanac.iss.next_pass.rise_azimuth.ordinal_compass')
+        assert (e.args, e.tag, e.path, e.unit, e.rendition) == (
+            None, 'iss', ('next_pass', 'rise_azimuth'), None, 'ordinal_compass')
+        # A dot inside the arguments is not a segment boundary.
+        e = celestial.parse_field('almanac(horizon=-0.5).sun.alt')
+        assert (e.args, e.tag, e.path) == ('horizon=-0.5', 'sun', ('alt',))
+        e = celestial.parse_field('current.dateTime.raw')
+        assert (e.root, e.tag, e.path, e.rendition) == ('current', 'dateTime', (), 'raw')
+
+    def test_index_and_edits(self):
+        line = celestial.FieldsLine([
+            'current.dateTime.raw', 'almanac.iss.az', 'almanac.issy.az',
+            'almanac(days=1).iss.next_pass.visible', 'current.iss',
+            'almanac.sun.az', 'almanac.iss.az'])
+        assert line.tags() == ['iss', 'issy', 'sun']
+        assert [e.text for e in line.entries('iss')] == [
+            'almanac.iss.az', 'almanac(days=1).iss.next_pass.visible', 'almanac.iss.az']
+        # Only the tag's own almanac entries, any spelling, every copy.
+        assert line.remove_tag('iss') == [
+            'almanac.iss.az', 'almanac(days=1).iss.next_pass.visible', 'almanac.iss.az']
+        assert line.fields() == ['current.dateTime.raw', 'almanac.issy.az',
+                                 'current.iss', 'almanac.sun.az']
+        # A member after the tag is what makes an entry the tag's: a bare
+        # almanac.<tag>, or a call of it, stays (the pre-FieldsLine rule).
+        line.add(['almanac.iss', 'almanac.iss(x=1).az', 'almanac.iss.az'])
+        assert line.remove_tag('iss') == ['almanac.iss.az']
+        assert line.remove(['almanac.iss', 'almanac.iss(x=1).az']) == [
+            'almanac.iss', 'almanac.iss(x=1).az']
+        assert line.add(['almanac.sun.az', 'almanac.moon.az', 'almanac.moon.az']) == [
+            'almanac.moon.az']
+        line.append('almanac.sun.az')
+        assert line.dedupe() == ['almanac.sun.az']
+        assert line.remove(['current.iss', 'nothing']) == ['current.iss']
+        assert line.fields() == ['current.dateTime.raw', 'almanac.issy.az',
+                                 'almanac.sun.az', 'almanac.moon.az']
+        assert len(line) == 4 and 'almanac.moon.az' in line
+
+    def test_many_tags(self):
+        """Hundreds of satellites: every add and remove lands on exactly
+        its own entries."""
+        import configobj
+        config = configobj.ConfigObj(['[LoopData]', '[[Include]]',
+                                      'fields = current.dateTime.raw, almanac.sun.az'])
+        operations = [{'verb': 'add-satellite', 'tag': 'sat%d' % i, 'value': str(i)}
+                      for i in range(1, 301)]
+        operations += [{'verb': 'remove-satellite', 'tag': 'sat%d' % i}
+                       for i in range(2, 301, 2)]
+        report = celestial.apply_batch(config, operations)
+        line = celestial.FieldsLine.from_config(config)
+        assert len(line) == 2 + 150 * 17
+        assert line.tags() == ['sun'] + ['sat%d' % i for i in range(1, 301, 2)]
+        assert len(report['fields_added']) == 150 * 17
+
+    def test_helpers_edit_a_given_line(self, monkeypatch):
+        """Handed a line, the add/remove helpers edit that model and leave
+        writing it to the caller; apply_batch writes it once, at the
+        end."""
+        import configobj
+        config = configobj.ConfigObj(['[LoopData]', '[[Include]]',
+                                      'fields = current.dateTime.raw, almanac.iss.az'])
+        line = celestial.FieldsLine.from_config(config)
+        report = celestial.add_satellite(config, 'zenit', '23088', line=line)
+        assert report['fields_added'] == celestial.satellite_fields('zenit')
+        assert config['LoopData']['Include']['fields'] == [
+            'current.dateTime.raw', 'almanac.iss.az']
+        assert celestial.remove_satellite(config, 'iss', line=line)['fields_removed'] == [
+            'almanac.iss.az']
+        assert celestial.add_comet(config, 'a3', 'C/2023 A3', line=line)['fields_added']
+        assert celestial.remove_comet(config, 'a3', line=line)['fields_removed'] == (
+            celestial.comet_fields('a3'))
+        assert line.fields() == ['current.dateTime.raw'] + celestial.satellite_fields('zenit')
+        assert config['LoopData']['Include']['fields'] == [
+            'current.dateTime.raw', 'almanac.iss.az']
+        writes = []
+        original = celestial.FieldsLine.write
+        monkeypatch.setattr(celestial.FieldsLine, 'write',
+                            lambda self, c: writes.append(1) or original(self, c))
+        celestial.apply_batch(config, [
+            {'verb': 'add-satellite', 'tag': 'sat%d' % i, 'value': str(i)}
+            for i in range(1, 4)])
+        assert writes == [1]
+        assert celestial.FieldsLine.from_config(config).tags() == [
+            'iss', 'sat1', 'sat2', 'sat3']
+
+
 class TestSatelliteUtility:
     """The --add-satellite / --remove-satellite utility: the three
     weewx.conf edits a satellite takes -- the [Skyfield] [[Satellites]]
-    entry, the nineteen fields-line entries, the [StdReport] [[Defaults]]
+    entry, the seventeen fields-line entries, the [StdReport] [[Defaults]]
     [[[Almanac]]] display name -- each independently idempotent, so any
     mixed starting state converges."""
 
@@ -6299,7 +8088,7 @@ class TestSatelliteUtility:
         conf.write_text(self.BASE_CONF if text is None else text)
         return conf
 
-    def test_pattern_is_nineteen_tag_substituted(self):
+    def test_pattern_is_seventeen_tag_substituted(self):
         """The per-satellite pattern is the almanac.iss.* subset of
         _MIGRATION_NEW_FIELDS with the tag substituted -- one source of
         truth with the page's satellite consumption -- and stays
@@ -6307,7 +8096,7 @@ class TestSatelliteUtility:
         fields = celestial.satellite_fields('zenit23088')
         iss_fields = [f for f in celestial._MIGRATION_NEW_FIELDS
                       if f.startswith('almanac.iss.')]
-        assert len(fields) == 19
+        assert len(fields) == 17
         assert fields == [f.replace('almanac.iss.', 'almanac.zenit23088.')
                           for f in iss_fields]
         for field in fields:
@@ -6326,14 +8115,14 @@ class TestSatelliteUtility:
         report = celestial.add_satellite_conf(
             str(conf), str(out), 'zenit23088', '23088', 'Zenit-2 23088')
         assert report['satellites_entry'] == 'added'
-        assert len(report['fields_added']) == 19
+        assert len(report['fields_added']) == 17
         assert report['name_entry'] == 'added'
         import configobj
         new = configobj.ConfigObj(str(out))
         assert new['Skyfield']['Satellites']['zenit23088'] == '23088'
         assert new['Skyfield']['Satellites']['iss'] == '25544'   # untouched
         fields = new['LoopData']['Include']['fields']
-        assert 'almanac.zenit23088.az' in fields
+        assert 'almanac.zenit23088.sunlit' in fields
         assert 'almanac.zenit23088.next_pass.visible' in fields
         assert fields[:3] == ['current.dateTime.raw', 'almanac.sun.az',
                               'almanac.iss.az']                  # appended, not reordered
@@ -6369,7 +8158,7 @@ class TestSatelliteUtility:
         report = celestial.add_satellite_conf(str(conf), str(out),
                                               'zenit23088', '23088')
         assert report['satellites_entry'] == 'unchanged'
-        assert len(report['fields_added']) == 19
+        assert len(report['fields_added']) == 17
         # The reverse: every field present, no [[Satellites]] entry.
         hand_fields = ', '.join(celestial.satellite_fields('zenit23088'))
         conf2 = tmp_path / 'weewx2.conf'
@@ -6462,7 +8251,7 @@ class TestSatelliteUtility:
         report = celestial.remove_satellite_conf(str(added), str(out), 'zenit23088')
         assert report['satellites_entry'] == 'removed'
         assert report['norad'] == '23088'
-        assert len(report['fields_removed']) == 20
+        assert len(report['fields_removed']) == 18
         assert report['name_entry'] == 'removed'
         assert any('wxskyfield_sat_23088.tle' in h for h in report['hints'])
         new = configobj.ConfigObj(str(out))
@@ -6694,6 +8483,714 @@ class TestCometUtility:
         assert new['Skyfield']['Satellites']['iss'] == '25544'   # untouched
 
 
+class TestBatchUtility:
+    """--batch: many satellite and comet edits against one in-memory
+    configuration, through the very functions the single-object verbs
+    use, written once -- or not at all when any operation is refused."""
+
+    BASE_CONF = TestSatelliteUtility.BASE_CONF
+
+    BATCH = (
+        '# provisioning\n'
+        'add-satellite zenit23088=23088 --name \'Zenit-2 23088\'\n'
+        '\n'
+        '--add-comet a3="C/2023 A3" --name=Tsuchinshan-ATLAS   # pasted\n'
+        'remove-satellite tiangong\n'
+    )
+
+    def test_parse(self):
+        ops = celestial.parse_batch(self.BATCH)
+        assert ops == [
+            {'line': 2, 'verb': 'add-satellite', 'tag': 'zenit23088',
+             'value': '23088', 'name': 'Zenit-2 23088'},
+            {'line': 4, 'verb': 'add-comet', 'tag': 'a3',
+             'value': 'C/2023 A3', 'name': 'Tsuchinshan-ATLAS'},
+            {'line': 5, 'verb': 'remove-satellite', 'tag': 'tiangong',
+             'value': None, 'name': None},
+        ]
+        for bad, match in (('launch-satellite x=1', 'line 1'),
+                           ('add-satellite zenit23088', 'TAG=NORAD'),
+                           ('remove-comet a b', 'exactly one'),
+                           ('remove-comet a --name A', '--name'),
+                           ('# ok\nadd-comet a3="C/2023 A3', 'line 2')):
+            with pytest.raises(ValueError, match=match):
+                celestial.parse_batch(bad)
+
+    def test_one_parse_one_write(self, tmp_path, monkeypatch):
+        conf = tmp_path / 'weewx.conf'
+        conf.write_text(self.BASE_CONF)
+        out = tmp_path / 'weewx.conf.new'
+        writes = []
+        real_write = celestial._write_conf_atomically
+        monkeypatch.setattr(celestial, '_write_conf_atomically',
+                            lambda *a: writes.append(a) or real_write(*a))
+        report = celestial.apply_batch_conf(str(conf), str(out),
+                                            celestial.parse_batch(self.BATCH))
+        assert len(writes) == 1
+        assert [op['report'].get('satellites_entry', op['report'].get('comets_entry'))
+                for op in report['operations']] == ['added', 'added', 'removed']
+        # The consolidated view is the net change to the fields line, and
+        # a hint shared by several operations is given once.
+        assert report['fields_added'] == (celestial.satellite_fields('zenit23088')
+                                          + celestial.comet_fields('a3'))
+        assert report['fields_removed'] == []      # tiangong had none
+        assert report['hints'].count('Restart weewxd to pick up the change.') == 1
+        import configobj
+        new = configobj.ConfigObj(str(out))
+        assert new['Skyfield']['Satellites'] == {'iss': '25544', 'zenit23088': '23088'}
+        assert new['Skyfield']['Comets'] == {'a3': 'C/2023 A3'}
+        assert new['StdReport']['Defaults']['Almanac'] == {
+            'zenit23088': 'Zenit-2 23088', 'a3': 'Tsuchinshan-ATLAS'}
+        # The same batch again converges: nothing left to do, and nothing
+        # written.
+        again = celestial.apply_batch_conf(str(out), str(tmp_path / 'again.conf'),
+                                           celestial.parse_batch(self.BATCH))
+        assert again['fields_added'] == again['fields_removed'] == []
+        assert len(writes) == 1 and not (tmp_path / 'again.conf').exists()
+
+    def test_an_unchanging_batch_is_not_written_or_backed_up(self, tmp_path):
+        (tmp_path / 'ops.txt').write_text('remove-satellite hst\nremove-comet a3\n')
+        rc, doc = TestJsonOutput()._cli(tmp_path, '--batch', '@ops.txt', '--in-place')
+        assert rc == 0 and doc['output'] is None
+        assert doc['report']['fields_removed'] == []
+        assert (tmp_path / 'weewx.conf').read_text() == self.BASE_CONF
+        assert not (tmp_path / ('weewx.conf.bak-celestial-' + celestial.CELESTIAL_VERSION)).exists()
+
+    def test_a_refused_operation_writes_nothing(self, tmp_path):
+        """Operations see one another: a tag an earlier line added as a
+        satellite is refused as a comet, and the whole batch with it."""
+        conf = tmp_path / 'weewx.conf'
+        conf.write_text(self.BASE_CONF)
+        out = tmp_path / 'weewx.conf.new'
+        with pytest.raises(ValueError, match='line 6: .*satellite tag'):
+            celestial.apply_batch_conf(str(conf), str(out), celestial.parse_batch(
+                self.BATCH + 'add-comet zenit23088=1P\n'))
+        assert not out.exists()
+        # The API takes operations built in code, too.
+        with pytest.raises(ValueError, match='operation 1'):
+            celestial.apply_batch_conf(str(conf), str(out), [
+                {'verb': 'add-satellite', 'tag': 'moon', 'value': '1'}])
+        assert not out.exists()
+
+    def test_malformed_operations_are_refused_before_any_edit(self):
+        import configobj
+        for ops, match in (([{'verb': 'add-comet', 'tag': 'a3', 'value': None}],
+                            'operation 1: add-comet takes TAG=DESIGNATION'),
+                           ([{'verb': 'remove-satellite', 'tag': 'iss'},
+                             {'line': 7, 'verb': 'add-satellite', 'tag': 'hst'}],
+                            'line 7: add-satellite takes TAG=NORAD'),
+                           ([{'verb': 'remove-comet'}], 'takes a TAG'),
+                           ([{'verb': 'add-satellite', 'tag': 'hst', 'value': '20580',
+                              'name': 5}], 'name'),
+                           (['remove-satellite iss'], 'not an operation')):
+            config = configobj.ConfigObj(self.BASE_CONF.splitlines())
+            before = config.dict()
+            with pytest.raises(ValueError, match=match):
+                celestial.apply_batch(config, ops)
+            assert config.dict() == before
+
+
+class TestMinimalConfWriter:
+    """The edits are written as the original text with only their own
+    lines changed; anything the patch cannot express, or that does not
+    read back as the edited configuration, is written whole instead."""
+
+    BASE_CONF = (
+        '# a comment\n'
+        '[Station]\n'
+        '    location = Test Station   # odd  spacing\n'
+        '    altitude=700,foot\n'
+        '[Skyfield]\n'
+        '\tsatellite_downloads = true\n'
+        '    [[Satellites]]\n'
+        '        iss = 25544\n'
+        '        tiangong = 48274   # keep me\n'
+        '    # about LoopData\n'
+        '[LoopData]\n'
+        '    [[Include]]\n'
+        '        fields = current.dateTime.raw, almanac.sun.az, almanac.iss.az\n'
+        '[StdReport]\n'
+        '    [[Defaults]]\n'
+        '        unit_system = us\n'
+    )
+
+    def _changed(self, before, after):
+        import difflib
+        return [line for line in difflib.ndiff(before.splitlines(), after.splitlines())
+                if line[:2] in ('- ', '+ ')]
+
+    def test_only_the_edited_lines_change(self, tmp_path):
+        import configobj
+        conf = tmp_path / 'weewx.conf'
+        conf.write_text(self.BASE_CONF)
+        out = tmp_path / 'weewx.conf.new'
+        celestial.apply_batch_conf(str(conf), str(out), celestial.parse_batch(
+            TestBatchUtility.BATCH))
+        changed = self._changed(self.BASE_CONF, out.read_text())
+        fields = configobj.ConfigObj(str(out))['LoopData']['Include']['fields']
+        assert changed == [
+            '-         tiangong = 48274   # keep me',
+            '+         zenit23088 = 23088',
+            '+     [[Comets]]',
+            '+         a3 = C/2023 A3',
+            '-         fields = current.dateTime.raw, almanac.sun.az, almanac.iss.az',
+            '+         fields = %s' % ', '.join(fields),
+            '+         [[[Almanac]]]',
+            '+             zenit23088 = Zenit-2 23088',
+            '+             a3 = Tsuchinshan-ATLAS',
+        ]
+        # The new section is its parent's last, ahead of the comment that
+        # belongs to the next one.
+        text = out.read_text()
+        assert text.index('a3 = C/2023 A3') < text.index('# about LoopData')
+
+    def test_crlf_and_bom_are_kept(self, tmp_path):
+        conf = tmp_path / 'weewx.conf'
+        conf.write_bytes(b'\xef\xbb\xbf' + self.BASE_CONF.replace('\n', '\r\n').encode())
+        out = tmp_path / 'weewx.conf.new'
+        celestial.remove_satellite_conf(str(conf), str(out), 'tiangong')
+        assert out.read_bytes() == conf.read_bytes().replace(
+            b'        tiangong = 48274   # keep me\r\n', b'')
+
+    def test_unverified_text_is_written_whole(self, tmp_path, monkeypatch):
+        conf = tmp_path / 'weewx.conf'
+        conf.write_text(self.BASE_CONF)
+        out = tmp_path / 'weewx.conf.new'
+        real_layout = celestial._conf_layout
+
+        def misplaced(lines):
+            # tiangong's line number pointing at iss's: the patch deletes
+            # the wrong satellite, and the read-back must catch it.
+            layout = real_layout(lines)
+            satellites = layout[('Skyfield', 'Satellites')]['keys']
+            satellites['tiangong'] = satellites['iss']
+            return layout
+        monkeypatch.setattr(celestial, '_conf_layout', misplaced)
+        celestial.remove_satellite_conf(str(conf), str(out), 'tiangong')
+        text = out.read_text()
+        assert '    altitude = 700, foot\n' in text          # ConfigObj's spelling
+        assert 'iss = 25544' in text and 'tiangong' not in text
+        monkeypatch.undo()
+        # A removed section is beyond the patch, too.
+        import configobj
+        config = configobj.ConfigObj(str(conf), encoding='utf-8')
+        del config['Station']
+        assert celestial._minimal_conf_text(config, str(conf)) is None
+
+
+class TestFleet:
+    """--fleet: one operation across many configurations in a process
+    pool, each file read, backed up and rewritten on its own, a file
+    that would not change left alone, and a failure costing only its
+    own file."""
+
+    BASE_CONF = TestSatelliteUtility.BASE_CONF
+    OLD_CONF = BASE_CONF.replace('almanac.sun.az, almanac.iss.az',
+                                 'current.sunrise.raw, current.moonWaxing')
+
+    def _fleet(self, tmp_path):
+        (tmp_path / 'sub').mkdir()
+        (tmp_path / 'a.conf').write_text(self.OLD_CONF)
+        (tmp_path / 'b.conf').write_text(self.BASE_CONF)
+        (tmp_path / 'broken.conf').write_text('[Station]\n    location = x\n')
+        (tmp_path / 'sub' / 'c.conf').write_text(self.BASE_CONF)
+        (tmp_path / 'notes.txt').write_text('not a configuration\n')
+        return tmp_path
+
+    def test_paths(self, tmp_path):
+        fleet = self._fleet(tmp_path)
+        (fleet / ('a.conf.bak-celestial-' + celestial.CELESTIAL_VERSION)).write_text('')
+        assert celestial.fleet_paths(str(fleet)) == [
+            str(fleet / n) for n in ('a.conf', 'b.conf', 'broken.conf')]
+        assert celestial.fleet_paths(str(fleet / '**' / '*.conf')) == [
+            str(fleet / n) for n in ('a.conf', 'b.conf', 'broken.conf', 'sub/c.conf')]
+        assert celestial.fleet_paths(str(fleet / 'a.conf*')) == [str(fleet / 'a.conf')]
+
+    def test_migrate(self, tmp_path):
+        import configobj
+        fleet = self._fleet(tmp_path)
+        paths = celestial.fleet_paths(str(fleet / '**' / '*.conf'))
+        report = celestial.run_fleet(paths, jobs=2)
+        assert report['operation'] == 'migrate-loopdata-fields'
+        assert [f['status'] for f in report['files']] == ['written', 'written', 'failed', 'written']
+        assert (report['written'], report['unchanged'], report['failed']) == (3, 0, 1)
+        a = report['files'][0]
+        assert (a['renamed'], a['dropped']) == (1, 1) and a['added'] > 0
+        assert a['backup'] == paths[0] + '.bak-celestial-' + celestial.CELESTIAL_VERSION
+        assert open(a['backup']).read() == self.OLD_CONF
+        assert 'no [LoopData] [[Include]] fields entry' in report['files'][2]['error']
+        assert (fleet / 'broken.conf').read_text() == '[Station]\n    location = x\n'
+        # Each file migrated exactly as the single-file command would.
+        single = tmp_path / 'single.conf'
+        (tmp_path / 'old.conf.in').write_text(self.OLD_CONF)
+        celestial.migrate_loopdata_conf(str(tmp_path / 'old.conf.in'), str(single))
+        assert (configobj.ConfigObj(paths[0]).dict()
+                == configobj.ConfigObj(str(single)).dict())
+        # A second run over the finished fleet writes nothing -- so it
+        # does not trip over the backups the first one made.
+        again = celestial.run_fleet(paths, jobs=1)
+        assert [f['status'] for f in again['files']] == ['unchanged', 'unchanged',
+                                                          'failed', 'unchanged']
+
+    def test_operations(self, tmp_path):
+        fleet = self._fleet(tmp_path)
+        (fleet / 'b.conf').write_text(self.BASE_CONF.replace(
+            '[LoopData]', '    [[Comets]]\n        zenit23088 = 1P\n[LoopData]'))
+        paths = [str(fleet / 'a.conf'), str(fleet / 'b.conf')]
+        ops = [{'verb': 'add-satellite', 'tag': 'zenit23088', 'value': '23088',
+                'name': 'Zenit-2 23088'}]
+        report = celestial.run_fleet(paths, ops, jobs=1)
+        assert report['operation'] == 'batch'
+        a, b = report['files']
+        assert a['status'] == 'written'
+        assert a['added'] == len(celestial.satellite_fields('zenit23088'))
+        # A refused operation leaves its file untouched and un-backed-up.
+        assert b['status'] == 'failed' and 'comet tag' in b['error']
+        assert b['backup'] is None
+        assert not os.path.exists(paths[1] + '.bak-celestial-' + celestial.CELESTIAL_VERSION)
+
+    def test_any_failure_costs_only_its_file(self, tmp_path, monkeypatch):
+        fleet = self._fleet(tmp_path)
+        paths = [str(fleet / 'a.conf'), str(fleet / 'b.conf')]
+        migrate = celestial.migrate_loopdata_fields
+        calls = []
+
+        def flaky(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise KeyError('almanac')
+            return migrate(*args)
+        monkeypatch.setattr(celestial, 'migrate_loopdata_fields', flaky)
+        report = celestial.run_fleet(paths, jobs=1)
+        a, b = report['files']
+        assert (a['status'], a['error']) == ('failed', "KeyError: 'almanac'")
+        assert (fleet / 'a.conf').read_text() == self.OLD_CONF
+        assert b['status'] == 'written'
+        assert (report['written'], report['failed']) == (1, 1)
+
+
+class TestEstimateFeed:
+    """--estimate-feed: the loop-data.txt record the fields line would
+    produce, priced at the report's refresh_rate -- its size, each tag's
+    share, and what the leaner choices would save."""
+
+    def _line(self, sats=('iss',), comets=('halley',)):
+        fields = list(celestial._MIGRATION_BASE_FIELDS)
+        for tag in sats:
+            fields += celestial.satellite_fields(tag)
+        for tag in comets:
+            fields += celestial.comet_fields(tag)
+        return fields + ['current.outTemp']
+
+    def test_record_and_rates(self):
+        fields = self._line()
+        est = celestial.estimate_feed(fields, 2.0, 3, ['iss'], ['halley'])
+        assert est['entries'] == len(fields)
+        # A repeated entry is one key of loopdata's record.
+        assert celestial.estimate_feed(fields + fields[:5], 2.0, 3, ['iss'],
+                                       ['halley'])['record_bytes'] == est['record_bytes']
+        assert est['requests_per_hour'] == 5400
+        assert est['bytes_per_day'] == (est['record_bytes'] + celestial._FEED_HEADER_BYTES) * 3 * 43200
+        assert 0 < est['gzip_bytes'] < est['record_bytes']
+        assert est['unread'] == [] and est['savings']['unread'] == 0
+        by_tag = {g['tag']: g for g in est['tags']}
+        assert (by_tag['iss']['kind'], by_tag['iss']['entries']) == ('satellite', 17)
+        assert (by_tag['halley']['kind'], by_tag['halley']['entries']) == ('comet', 6)
+        assert by_tag['current']['kind'] == 'other'
+        assert est['tags'][0]['tag'] == 'iss'           # largest first
+        assert sum(g['bytes'] for g in est['tags']) == est['record_bytes']
+        assert est['savings']['per_satellite'] == by_tag['iss']['bytes_per_day']
+        assert est['savings']['refresh_rate'] * 2 == est['bytes_per_day']
+        # One satellite more costs what one satellite fewer saves, give
+        # or take the stand-in values.
+        more = celestial.estimate_feed(self._line(('iss', 'hst')), 2.0, 3,
+                                       ['iss', 'hst'], ['halley'])
+        grown = (more['record_bytes'] - est['record_bytes']) * 3 * 43200
+        assert abs(grown - est['savings']['per_satellite']) < 0.1 * grown
+
+    def test_unread_entries(self):
+        """An almanac entry the page does not read -- here a satellite no
+        longer configured -- is what pruning would save."""
+        est = celestial.estimate_feed(self._line(('iss', 'tiangong')), 2.0, 1,
+                                      ['iss'], ['halley'])
+        assert est['unread'] == celestial.satellite_fields('tiangong')
+        tiangong = [g for g in est['tags'] if g['tag'] == 'tiangong'][0]
+        assert tiangong['kind'] == 'almanac'
+        assert est['savings']['unread'] == tiangong['bytes_per_day']
+
+    def test_sample_measures(self):
+        fields = ['current.outTemp', 'almanac.sun.az', 'almanac.iss.az']
+        sample = {'current.outTemp': '12.5\u00b0C', 'almanac.sun.az': 123.25}
+        est = celestial.estimate_feed(fields, 2.0, 1, ['iss'], [], sample)
+        # What the sample does not carry (the almanac could not serve it)
+        # costs nothing; what it does is measured, not guessed.
+        assert est['entries'] == 2
+        assert est['record_bytes'] == len(json.dumps(sample))
+
+    def test_refresh_rate_from_config(self):
+        import configobj
+        config = configobj.ConfigObj([
+            '[StdReport]', '    [[SeasonsReport]]', '        skin = Seasons',
+            '    [[Sky]]', '        skin = Celestial', '        [[[Extras]]]',
+            '            refresh_rate = 5'])
+        assert celestial.feed_refresh_rate(config) == 5.0
+        assert celestial.feed_refresh_rate(configobj.ConfigObj()) == 2.0
+
+
+class TestJsonOutput:
+    """--json: every operation's report as one JSON document on stdout,
+    so automation reads what the functions returned instead of scraping
+    log lines; a refused run is a document too."""
+
+    def _cli(self, tmp_path, *args):
+        import subprocess
+        conf = tmp_path / 'weewx.conf'
+        if not conf.exists():
+            conf.write_text(TestSatelliteUtility.BASE_CONF)
+        proc = subprocess.run(
+            [sys.executable, '-m', 'user.celestial', '--json', '--config', str(conf)]
+            + [str(tmp_path / a[1:]) if a.startswith('@') else a for a in args],
+            cwd=os.path.join(REPO_ROOT, 'bin'), capture_output=True, text=True)
+        return proc.returncode, json.loads(proc.stdout)
+
+    def test_edits(self, tmp_path):
+        rc, doc = self._cli(tmp_path, '--add-satellite', 'hst=20580', '--name', 'Hubble',
+                            '--output', '@out.conf')
+        assert rc == 0
+        assert (doc['operation'], doc['tag'], doc['value'], doc['name']) == (
+            'add-satellite', 'hst', '20580', 'Hubble')
+        assert doc['output'] == str(tmp_path / 'out.conf')
+        assert doc['report']['satellites_entry'] == 'added'
+        assert doc['report']['fields_added'] == celestial.satellite_fields('hst')
+        (tmp_path / 'ops.txt').write_text(TestBatchUtility.BATCH)
+        rc, doc = self._cli(tmp_path, '--batch', '@ops.txt', '--output', '@out.conf')
+        assert rc == 0 and doc['operation'] == 'batch'
+        assert [op['report'].get('satellites_entry', op['report'].get('comets_entry'))
+                for op in doc['report']['operations']] == ['added', 'added', 'removed']
+
+    def test_read_only_operations(self, tmp_path):
+        rc, doc = self._cli(tmp_path, '--migrate-loopdata-fields', '--print-fields-value')
+        assert rc == 0 and doc['output'] is None
+        assert doc['fields'][:3] == ['current.dateTime.raw', 'almanac.sun.az', 'almanac.iss.az']
+        assert set(doc['report']) == {'renamed', 'dropped', 'added', 'notes'}
+        rc, doc = self._cli(tmp_path, '--estimate-feed', '--viewers', '2')
+        assert rc == 0 and doc['report']['viewers'] == 2
+        rc, doc = self._cli(tmp_path, '--version')
+        assert doc == {'version': celestial.CELESTIAL_VERSION}
+
+    def test_refusals(self, tmp_path):
+        rc, doc = self._cli(tmp_path, '--add-comet', 'a3', '--output', '@out.conf')
+        assert rc == 1 and 'TAG=DESIGNATION' in doc['error']
+        assert not (tmp_path / 'out.conf').exists()
+
+    def test_unusable_configurations_are_refusals(self, tmp_path):
+        """A weewx.conf that cannot be opened or parsed, or that has no
+        fields line to migrate, is refused like any other run: one error
+        document, exit 1, nothing written and no backup left behind."""
+        rc, doc = self._cli(tmp_path, '--add-satellite', 'hst=20580',
+                            '--config', '@missing.conf', '--output', '@out.conf')
+        assert rc == 1 and 'Unable to open' in doc['error']
+        (tmp_path / 'bad.conf').write_text('[Station\n')
+        rc, doc = self._cli(tmp_path, '--batch', '@bad.conf', '--config', '@bad.conf',
+                            '--output', '@out.conf')
+        assert rc == 1 and doc['error'].endswith('bad.conf')
+        (tmp_path / 'bare.conf').write_text('[Station]\n    location = x\n')
+        rc, doc = self._cli(tmp_path, '--migrate-loopdata-fields', '--config', '@bare.conf',
+                            '--in-place')
+        assert rc == 1 and 'no [LoopData] [[Include]] fields entry' in doc['error']
+        assert not (tmp_path / 'out.conf').exists()
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            'bad.conf', 'bare.conf', 'weewx.conf']
+
+    def test_fleet_prints_json_only_with_json(self, tmp_path):
+        import subprocess
+        (tmp_path / 'a.conf').write_text(TestSatelliteUtility.BASE_CONF)
+        (tmp_path / 'b.conf').write_text(TestSatelliteUtility.BASE_CONF)
+        command = [sys.executable, '-m', 'user.celestial', '--migrate-loopdata-fields',
+                   '--fleet', str(tmp_path), '--jobs', '1', '--in-place']
+        plain = subprocess.run(command, cwd=os.path.join(REPO_ROOT, 'bin'),
+                               capture_output=True, text=True)
+        assert plain.returncode == 0 and plain.stdout == ''
+        assert '2 configurations: 2 written, 0 unchanged, 0 failed.' in plain.stderr
+        assert '%s: written' % (tmp_path / 'a.conf') in plain.stderr
+        proc = subprocess.run(command + ['--json'], cwd=os.path.join(REPO_ROOT, 'bin'),
+                              capture_output=True, text=True)
+        assert proc.returncode == 0
+        assert json.loads(proc.stdout)['unchanged'] == 2
+
+    def test_fleet_reports(self, tmp_path):
+        conf = tmp_path / 'a.conf'
+        conf.write_text(TestSatelliteUtility.BASE_CONF)
+        plain = celestial.run_fleet([str(conf)], jobs=1)
+        assert 'report' not in plain['files'][0]
+        conf.write_text(TestSatelliteUtility.BASE_CONF)
+        (tmp_path / ('a.conf.bak-celestial-' + celestial.CELESTIAL_VERSION)).unlink()
+        full = celestial.run_fleet([str(conf)], jobs=1, reports=True)
+        entry = full['files'][0]
+        assert set(entry['report']) == {'renamed', 'dropped', 'added', 'notes'}
+        assert len(entry['report']['added']) == entry['added'] > 0
+
+
+class TestSuggestSatellites:
+    """--suggest-satellites: a local TLE catalog ranked by the passes
+    visible from the station, and the top of the ranking written through
+    the batch machinery."""
+
+    ISS = ('ISS (ZARYA)\n'
+           '1 25544U 98067A   19343.69339541  .00001764  00000-0  38792-4 0  9991\n'
+           '2 25544  51.6439 211.2001 0007417  17.6667  85.6398 15.50103472202482\n')
+
+    def _catalog(self, *objects):
+        """ISS's elements under other catalog numbers and names, the
+        mean motion (revolutions a day) optionally replaced."""
+        name, line1, line2 = self.ISS.splitlines()
+        text = ''
+        for label, norad, motion in objects:
+            l1 = line1[:2] + norad + line1[7:]
+            l2 = line2[:2] + norad + line2[7:52]
+            l2 += ('%11.8f' % motion) if motion else line2[52:63]
+            text += '%s\n%s\n%s\n' % (label, l1, l2 + line2[63:])
+        return text
+
+    def test_read_catalog(self):
+        text = (self._catalog(('0 STARLINK-1007', '44713', None),
+                              ('GALAXY 23', '28526', 1.00271))
+                # No name line; a number seen before; an alpha-5 number.
+                + '\n'.join(self._catalog(('', '55555', None)).splitlines()[1:]) + '\n'
+                + self._catalog(('AGAIN', '44713', None), ('ALPHA', 'A0001', None)))
+        catalog = celestial.read_tle_catalog(text)
+        assert [(s['name'], s['norad']) for s in catalog] == [
+            ('STARLINK-1007', '44713'), ('GALAXY 23', '28526'), ('55555', '55555')]
+        assert catalog[1]['mean_motion'] == pytest.approx(1.00271)
+
+    def test_station_location(self):
+        import configobj
+        config = configobj.ConfigObj([
+            '[Station]', 'latitude = 37.4', 'longitude = -122.1',
+            'altitude = 100, foot'])
+        assert celestial.station_location(config) == pytest.approx((37.4, -122.1, 30.48))
+        with pytest.raises(ValueError, match='latitude'):
+            celestial.station_location(configobj.ConfigObj(['[Station]', 'latitude = 37.4']))
+
+    def test_suggested_tags(self):
+        taken = {'iss'}
+        assert celestial.suggested_satellite_tag('ISS (ZARYA)', '25544', taken) == 'iss_zarya'
+        assert celestial.suggested_satellite_tag('ISS', '25544', taken) == 'iss_25544'
+        assert celestial.suggested_satellite_tag('SL-16 R/B', '22285', taken) == 'sl_16_r_b'
+        # Not an identifier, a body name, and weewx-skyfield's alternate
+        # spelling all fall back to the catalog number.
+        assert celestial.suggested_satellite_tag('2024-001A', '58500', taken) == 'norad58500'
+        assert celestial.suggested_satellite_tag('Mars', '1', taken) == 'mars_1'
+        assert celestial.suggested_satellite_tag('SAT 12', '12', taken) == 'sat_12_12'
+        assert celestial.suggested_satellite_tag(
+            'A VERY LONG SATELLITE NAME INDEED', '1', taken) == 'a_very_long_satellite_na'
+
+    def test_the_top_is_written_in_one_batch(self, tmp_path):
+        """Already-configured satellites count toward the top and are left
+        alone; the rest go through apply_batch_conf, so one write."""
+        import configobj
+        conf = tmp_path / 'weewx.conf'
+        conf.write_text(TestSatelliteUtility.BASE_CONF)
+        ranked = [{'name': 'ISS (ZARYA)', 'norad': '25544'},
+                  {'name': 'HALLEY', 'norad': '11111'},      # a comet default's tag
+                  {'name': 'NOAA 21', 'norad': '54234'},
+                  {'name': 'NOAA 20', 'norad': '43013'}]
+        operations = celestial.suggestion_operations(
+            configobj.ConfigObj(str(conf)), ranked, 3)
+        assert operations == [
+            {'verb': 'add-satellite', 'tag': 'halley_11111', 'value': '11111',
+             'name': 'HALLEY'},
+            {'verb': 'add-satellite', 'tag': 'noaa_21', 'value': '54234',
+             'name': 'NOAA 21'}]
+        out = tmp_path / 'weewx.conf.new'
+        celestial.apply_batch_conf(str(conf), str(out), operations)
+        assert configobj.ConfigObj(str(out))['Skyfield']['Satellites'] == {
+            'iss': '25544', 'tiangong': '48274', 'halley_11111': '11111',
+            'noaa_21': '54234'}
+
+    def test_ranking(self):
+        """The ISS over five December 2019 nights from 37.4N 122.1W: five
+        visible passes, twenty sampled minutes, the best peaking near 50
+        degrees -- what PyEphem's own sunlit test counts, sampled the same
+        way.  A geostationary object is never propagated, and a pool
+        ranks exactly as the single process does."""
+        pytest.importorskip('numpy')
+        pytest.importorskip('sgp4')
+        catalog = celestial.read_tle_catalog(
+            self.ISS + self._catalog(('GALAXY 23', '28526', 1.00271)))
+        ranked = celestial.rank_satellites(catalog, 37.4, -122.1, 30.0,
+                                           1575849600, days=5, jobs=1)
+        assert [s['norad'] for s in ranked] == ['25544']
+        assert (ranked[0]['passes'], ranked[0]['minutes']) == (5, 20.0)
+        assert ranked[0]['best_alt'] == pytest.approx(49.9, abs=0.2)
+        catalog = celestial.read_tle_catalog(self._catalog(
+            *[('SAT %d' % i, '%05d' % (40000 + i), 15.5 - i * 0.01) for i in range(200)]))
+        assert (celestial.rank_satellites(catalog, 37.4, -122.1, 30.0, 1575849600,
+                                          days=1, jobs=2)
+                == celestial.rank_satellites(catalog, 37.4, -122.1, 30.0, 1575849600,
+                                             days=1, jobs=1))
+
+
+class TestImportComets:
+    """--import-comets: an MPC CometEls.txt filtered on predicted
+    magnitude, [[Comets]] converged on the bright ones through the batch
+    machinery."""
+
+    @staticmethod
+    def _line(label, perihelion, q, e, peri, node, incl, h=None, k=None,
+              number='', kind='C', packed=''):
+        """One CometEls.txt line, in the MPC's fixed columns."""
+        year, month, day = perihelion
+        mag = '%4.1f %4.1f' % (h, k) if h is not None else '         '
+        return ('%4s%1s%-7s  %4d %02d %7.4f %9.6f  %8.6f  %8.4f  %8.4f  %8.4f  '
+                '20240101  %s  %-56s MPC 12345' % (number, kind, packed, year, month,
+                                                  day, q, e, peri, node, incl, mag,
+                                                  label))
+
+    def _file(self):
+        return '\n'.join([
+            self._line('1P/Halley', (1986, 2, 5.8946), 0.574894, 0.967885,
+                       111.8597, 59.3957, 162.1779, 5.5, 4.0, number='0001', kind='P'),
+            self._line('C/2023 A3 (Tsuchinshan-ATLAS)', (2024, 9, 27.7405), 0.391380,
+                       1.000125, 308.4915, 21.5596, 139.1115, 6.5, 3.2, packed='K23A030'),
+            self._line('2P/Encke', (2023, 10, 22.5), 0.339, 0.8471, 186.5, 334.2,
+                       11.35, 11.5, 4.0, number='0002', kind='P'),
+            self._line('C/2020 F3 (NEOWISE)', (2020, 7, 3.68), 0.2946, 1.0, 37.28,
+                       61.01, 128.94, 7.0, 4.0, packed='K20F030'),
+            self._line('73P-BA/Schwassmann-Wachmann', (2022, 8, 25.3), 0.9727, 0.6858,
+                       199.0, 69.6, 11.3, number='0073', kind='P'),
+            self._line('2P/Encke', (2023, 10, 22.5), 0.339, 0.8471, 186.5, 334.2,
+                       11.35, 11.5, 4.0, number='0002', kind='P'),
+            self._line('(3200) Phaethon', (2024, 1, 1.0), 0.14, 0.89, 1, 1, 1),
+            '',
+        ])
+
+    def test_read_elements(self):
+        comets = celestial.read_comet_elements(self._file())
+        assert [(c['designation'], c['name']) for c in comets] == [
+            ('1P', 'Halley'), ('C/2023 A3', 'Tsuchinshan-ATLAS'), ('2P', 'Encke'),
+            ('C/2020 F3', 'NEOWISE'), ('73P-BA', 'Schwassmann-Wachmann')]
+        halley = comets[0]
+        assert halley['perihelion'] == pytest.approx(2446467.3946)
+        assert (halley['q'], halley['e'], halley['h'], halley['k']) == (
+            0.574894, 0.967885, 5.5, 4.0)
+        # No magnitude law: kept, never judged.
+        assert comets[4]['h'] is None and comets[4]['k'] is None
+
+    def test_operations(self):
+        """Bright and unconfigured is added, faint and configured is
+        removed, by whatever tag it was configured under; a configured
+        comet the file does not judge is left alone."""
+        import configobj
+        config = configobj.ConfigObj([
+            '[Skyfield]', '[[Satellites]]', 'encke = 25544', '[[Comets]]',
+            'halley = 1P', 'old_a3 = C/2023 A3', 'wirtanen = 46P'])
+        predicted = [
+            {'designation': '1P', 'name': 'Halley', 'mag': 24.1},
+            {'designation': 'C/2023 A3', 'name': 'Tsuchinshan-ATLAS', 'mag': 9.0},
+            {'designation': 'C/2020 F3', 'name': 'NEOWISE', 'mag': 2.0},
+            {'designation': '2P', 'name': 'Encke', 'mag': 7.2},
+            {'designation': '73P-BA', 'name': 'Schwassmann-Wachmann', 'mag': None},
+            {'designation': '12P', 'name': 'Pons-Brooks', 'mag': 14.0}]
+        assert celestial.comet_import_operations(config, predicted, 10.0) == [
+            {'verb': 'add-comet', 'tag': 'neowise', 'value': 'C/2020 F3',
+             'name': 'NEOWISE'},
+            # encke is a satellite here: the designation takes over.
+            {'verb': 'add-comet', 'tag': 'comet_2p', 'value': '2P', 'name': 'Encke'},
+            {'verb': 'remove-comet', 'tag': 'halley', 'value': None, 'name': None}]
+        assert celestial.suggested_comet_tag('', 'C/2023 A3', set()) == 'c_2023_a3'
+
+    def test_magnitudes(self):
+        """Each orbit kind's brightest predicted magnitude in a window
+        around its perihelion, as PyEphem's own g,k law gives it for the
+        same elements: Halley in 1986 (an ellipse), Tsuchinshan-ATLAS in
+        2024 (a hyperbola), Encke in 2023 (a short ellipse), NEOWISE in
+        2020 (a parabola)."""
+        pytest.importorskip('numpy')
+        import calendar
+        comets = celestial.read_comet_elements(self._file())
+        for designation, start, days, mag in (('1P', (1986, 1, 1), 60, 4.0),
+                                              ('C/2023 A3', (2024, 9, 1), 60, 2.5),
+                                              ('2P', (2023, 10, 1), 30, 7.3),
+                                              ('C/2020 F3', (2020, 7, 1), 40, 2.0)):
+            start_ts = calendar.timegm(start + (0, 0, 0))
+            predicted = {c['designation']: c for c in
+                         celestial.predict_comet_magnitudes(comets, start_ts, days)}
+            assert predicted[designation]['mag'] == pytest.approx(mag, abs=0.1), designation
+            assert start_ts <= predicted[designation]['mag_ts'] <= start_ts + days * 86400
+            assert predicted['73P-BA']['mag'] is None
+
+
+class TestStartup:
+    """--version and --print-fields-value are run across whole fleets in
+    loops: they import only what they use, and start fast."""
+
+    # Seconds over a bare interpreter, the median of seven paired runs.
+    # Generous on purpose: what each command imports is pinned exactly by
+    # test_imports_only_what_it_uses, and this only has to catch a start
+    # that has grown by a whole WeeWX import, on a machine that may be
+    # busy running the rest of the suite.
+    BUDGET = 0.5
+    RUNS = 7
+
+    def _run(self, tmp_path, *args):
+        conf = tmp_path / 'weewx.conf'
+        conf.write_text(TestSatelliteUtility.BASE_CONF)
+        return [sys.executable, '-m', 'user.celestial'] + [
+            str(conf) if a == 'CONF' else a for a in args]
+
+    def _overhead(self, command, cwd):
+        """The median, over RUNS rounds, of command's wall time less a
+        bare interpreter's timed just before it -- paired, so a load that
+        comes and goes during the test weighs on both sides of a round --
+        and the last run's result."""
+        import statistics
+        import subprocess
+        # Timed as an installed copy runs: with its bytecode cached (the
+        # first run writes it), which PYTHONDONTWRITEBYTECODE would turn
+        # into a full compile of this module on every start.
+        env = dict(os.environ)
+        env.pop('PYTHONDONTWRITEBYTECODE', None)
+        subprocess.run(command, cwd=cwd, capture_output=True, env=env)
+        overheads = []
+        for _ in range(self.RUNS):
+            took = []
+            for run in ([sys.executable, '-c', 'pass'], command):
+                start = time.perf_counter()
+                proc = subprocess.run(run, cwd=cwd, capture_output=True, text=True,
+                                      env=env)
+                took.append(time.perf_counter() - start)
+            overheads.append(took[1] - took[0])
+        return statistics.median(overheads), proc
+
+    COMMANDS = (('--version',),
+                ('--migrate-loopdata-fields', '--print-fields-value', '--config', 'CONF'))
+
+    @pytest.mark.parametrize('args', COMMANDS)
+    def test_imports_only_what_it_uses(self, tmp_path, args):
+        import subprocess
+        command = self._run(tmp_path, *args)
+        proc = subprocess.run(command[:1] + ['-X', 'importtime'] + command[1:],
+                              cwd=os.path.join(REPO_ROOT, 'bin'),
+                              capture_output=True, text=True)
+        assert proc.returncode == 0, proc.stderr
+        imported = set(line.split('|')[-1].strip() for line in proc.stderr.splitlines()
+                       if line.startswith('import time:'))
+        for heavy in ('weeutil.logger', 'logging.config', 'weewx.units',
+                      'tempfile', 'shutil', 'numpy', 'sgp4'):
+            assert heavy not in imported, heavy
+        assert ('configobj' in imported) == (args != ('--version',))
+
+    @pytest.mark.parametrize('args', COMMANDS)
+    def test_starts_within_budget(self, tmp_path, args):
+        overhead, proc = self._overhead(self._run(tmp_path, *args),
+                                        os.path.join(REPO_ROOT, 'bin'))
+        assert proc.returncode == 0, proc.stderr
+        assert (proc.stdout + proc.stderr).strip()
+        assert overhead < self.BUDGET, (
+            '%s took %.0f ms over a bare interpreter' % (args[0], overhead * 1000))
+
+
 def load_installer():
     """The repo's install.py, imported under a private name with the real
     weecfg ExtensionInstaller standing in for weectl's 'setup' shim (the
@@ -6756,14 +9253,14 @@ class TestInstallerFieldsHint:
             {'LoopData': {'Include': {'fields': ['current.outTemp']}}})
         assert self._installer().configure(engine) is True
         new_line = engine.config_dict['LoopData']['Include']['fields']
-        # 50 base entries plus 19 each for the default satellites and 6
+        # 50 base entries plus 17 each for the default satellites and 6
         # each for the default comets (no [Skyfield] section to follow).
         assert new_line[0] == 'current.outTemp'
-        assert len(new_line) == 101
+        assert len(new_line) == 97
         assert 'almanac.halley.az' in new_line
         assert 'almanac.iss.next_pass.visible' in new_line
         text = '\n'.join(engine.printer.lines)
-        assert 'Appended 100 entries' in text
+        assert 'Appended 96 entries' in text
         assert '    almanac.sun.az' in text        # each entry is listed
         assert 'Restart weewxd' in text
         assert 'outdated spellings' not in text    # nothing to hint here
@@ -6773,12 +9270,12 @@ class TestInstallerFieldsHint:
             {'Skyfield': {'Satellites': {'terra': '25994'}},
              'LoopData': {'Include': {'fields': ['current.outTemp']}}})
         assert self._installer().configure(engine) is True
-        # 50 base + 19 for terra + 6 each for halley and hale_bopp (a
+        # 50 base + 17 for terra + 6 each for halley and hale_bopp (a
         # [Skyfield] with no [[Comets]] section still falls back to the
         # comet defaults).
-        assert 'Appended 81 entries' in '\n'.join(engine.printer.lines)
+        assert 'Appended 79 entries' in '\n'.join(engine.printer.lines)
         new_line = engine.config_dict['LoopData']['Include']['fields']
-        assert 'almanac.terra.az' in new_line
+        assert 'almanac.terra.sunlit' in new_line
         assert not any(f.startswith('almanac.iss.') for f in new_line)
 
     def test_silent_when_complete_for_configured_satellites(self):
@@ -6817,7 +9314,7 @@ class TestInstallerFieldsHint:
         assert engine.config_dict['LoopData']['Include']['fields'] == \
             ['current.outTemp']
         text = '\n'.join(engine.printer.lines)
-        assert 'Would append 100 entries' in text
+        assert 'Would append 96 entries' in text
 
     def test_renames_hinted_never_applied(self):
         """Outdated spellings are the migrator's destructive half: the
@@ -6861,7 +9358,7 @@ class TestInstallerFieldsHint:
         # page field, so it is NOT appended -- renames stay manual.
         assert 'almanac.sunrise.unix_epoch.raw' not in new_line
         text = '\n'.join(engine.printer.lines)
-        assert 'Appended 100 entries' in text
+        assert 'Appended 96 entries' in text
         assert 'outdated spellings' in text
 
     def test_hint_when_no_loopdata(self):
@@ -6879,6 +9376,86 @@ class TestInstallerFieldsHint:
         assert self._installer().configure(engine) is False
         assert any('Could not check' in line for line in engine.printer.lines)
 
+    def _cached_engine(self, tmp_path, config, dry_run=False):
+        engine = self._engine(config, dry_run)
+        engine.root_dict['EXT_DIR'] = str(tmp_path)
+        return engine
+
+    def test_reinstall_is_a_no_op(self, tmp_path, monkeypatch):
+        """A reinstall over the line the last install completed, for the
+        same satellites and comets, stops at the fingerprint: the bundled
+        migrator is not run, and nothing is printed or changed -- a new
+        version with the same field set included."""
+        config = {'Skyfield': {'Satellites': {'terra': '25994'}, 'Comets': {}},
+                  'LoopData': {'Include': {'fields': ['current.outTemp']}}}
+        installer = self._installer()
+        assert installer.configure(self._cached_engine(tmp_path, config)) is True
+        state = tmp_path / 'celestial' / installer.FIELDS_STATE
+        assert json.loads(state.read_text())['satellites'] == ['terra']
+        line = list(config['LoopData']['Include']['fields'])
+        bundled = installer._load_bundled_celestial()
+        monkeypatch.setattr(installer, '_load_bundled_celestial', lambda: bundled)
+
+        def no_run(*args):
+            raise AssertionError('ran the migrator')
+        monkeypatch.setattr(bundled, 'migrate_loopdata_fields', no_run)
+        installer['version'] = '99.0'
+        engine = self._cached_engine(tmp_path, config)
+        assert installer.configure(engine) is False
+        assert engine.printer.lines == []
+        assert config['LoopData']['Include']['fields'] == line
+
+    def test_changes_are_checked(self, tmp_path, monkeypatch):
+        """A new satellite is checked on its own (the migrator is not
+        run); a line edited by hand, or an upgrade to a new field set,
+        is checked whole again."""
+        config = {'Skyfield': {'Satellites': {'terra': '25994'}, 'Comets': {}},
+                  'LoopData': {'Include': {'fields': ['current.outTemp']}}}
+        installer = self._installer()
+        assert installer.configure(self._cached_engine(tmp_path, config)) is True
+        bundled = installer._load_bundled_celestial()
+        monkeypatch.setattr(installer, '_load_bundled_celestial', lambda: bundled)
+        migrations = []
+        real_migrate = bundled.migrate_loopdata_fields
+        monkeypatch.setattr(bundled, 'migrate_loopdata_fields',
+                            lambda *a: migrations.append(a) or real_migrate(*a))
+
+        config['Skyfield']['Satellites']['hst'] = '20580'
+        engine = self._cached_engine(tmp_path, config)
+        assert installer.configure(engine) is True
+        assert 'Appended 17 entries' in '\n'.join(engine.printer.lines)
+        assert migrations == []
+        assert installer.configure(self._cached_engine(tmp_path, config)) is False
+
+        config['LoopData']['Include']['fields'].remove('almanac.sun.az')
+        engine = self._cached_engine(tmp_path, config)
+        assert installer.configure(engine) is True
+        assert len(migrations) == 1
+        assert config['LoopData']['Include']['fields'][-1] == 'almanac.sun.az'
+
+        # A release whose field set moved: a comet member more.
+        monkeypatch.setattr(bundled, '_COMET_MEMBERS', bundled._COMET_MEMBERS + ['ra'])
+        assert installer.configure(self._cached_engine(tmp_path, config)) is False
+        assert len(migrations) == 2
+        assert installer.configure(self._cached_engine(tmp_path, config)) is False
+        assert len(migrations) == 2
+
+    def test_unfinished_lines_are_not_recorded(self, tmp_path):
+        """A dry run, and a line with renames still to review, leave no
+        fingerprint: the next install checks (and hints) again."""
+        engine = self._cached_engine(
+            tmp_path, {'LoopData': {'Include': {'fields': ['current.outTemp']}}},
+            dry_run=True)
+        installer = self._installer()
+        installer.configure(engine)
+        engine = self._cached_engine(
+            tmp_path, {'LoopData': {'Include': {'fields': ['current.Sunrise.raw']}}})
+        installer.configure(engine)
+        assert not (tmp_path / 'celestial' / installer.FIELDS_STATE).exists()
+        engine = self._cached_engine(tmp_path, engine.config_dict)
+        installer.configure(engine)
+        assert 'outdated spellings' in '\n'.join(engine.printer.lines)
+
 
 # ─────────────────────────────────────────────────────────────────────
 # The manual, pinned to the code.
@@ -7007,8 +9584,8 @@ class TestManualInStepWithCode:
         words leaves a double hyphen) and worth pinning by example."""
         assert _heading_anchor('The header, and the badge that tells the truth') \
             == 'the-header-and-the-badge-that-tells-the-truth'
-        assert _heading_anchor('### Satellites (19 entries each)'.lstrip('# ')) \
-            == 'satellites-19-entries-each'
+        assert _heading_anchor('### Satellites (17 entries each)'.lstrip('# ')) \
+            == 'satellites-17-entries-each'
         assert _heading_anchor('The chart — `name`') == 'the-chart--name'
         assert _heading_anchor('The almanac tiers') == 'the-almanac-tiers'
 
@@ -7033,7 +9610,7 @@ class TestManualInStepWithCode:
             'be pasted, so it must match what the migrator writes')
 
     def test_fields_reference_per_tag_patterns(self):
-        """The nineteen-entry satellite and six-entry comet patterns are
+        """The seventeen-entry satellite and six-entry comet patterns are
         the code's own, with the tag substituted."""
         page = _doc_text('fields-reference.md')
         sat = _fields_in(_block_containing(